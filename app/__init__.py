@@ -53,7 +53,10 @@ def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    from app.utils import db_pool
+    db_pool.configure_engine_options(app)
     db.init_app(app)
+    db_pool.init_app(app)
     migrate.init_app(app, db)
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -63,7 +66,18 @@ def create_app(config_class=Config):
     babel.init_app(app, locale_selector=get_locale, timezone_selector=get_timezone)
     limiter.init_app(app)
 
-    from app.routes import auth, main, subscriptions, api, categories, services, admin, exports, credits, credit_types, revenues, employers, banks, bank_accounts, installments, checkbooks, card_purchases, card_purchase_categories, reminders, providers
+    # Clé Stripe définie une fois par processus plutôt qu'à chaque requête : avec des
+    # workers à threads, les requêtes concurrentes partagent le module stripe
+    import stripe
+    stripe.api_key = app.config['STRIPE_SECRET_KEY']
+
+    from app.utils import query_audit
+    query_audit.init_app(app)
+
+    from app.utils import metrics
+    metrics.init_app(app)
+
+    from app.routes import auth, main, subscriptions, api, categories, services, admin, exports, credits, credit_types, revenues, employers, banks, bank_accounts, installments, checkbooks, card_purchases, card_purchase_categories, reminders, providers, monitoring
     app.register_blueprint(auth.bp)
     app.register_blueprint(main.bp)
     app.register_blueprint(subscriptions.bp)
@@ -84,6 +98,7 @@ def create_app(config_class=Config):
     app.register_blueprint(card_purchase_categories.bp)
     app.register_blueprint(reminders.bp)
     app.register_blueprint(providers.bp)
+    app.register_blueprint(monitoring.bp)
 
     # Ajouter datetime dans le contexte Jinja2
     from datetime import datetime
@@ -287,6 +302,10 @@ def create_app(config_class=Config):
     # Garder l'ancien filtre pour compatibilité
     app.template_filter('to_paris_time')(to_user_time)
 
+    # Version des URL de logos (empreinte du contenu)
+    from app.utils.logos import logo_version
+    app.template_filter('logo_version')(logo_version)
+
     # Enregistrer les commandes CLI
     from app import commands
     commands.init_app(app)
@@ -1,14 +1,31 @@
 """
 Commandes Flask CLI pour les tâches automatisées
 """
+import os
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import click
 from flask.cli import with_appcontext
 from app import db
-from app.models import Subscription, Credit, Revenue, Notification, User, InstallmentPayment, Transaction, Reminder
+from app.models import Subscription, Credit, Revenue, Notification, NotificationArchive, User, InstallmentPayment, Transaction, Reminder
 from app.utils.transactions import generate_future_transactions, create_transaction_from_revenue, create_transaction_from_subscription, create_transaction_from_credit, create_transaction_from_installment, check_and_regenerate_transactions, update_or_create_transaction
+from app.utils.metrics import record_job_processed, track_job
 from collections import defaultdict
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update
+
+# Taille des lots pour les traitements ensemblistes (une transaction par lot)
+ARCHIVE_BATCH_SIZE = 5000
+
+# Décalage en mois entre un rappel récurrent et le suivant. Les rappels sont au
+# mois près : un rappel hebdomadaire est reconduit sur le même mois.
+REMINDER_RECURRENCE_MONTHS = {
+    'weekly': 0,
+    'monthly': 1,
+    'quarterly': 3,
+    'semiannual': 6,
+    'annual': 12,
+    'biennial': 24,
+}
 
 
 def calculate_next_date(current_date, billing_cycle):
@@ -27,6 +44,7 @@ def calculate_next_date(current_date, billing_cycle):
 
 @click.command('update-payment-dates')
 @with_appcontext
+@track_job('update-payment-dates')
 def update_payment_dates():
     """Met à jour les dates de prochains paiements/versements pour tous les éléments actifs"""
     today = datetime.now().date()
@@ -320,32 +338,108 @@ def update_payment_dates():
     click.echo(f"  - Revenus: {updated_revenues}")
     click.echo(f"  - Paiements en plusieurs fois: {updated_installments}")
     click.echo(f"  - Notifications créées: {notifications_created}")
+    record_job_processed('update-payment-dates', updated_subscriptions + updated_credits + updated_revenues + updated_installments)
 
 
 @click.command('archive-old-notifications')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, help='Nombre de notifications archivées par transaction')
+@click.option('--dry-run', is_flag=True, help='Affiche le nombre de notifications concernées sans les archiver')
 @with_appcontext
-def archive_old_notifications():
+def archive_old_notifications(batch_size, dry_run):
     """Archive automatiquement les notifications lues de plus de 30 jours"""
     threshold_date = datetime.now() - timedelta(days=30)
 
-    # Trouver toutes les notifications lues depuis plus de 30 jours et non archivées
-    notifications_to_archive = Notification.query.filter(
+    # Notifications lues depuis plus de 30 jours et non archivées
+    criteria = (
         Notification.is_read == True,
         Notification.archived == False,
         Notification.read_at <= threshold_date
-    ).all()
+    )
 
-    archived_count = 0
-    for notification in notifications_to_archive:
-        notification.archived = True
-        notification.archived_at = datetime.utcnow()
-        archived_count += 1
+    if dry_run:
+        count = db.session.scalar(select(func.count(Notification.id)).where(*criteria))
+        click.echo(f"[dry-run] {count} notification(s) à archiver")
+        return
 
-    db.session.commit()
+    # Mise à jour ensembliste par lots bornés : chaque lot est une transaction courte
+    archived_count = 0
+    while True:
+        batch_ids = select(Notification.id).where(*criteria).order_by(Notification.id).limit(batch_size)
+        archived_ids = db.session.scalars(
+            update(Notification)
+            .where(Notification.id.in_(batch_ids.scalar_subquery()))
+            .values(archived=True, archived_at=datetime.utcnow())
+            .returning(Notification.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        db.session.commit()
+
+        archived_count += len(archived_ids)
+        if len(archived_ids) < batch_size:
+            break
 
     click.echo(f"✓ {archived_count} notification(s) archivée(s)")
 
 
+@click.command('purge-archived-notifications')
+@click.option('--days', type=int, default=None, help='Durée de rétention en jours (NOTIFICATION_RETENTION_DAYS par défaut)')
+@click.option('--delete', 'delete_only', is_flag=True, help="Supprimer définitivement au lieu de déplacer vers la table d'archive")
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, help='Nombre de notifications traitées par transaction')
+@click.option('--dry-run', is_flag=True, help='Affiche le nombre de notifications concernées sans les modifier')
+@with_appcontext
+def purge_archived_notifications(days, delete_only, batch_size, dry_run):
+    """Déplace (ou supprime) les notifications archivées depuis plus longtemps que la durée de rétention"""
+    from flask import current_app
+
+    days = days if days is not None else current_app.config['NOTIFICATION_RETENTION_DAYS']
+    threshold_date = datetime.utcnow() - timedelta(days=days)
+    criteria = (
+        Notification.archived == True,
+        Notification.archived_at <= threshold_date
+    )
+
+    if dry_run:
+        count = db.session.scalar(select(func.count(Notification.id)).where(*criteria))
+        action = 'supprimer' if delete_only else "déplacer vers la table d'archive"
+        click.echo(f"[dry-run] {count} notification(s) archivée(s) depuis plus de {days} jours à {action}")
+        return
+
+    # Les notifications archivées ne sont pas comptées comme non lues : le compteur
+    # des utilisateurs n'a pas besoin d'être mis à jour
+    columns = ['id', 'user_id', 'type', 'title', 'message', 'created_at', 'read_at', 'archived_at']
+    purged_count = 0
+    while True:
+        batch_ids = db.session.scalars(
+            select(Notification.id).where(*criteria).order_by(Notification.id).limit(batch_size)
+        ).all()
+        if not batch_ids:
+            break
+
+        if not delete_only:
+            db.session.execute(
+                insert(NotificationArchive).from_select(
+                    columns + ['moved_at'],
+                    select(*[getattr(Notification, column) for column in columns], literal(datetime.utcnow()))
+                    .where(Notification.id.in_(batch_ids))
+                )
+            )
+        db.session.execute(
+            delete(Notification)
+            .where(Notification.id.in_(batch_ids))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+        purged_count += len(batch_ids)
+        if len(batch_ids) < batch_size:
+            break
+
+    if delete_only:
+        click.echo(f"✓ {purged_count} notification(s) supprimée(s)")
+    else:
+        click.echo(f"✓ {purged_count} notification(s) déplacée(s) vers la table d'archive")
+
+
 @click.command('generate-initial-transactions')
 @click.option('--months', default=12, help='Nombre de mois de transactions à générer')
 @with_appcontext
@@ -387,17 +481,9 @@ def generate_initial_transactions(months):
     click.echo(f"✓ {total_transactions} transactions générées avec succès")
 
 
-@click.command('archive-reminders')
-@with_appcontext
-def archive_reminders():
-    """Archive les rappels dont la date est passée et génère les suivants"""
-    from sqlalchemy import or_, and_
-    from datetime import date
-
-    today = date.today()
-
-    # Trouver rappels à archiver
-    past_reminders = Reminder.query.filter(
+def past_reminders_criteria(today):
+    """Critères des rappels actifs dont la date est passée"""
+    return (
         Reminder.is_active == True,
         or_(
             # RDV pris et date passée
@@ -417,59 +503,95 @@ def archive_reminders():
                 )
             )
         )
-    ).all()
-
-    archived_count = 0
-    created_count = 0
+    )
+
+
+def insert_next_reminders(reminder_ids):
+    """Crée en une requête INSERT ... SELECT les rappels suivants des rappels récurrents
+
+    Le mois du rappel suivant est calculé en base à partir du décalage en mois
+    de la périodicité. Retourne le nombre de rappels créés.
+    """
+    months_offset = case(REMINDER_RECURRENCE_MONTHS, value=Reminder.recurrence)
+    # Index du mois (année * 12 + mois - 1) du rappel suivant
+    next_month_index = Reminder.reminder_year * 12 + Reminder.reminder_month - 1 + months_offset
+    now = datetime.utcnow()
+
+    successors = select(
+        Reminder.user_id,
+        Reminder.provider_id,
+        Reminder.name,
+        Reminder.description,
+        (next_month_index % 12 + 1).label('reminder_month'),
+        (next_month_index // 12).label('reminder_year'),
+        Reminder.estimated_cost,
+        Reminder.currency,
+        Reminder.recurrence,
+        literal(False).label('appointment_booked'),
+        literal(True).label('is_active'),
+        literal(now).label('created_at'),
+        literal(now).label('updated_at'),
+    ).where(
+        Reminder.id.in_(reminder_ids),
+        Reminder.recurrence.in_(list(REMINDER_RECURRENCE_MONTHS))
+    )
+
+    result = db.session.execute(
+        insert(Reminder).from_select(
+            ['user_id', 'provider_id', 'name', 'description', 'reminder_month', 'reminder_year',
+             'estimated_cost', 'currency', 'recurrence', 'appointment_booked', 'is_active',
+             'created_at', 'updated_at'],
+            successors
+        )
+    )
+    return result.rowcount
 
-    for reminder in past_reminders:
-        # 1. Archiver le rappel actuel
-        reminder.is_active = False
-        reminder.archived_at = datetime.utcnow()
-        archived_count += 1
-
-        # 2. Créer nouveau rappel si récurrent
-        if reminder.recurrence != 'once':
-            from datetime import date
-            # Calculer date du prochain rappel
-            current_date = date(reminder.reminder_year, reminder.reminder_month, 1)
-
-            if reminder.recurrence == 'weekly':
-                next_date = current_date + relativedelta(weeks=1)
-            elif reminder.recurrence == 'monthly':
-                next_date = current_date + relativedelta(months=1)
-            elif reminder.recurrence == 'quarterly':
-                next_date = current_date + relativedelta(months=3)
-            elif reminder.recurrence == 'semiannual':
-                next_date = current_date + relativedelta(months=6)
-            elif reminder.recurrence == 'annual':
-                next_date = current_date + relativedelta(years=1)
-            elif reminder.recurrence == 'biennial':
-                next_date = current_date + relativedelta(years=2)
-            else:
-                # Par défaut, on ne crée pas de nouveau rappel
-                continue
 
-            next_year = next_date.year
-            next_month = next_date.month
+@click.command('archive-reminders')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, help='Nombre de rappels archivés par transaction')
+@click.option('--dry-run', is_flag=True, help='Affiche le nombre de rappels concernés sans les modifier')
+@with_appcontext
+def archive_reminders(batch_size, dry_run):
+    """Archive les rappels dont la date est passée et génère les suivants"""
+    from datetime import date
 
-            # Créer nouveau rappel
-            new_reminder = Reminder(
-                user_id=reminder.user_id,
-                provider_id=reminder.provider_id,
-                name=reminder.name,
-                description=reminder.description,
-                reminder_month=next_month,
-                reminder_year=next_year,
-                estimated_cost=reminder.estimated_cost,
-                recurrence=reminder.recurrence,
-                appointment_booked=False,
-                appointment_date=None
-            )
-            db.session.add(new_reminder)
-            created_count += 1
+    today = date.today()
+    # Les rappels créés pendant le traitement ne sont pas repris dans la même exécution
+    last_id = db.session.scalar(select(func.max(Reminder.id))) or 0
+    criteria = past_reminders_criteria(today) + (Reminder.id <= last_id,)
+
+    if dry_run:
+        archived_count, created_count = db.session.execute(
+            select(
+                func.count(Reminder.id),
+                func.count(Reminder.id).filter(Reminder.recurrence.in_(list(REMINDER_RECURRENCE_MONTHS)))
+            ).where(*criteria)
+        ).one()
+        click.echo(f'[dry-run] {archived_count} rappels à archiver')
+        click.echo(f'[dry-run] {created_count} nouveaux rappels à créer')
+        return
 
-    db.session.commit()
+    archived_count = 0
+    created_count = 0
+    while True:
+        # 1. Archiver un lot de rappels passés
+        batch_ids = select(Reminder.id).where(*criteria).order_by(Reminder.id).limit(batch_size)
+        archived_ids = db.session.scalars(
+            update(Reminder)
+            .where(Reminder.id.in_(batch_ids.scalar_subquery()))
+            .values(is_active=False, archived_at=datetime.utcnow())
+            .returning(Reminder.id)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        # 2. Créer les rappels suivants des rappels récurrents du lot
+        if archived_ids:
+            created_count += insert_next_reminders(archived_ids)
+        db.session.commit()
+
+        archived_count += len(archived_ids)
+        if len(archived_ids) < batch_size:
+            break
 
     click.echo(f'✓ {archived_count} rappels archivés')
     click.echo(f'✓ {created_count} nouveaux rappels créés')
@@ -565,21 +687,84 @@ def check_reminder_appointments():
             for notification in recent_notifs:
                 user = User.query.get(notification.user_id)
                 if user and user.email_notifications:
+                    # Les rappels à 10 jours attendent le récapitulatif s'il est activé
                     if send_notification_email(user, notification):
-                        notification.is_sent = True
-                        notification.sent_at = datetime.utcnow()
                         emails_sent += 1
                         click.echo(f'  → Email envoyé à {user.email}')
 
-            db.session.commit()
-
     click.echo(f'✓ {notifications_created} notification(s) créée(s)')
     click.echo(f'✓ {emails_sent} email(s) envoyé(s)')
 
 
+@click.command('send-notification-digests')
+@click.option('--flush', is_flag=True, help="Envoyer toutes les notifications en attente sans attendre la fin des fenêtres")
+@with_appcontext
+def send_notification_digests(flush):
+    """Envoie les récapitulatifs groupés des notifications par email"""
+    from flask import current_app
+    from app.utils.email import is_digest_enabled
+    from app.utils.notifications import send_notification_digests as send_digests
+
+    if not is_digest_enabled() and not flush:
+        click.echo("Récapitulatif désactivé (NOTIFICATION_DIGEST_WINDOW_MINUTES = 0)")
+        return
+
+    # Créer un contexte de requête pour permettre l'utilisation de url_for()
+    with current_app.test_request_context():
+        emails_sent, notifications_sent = send_digests(flush=flush)
+
+    click.echo(f'✓ {emails_sent} récapitulatif(s) envoyé(s)')
+    click.echo(f'✓ {notifications_sent} notification(s) regroupée(s)')
+
+
+@click.command('export-transactions')
+@click.argument('email')
+@click.option('--format', 'export_format', type=click.Choice(['csv', 'parquet']), default='csv', help='Format du fichier (csv = CSV compressé en gzip)')
+@click.option('--start', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Première date incluse (AAAA-MM-JJ)')
+@click.option('--end', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Dernière date incluse (AAAA-MM-JJ)')
+@click.option('--source-type', 'source_types', multiple=True, help='Type de source à exporter (répétable, tous par défaut)')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None, help='Fichier de sortie (transactions_<id>.<ext> par défaut)')
+@with_appcontext
+def export_transactions(email, export_format, start, end, source_types, output):
+    """Exporte l'historique des transactions d'un utilisateur en CSV compressé ou Parquet"""
+    from app.utils.transaction_export import EXPORT_FORMATS, TRANSACTION_SOURCE_TYPES, stream_transactions_export
+
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f'Utilisateur introuvable : {email}')
+
+    unknown = set(source_types) - set(TRANSACTION_SOURCE_TYPES)
+    if unknown:
+        raise click.ClickException(f"Type(s) de source inconnu(s) : {', '.join(sorted(unknown))}")
+
+    output = output or f'transactions_{user.id}.{EXPORT_FORMATS[export_format][1]}'
+    chunks = stream_transactions_export(
+        export_format, user.id,
+        start.date() if start else None,
+        end.date() if end else None,
+        list(source_types)
+    )
+
+    size = 0
+    with open(output, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+            size += len(chunk)
+
+    click.echo(f'✓ Export écrit dans {output} ({size} octets)')
+
+
 @click.command('auto-backup')
+@click.option('--incremental', is_flag=True,
+              help='Sauvegarde incrémentale des documents (complète si la dernière date de plus de 7 jours)')
+@click.option('--rescan', is_flag=True, help='Relire tous les documents sans se fier à l\'index local')
+@click.option('--jobs', type=int, default=None,
+              help='Dump au format répertoire avec N processus en parallèle (0 = nombre de cœurs)')
+@click.option('--verify', is_flag=True,
+              help='Restaurer la sauvegarde dans une base temporaire et comparer le nombre de lignes')
 @with_appcontext
-def auto_backup():
+@track_job('auto-backup')
+def auto_backup(incremental, rescan, jobs, verify):
     """Crée une sauvegarde automatique quotidienne et applique la rotation"""
     import logging
     logger = logging.getLogger(__name__)
@@ -588,18 +773,47 @@ def auto_backup():
     logger.info("=== Démarrage de la sauvegarde automatique ===")
 
     from app.utils.backup import BackupManager
+    from app.utils.incremental_backup import IncrementalBackupManager
 
     backup_manager = None
     try:
         click.echo("Création du BackupManager...")
-        backup_manager = BackupManager()
+        backup_manager = IncrementalBackupManager() if incremental else BackupManager()
+
+        # Resynchronisation quotidienne du catalogue local avec le serveur (rotation et interface d'administration)
+        catalog = backup_manager.reconcile_catalog()
+        click.echo(
+            f"Catalogue des sauvegardes: {catalog['added']} ajoutées, {catalog['removed']} retirées, "
+            f"{catalog['updated']} mises à jour"
+        )
 
-        click.echo("Lancement de la sauvegarde automatique...")
-        backup_filename = backup_manager.create_full_backup(backup_type="auto")
+        if incremental and not backup_manager.full_backup_due():
+            click.echo("Lancement de la sauvegarde incrémentale...")
+            backup_filename = backup_manager.create_incremental_backup(rescan=rescan, jobs=_dump_jobs(jobs))
+        else:
+            click.echo("Lancement de la sauvegarde automatique...")
+            backup_filename = backup_manager.create_full_backup(backup_type="auto", jobs=_dump_jobs(jobs))
 
         if backup_filename:
             click.echo(f"✓ Sauvegarde automatique créée avec succès: {backup_filename}")
             logger.info(f"Sauvegarde automatique créée avec succès: {backup_filename}")
+            documents = backup_manager.last_backup.get('documents')
+            record_job_processed('auto-backup', documents['read_documents'] if documents else 1, backup_manager.last_backup.get('size'))
+            if documents:
+                click.echo(
+                    f"  Documents: {documents['read_documents']}/{documents['documents']} relus, "
+                    f"{documents['uploaded_chunks']} morceaux envoyés ({documents['uploaded_bytes']} octets)"
+                )
+
+            if verify:
+                click.echo("Vérification de la sauvegarde (restauration dans une base temporaire)...")
+                report = backup_manager.verify_backup(backup_filename, jobs=_dump_jobs(jobs))
+                _echo_restore_report(report)
+                if report['mismatches']:
+                    click.echo("✗ La sauvegarde restaurée ne correspond pas à la base")
+                    logger.error(f"Vérification de {backup_filename} échouée: {report['mismatches']}")
+                    return False
+                click.echo(f"✓ Sauvegarde vérifiée: {report['checked']} tables restaurées à l'identique")
 
             # Appliquer la rotation des sauvegardes automatiques
             click.echo("Application de la politique de rotation des sauvegardes...")
@@ -607,6 +821,13 @@ def auto_backup():
             click.echo(f"✓ Rotation effectuée: {rotation_result['kept']} conservées, {rotation_result['deleted']} supprimées")
             logger.info(f"Rotation effectuée: {rotation_result['kept']} conservées, {rotation_result['deleted']} supprimées")
 
+            if incremental:
+                rotation_result = backup_manager.rotate_incremental_backups()
+                click.echo(
+                    f"✓ Rotation incrémentale: {rotation_result['kept']} conservées, {rotation_result['deleted']} supprimées, "
+                    f"{rotation_result['chunks_deleted']} morceaux supprimés"
+                )
+
             return True
         else:
             click.echo("✗ Échec de la sauvegarde automatique")
@@ -624,11 +845,377 @@ def auto_backup():
         click.echo("=== Fin de la sauvegarde automatique ===")
 
 
+@click.command('reconcile-backups')
+@with_appcontext
+def reconcile_backups():
+    """Réaligne le catalogue local des sauvegardes sur le contenu du serveur SFTP"""
+    from app.utils.backup import BackupManager
+
+    backup_manager = BackupManager()
+    try:
+        result = backup_manager.reconcile_catalog()
+    except Exception as e:
+        raise click.ClickException(f"Échec de la synchronisation: {e}")
+    finally:
+        backup_manager.disconnect_sftp()
+
+    click.echo(
+        f"✓ Catalogue synchronisé: {result['added']} ajoutées, {result['removed']} retirées, "
+        f"{result['updated']} mises à jour"
+    )
+
+
+@click.command('check-query-budgets')
+@click.option('--email', required=True, help="Utilisateur dont les pages sont appelées (base de développement ou de préproduction)")
+@with_appcontext
+def check_query_budgets(email):
+    """Vérifie le nombre de requêtes SQL des pages principales et l'absence de N+1"""
+    from flask import current_app
+    from app.utils import query_audit
+
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise click.ClickException(f"Utilisateur introuvable: {email}")
+
+    results = query_audit.check_query_budgets(current_app._get_current_object(), user.id)
+    for result in results:
+        mark = '✓' if result['ok'] else '✗'
+        click.echo(f"{mark} {result['path']}: {result['queries']}/{result['budget']} requêtes (HTTP {result['status']})")
+
+    failures = [result for result in results if not result['ok']]
+    if failures:
+        raise click.ClickException(f"{len(failures)} page(s) hors budget ou en erreur")
+
+
+# Cycles de facturation des données de vérification de category_stats ('unknown' compte 0)
+CATEGORY_STATS_CYCLES = {'weekly': 4, 'monthly': 1, 'quarterly': 1 / 3, 'yearly': 1 / 12, 'unknown': 0}
+
+
+def insert_skewed_category_data(user_id, size, rng):
+    """
+    Catégories déséquilibrées pour category_stats : une catégorie avec size abonnements et
+    size crédits, quelques petites catégories, des éléments inactifs ou sans catégorie
+
+    Returns:
+        Liste des lignes insérées (source, category_id, amount, billing_cycle, is_active)
+    """
+    from datetime import date
+    from app.models import Category
+
+    category_ids = db.session.scalars(
+        insert(Category).returning(Category.id, sort_by_parameter_order=True),
+        [{'user_id': user_id, 'name': f'Catégorie {index}', 'category_type': 'all'} for index in range(5)]
+    ).all()
+    today = date.today()
+    items = []
+    for source, count_by_category in (('subscription', [size, 3, 1, 0, 0]), ('credit', [size, 0, 2, 1, 0])):
+        for category_id, count in zip(category_ids, count_by_category):
+            items += [(source, category_id) for _ in range(count)]
+        items += [(source, None)] * 3
+
+    rows = [
+        (source, category_id, round(rng.uniform(1, 500), 2), rng.choice(list(CATEGORY_STATS_CYCLES)), rng.random() < 0.8)
+        for source, category_id in items
+    ]
+    for source, model in (('subscription', Subscription), ('credit', Credit)):
+        values = [
+            dict(user_id=user_id, category_id=category_id, name=source, amount=amount, billing_cycle=cycle,
+                 is_active=is_active, start_date=today, **({'next_billing_date': today} if model is Subscription else {'next_payment_date': today}))
+            for row_source, category_id, amount, cycle, is_active in rows if row_source == source
+        ]
+        db.session.execute(insert(model), values)
+    return rows
+
+
+def reference_category_stats(rows):
+    """Résultat attendu de category_stats, calculé en Python : {category_id: (nb abo., total abo., nb crédits, total crédits)}"""
+    expected = {}
+    for source, category_id, amount, cycle, is_active in rows:
+        if category_id is None or not is_active:
+            continue
+        subscription_count, subscription_total, credit_count, credit_total = expected.get(category_id, (0, 0.0, 0, 0.0))
+        monthly = amount * CATEGORY_STATS_CYCLES[cycle]
+        if source == 'subscription':
+            subscription_count, subscription_total = subscription_count + 1, subscription_total + monthly
+        else:
+            credit_count, credit_total = credit_count + 1, credit_total + monthly
+        expected[category_id] = (subscription_count, subscription_total, credit_count, credit_total)
+    return expected
+
+
+@click.command('check-category-stats')
+@click.option('--sizes', default='100,200,400,800', help="Nombres d'abonnements et de crédits de la catégorie chargée")
+@click.option('--repeat', default=5, help='Exécutions mesurées par taille (la médiane est retenue)')
+@with_appcontext
+def check_category_stats(sizes, repeat):
+    """Vérifie category_stats sur des données déséquilibrées : résultats exacts et coût linéaire"""
+    import random
+    import statistics
+    import time
+    from app.models import Category
+    from app.services import aggregates
+
+    sizes = sorted(int(size) for size in sizes.split(','))
+    # Fonction non mémorisée : chaque appel exécute la requête
+    category_stats = aggregates.category_stats.__wrapped__
+    rng = random.Random(0)
+    timings = {}
+    failures = []
+
+    for size in sizes:
+        # Données insérées dans une transaction annulée à la fin de chaque taille
+        try:
+            user = User(email=f'check-category-stats-{size}@invalid', first_name='Check')
+            db.session.add(user)
+            db.session.flush()
+            rows = insert_skewed_category_data(user.id, size, rng)
+            expected = reference_category_stats(rows)
+            names = dict(db.session.execute(select(Category.name, Category.id).where(Category.user_id == user.id)).all())
+
+            durations = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                stats = category_stats(user)
+                durations.append(time.perf_counter() - start)
+            timings[size] = statistics.median(durations)
+
+            actual = {
+                names[stat['name']]: (stat['subscription_count'], stat['subscription_total'], stat['credit_count'], stat['credit_total'])
+                for stat in stats
+            }
+            if actual.keys() != expected.keys() or any(
+                actual[key][0] != expected[key][0] or actual[key][2] != expected[key][2]
+                or abs(actual[key][1] - expected[key][1]) > 0.01 or abs(actual[key][3] - expected[key][3]) > 0.01
+                for key in expected
+            ):
+                failures.append(f"N={size}: résultats différents de la référence ({actual} au lieu de {expected})")
+            click.echo(f"  N={size:>6}: {len(stats)} catégories, {timings[size] * 1000:.1f} ms")
+        finally:
+            db.session.rollback()
+
+    # Coût linéaire : le temps ne doit pas croître plus vite que les données (marge de 2x
+    # pour le bruit de mesure) ; la jointure d'origine (S x C lignes) le multipliait par 4
+    # à chaque doublement
+    growth = timings[sizes[-1]] / max(timings[sizes[0]], 1e-6)
+    allowed = 2 * sizes[-1] / sizes[0]
+    click.echo(f"Temps x{growth:.1f} pour des données x{sizes[-1] / sizes[0]:.0f} (maximum x{allowed:.0f})")
+    if growth > allowed:
+        failures.append(f"coût plus que linéaire : x{growth:.1f} pour des données x{sizes[-1] / sizes[0]:.0f}")
+
+    if failures:
+        raise click.ClickException("category_stats incorrect:\n" + "\n".join(f"- {failure}" for failure in failures))
+    click.echo("✓ category_stats exact et linéaire sur des données déséquilibrées")
+
+
+@click.command('check-db-pool')
+@click.option('--threads', type=int, default=None, help='Threads concurrents (par défaut GUNICORN_THREADS, sinon 8)')
+@click.option('--queries', default=20, help='Transactions exécutées par thread')
+@with_appcontext
+def check_db_pool(threads, queries):
+    """Exerce le pool SQL avec des threads concurrents et vérifie la compatibilité PgBouncer"""
+    import threading
+    from flask import current_app
+    from app.utils import db_pool
+
+    app = current_app._get_current_object()
+    threads = threads or int(os.environ.get('GUNICORN_THREADS', 8))
+    db_pool.check_thread_capacity(app, threads)
+    db_pool.reset_stats(app)
+    errors = []
+
+    def run():
+        with app.app_context():
+            try:
+                for _ in range(queries):
+                    db.session.execute(select(1))
+                    db.session.commit()
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    options = {key: value for key, value in app.config['SQLALCHEMY_ENGINE_OPTIONS'].items() if key != 'poolclass'}
+    click.echo(f"Options du moteur: {options}")
+    for bind_key, status in db_pool.pool_status(app).items():
+        click.echo(f"Moteur {bind_key or 'principal'}:")
+        for key, value in status.items():
+            click.echo(f"  {key}: {value}")
+
+    if errors:
+        raise click.ClickException(f"{len(errors)} thread(s) en erreur: {errors[0]}")
+    if app.config['DB_PGBOUNCER']:
+        problems = db_pool.pgbouncer_problems(app)
+        if problems:
+            raise click.ClickException("Incompatible avec PgBouncer (mode transaction):\n" + "\n".join(f"- {problem}" for problem in problems))
+        click.echo("✓ Compatible avec PgBouncer en mode transaction")
+
+
+@click.command('seed-synthetic')
+@click.option('--users', 'user_count', default=100, help="Nombre d'utilisateurs synthétiques créés")
+@click.option('--years', default=3, help="Années d'historique par utilisateur")
+@click.option('--seed', default=0, help='Graine du générateur (données reproductibles)')
+@click.option('--password', required=True, help='Mot de passe commun des utilisateurs synthétiques')
+@click.option('--premium-ratio', default=0.5, type=click.FloatRange(0, 1), help="Part d'utilisateurs Premium")
+@click.option('--batch-size', default=50, help='Utilisateurs insérés par transaction')
+@click.option('--reset', is_flag=True, help='Supprimer les utilisateurs synthétiques existants avant la génération')
+@click.option('--allow-production', is_flag=True, help="Autoriser la génération hors mode debug ou test")
+@with_appcontext
+def seed_synthetic(user_count, years, seed, password, premium_ratio, batch_size, reset, allow_production):
+    """Génère des utilisateurs fictifs avec un historique réaliste (base de développement ou de test de charge)"""
+    import time
+    from flask import current_app
+    from app.utils import synthetic_data
+
+    # Des comptes au mot de passe commun ne doivent pas arriver par erreur en production
+    if not (current_app.debug or current_app.testing or allow_production):
+        raise click.ClickException(
+            "L'application n'est ni en mode debug ni en mode test : relancer avec --allow-production "
+            "pour générer des utilisateurs synthétiques sur cette base"
+        )
+
+    if reset:
+        click.confirm("Supprimer tous les utilisateurs synthétiques et leurs données ?", abort=True)
+        click.echo(f"✓ {synthetic_data.delete_synthetic_data()} utilisateurs synthétiques supprimés")
+
+    generator = synthetic_data.SyntheticDataGenerator(years=years, seed=seed, password=password, premium_ratio=premium_ratio)
+    if generator.premium_plan_id is None:
+        click.echo("⚠ Plan Premium introuvable : les utilisateurs n'auront pas de plan Premium")
+
+    first_index = synthetic_data.next_synthetic_index()
+    start = time.time()
+    created = 0
+    while created < user_count:
+        count = min(batch_size, user_count - created)
+        generator.generate(first_index + created, count)
+        db.session.commit()
+        created += count
+        click.echo(f"  {created}/{user_count} utilisateurs ({time.time() - start:.0f} s)")
+
+    for table, count in sorted(generator.counts.items()):
+        click.echo(f"  {table}: {count}")
+    click.echo(
+        f"✓ {created} utilisateurs synthétiques créés en {time.time() - start:.0f} s "
+        f"({synthetic_data.synthetic_email(first_index)} ... {synthetic_data.synthetic_email(first_index + created - 1)})"
+    )
+
+
+# Dépendances lourdes (OCR, exports PDF, SFTP) qui ne doivent pas être importées au
+# démarrage d'un worker web : elles sont chargées à leur première utilisation
+BOOT_DEFERRED_MODULES = ('cv2', 'numpy', 'pytesseract', 'pdf2image', 'reportlab', 'openpyxl', 'paramiko', 'pyarrow')
+
+
+def boot_import_times():
+    """Temps d'import cumulés (µs) par module lors de create_app() et leur total, mesurés par python -X importtime"""
+    import subprocess
+    import sys
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'from app import create_app; create_app()'],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise click.ClickException(f"Échec du démarrage de l'application:\n{result.stderr[-2000:]}")
+
+    times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+        # Les imports de premier niveau (non imbriqués) s'additionnent
+        if not name.startswith('  '):
+            total += int(cumulative)
+    return times, total
+
+
+@click.command('check-boot-imports')
+@click.option('--max-ms', type=int, default=None, help="Durée maximale d'import de l'application (ms)")
+@click.option('--top', default=10, help='Nombre de paquets les plus lents affichés')
+@with_appcontext
+def check_boot_imports(max_ms, top):
+    """Vérifie que le démarrage d'un worker n'importe pas les dépendances OCR/export"""
+    times, total = boot_import_times()
+
+    packages = {name: cumulative for name, cumulative in times.items() if '.' not in name}
+    for name, cumulative in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]:
+        click.echo(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    total_ms = total / 1000
+    click.echo(f"Import de l'application: {total_ms:.1f} ms")
+
+    loaded = [name for name in BOOT_DEFERRED_MODULES if name in times]
+    if loaded:
+        raise click.ClickException(f"Dépendances lourdes importées au démarrage: {', '.join(loaded)}")
+    if max_ms is not None and total_ms > max_ms:
+        raise click.ClickException(f"Import de l'application trop lent: {total_ms:.1f} ms > {max_ms} ms")
+    click.echo("✓ Aucune dépendance OCR/export importée au démarrage")
+
+
+def _dump_jobs(jobs):
+    """Nombre de processus pg_dump/pg_restore : 0 pour le nombre de cœurs, None pour un seul processus"""
+    if jobs is None:
+        return None
+    return jobs or os.cpu_count() or 1
+
+
+def _echo_restore_report(report):
+    click.echo(f"  Base: {report['database']} ({report['duration']} s)")
+    if report['extras']:
+        click.echo(f"  Documents: {report['extras']['restored']} restaurés, {report['extras']['skipped']} ignorés")
+    for table, (expected, found) in sorted(report['mismatches'].items()):
+        click.echo(f"  ✗ {table}: {expected} lignes attendues, {found} trouvées")
+
+
+@click.command('restore-backup')
+@click.argument('filename')
+@click.option('--target-db', help='Base PostgreSQL créée pour la restauration (budgeefamily_restore_<date> par défaut)')
+@click.option('--jobs', type=int, default=0, show_default=True,
+              help='Processus pg_restore en parallèle (0 = nombre de cœurs)')
+@click.option('--drop', is_flag=True, help='Supprimer la base après la vérification')
+@with_appcontext
+def restore_backup(filename, target_db, jobs, drop):
+    """Restaure une sauvegarde dans une base de travail et vérifie le nombre de lignes de chaque table"""
+    from app.utils.incremental_backup import IncrementalBackupManager
+
+    # IncrementalBackupManager restaure aussi les sauvegardes complètes
+    backup_manager = IncrementalBackupManager()
+    try:
+        click.echo(f"Restauration de {filename}...")
+        report = backup_manager.restore_backup(filename, target_db, jobs=_dump_jobs(jobs), drop=drop)
+    except Exception as e:
+        raise click.ClickException(f"Échec de la restauration: {e}")
+    finally:
+        backup_manager.disconnect_sftp()
+
+    _echo_restore_report(report)
+    if report['mismatches']:
+        raise click.ClickException(f"{len(report['mismatches'])} tables ne correspondent pas à la sauvegarde")
+    click.echo(f"✓ Sauvegarde restaurée, {report['checked']} tables vérifiées")
+
+
 def init_app(app):
     """Enregistre les commandes dans l'application Flask"""
     app.cli.add_command(update_payment_dates)
     app.cli.add_command(archive_old_notifications)
+    app.cli.add_command(purge_archived_notifications)
     app.cli.add_command(generate_initial_transactions)
     app.cli.add_command(archive_reminders)
     app.cli.add_command(check_reminder_appointments)
+    app.cli.add_command(send_notification_digests)
+    app.cli.add_command(export_transactions)
     app.cli.add_command(auto_backup)
+    app.cli.add_command(reconcile_backups)
+    app.cli.add_command(restore_backup)
+    app.cli.add_command(check_query_budgets)
+    app.cli.add_command(check_category_stats)
+    app.cli.add_command(check_boot_imports)
+    app.cli.add_command(check_db_pool)
+    app.cli.add_command(seed_synthetic)
@@ -1,6 +1,8 @@
+import hashlib
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from app import db, login_manager
+from flask import g, has_app_context
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
 import secrets
@@ -63,6 +65,10 @@ class User(UserMixin, db.Model):
 
     # Notifications
     email_notifications = db.Column(db.Boolean, default=False)  # Recevoir un email à chaque notification
+    # Compteur des notifications non lues et non archivées, tenu à jour par les événements de Notification
+    unread_notifications_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    # Version des données agrégées (tableau de bord, répartitions), incrémentée à chaque modification
+    data_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
 
     # Stockage
     storage_limit = db.Column(db.BigInteger, default=5368709120)  # Limite de stockage en octets (5 Go par défaut)
@@ -107,6 +113,10 @@ class User(UserMixin, db.Model):
         else:
             self.timezone = 'Europe/Paris'
 
+    def refresh_unread_notifications_count(self):
+        """Recalcule le compteur de notifications non lues (après une mise à jour en masse)"""
+        self.unread_notifications_count = self.notifications.filter_by(is_read=False, archived=False).count()
+
     def can_add_subscription(self):
         """Vérifie si l'utilisateur peut ajouter un abonnement"""
         if self.is_premium():
@@ -310,7 +320,8 @@ class Category(db.Model):
     description = db.Column(db.Text, nullable=True)
     description_en = db.Column(db.Text, nullable=True)  # Description en anglais
     logo_url = db.Column(db.String(500), nullable=True)  # Deprecated - kept for backward compatibility
-    logo_data = db.Column(db.Text, nullable=True)  # Logo stocké en base64
+    logo_data = db.deferred(db.Column(db.LargeBinary, nullable=True))  # Logo (chargé seulement à la demande)
+    logo_hash = db.Column(db.String(64), nullable=True)  # SHA-256 du logo (ETag, version des URL)
     logo_mime_type = db.Column(db.String(50), nullable=True)  # Type MIME du logo (image/png, image/jpeg, etc.)
     website_url = db.Column(db.String(500), nullable=True)
     color = db.Column(db.String(7), default='#6c757d')  # Couleur en hex
@@ -359,7 +370,8 @@ class Service(db.Model):
     description = db.Column(db.Text, nullable=True)
     description_en = db.Column(db.Text, nullable=True)  # Description en anglais
     logo_url = db.Column(db.String(500), nullable=True)  # Deprecated - kept for backward compatibility
-    logo_data = db.Column(db.Text, nullable=True)  # Logo stocké en base64
+    logo_data = db.deferred(db.Column(db.LargeBinary, nullable=True))  # Logo (chargé seulement à la demande)
+    logo_hash = db.Column(db.String(64), nullable=True)  # SHA-256 du logo (ETag, version des URL)
     logo_mime_type = db.Column(db.String(50), nullable=True)  # Type MIME du logo (image/png, image/jpeg, etc.)
     website_url = db.Column(db.String(500), nullable=True)
 
@@ -495,11 +507,15 @@ class Subscription(db.Model):
         return self.next_billing_date
 
     def __repr__(self):
-        return f'<Subscription {self.name} - {self.user.email}>'
+        return f'<Subscription {self.name} - user {self.user_id}>'
 
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        # Sert les listes filtrées de la page notifications et le tri par date
+        db.Index('ix_notifications_user_archived_read_created', 'user_id', 'archived', 'is_read', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -517,10 +533,10 @@ class Notification(db.Model):
     title = db.Column(db.String(200), nullable=False)
     message = db.Column(db.Text, nullable=False)
 
-    # État
-    is_read = db.Column(db.Boolean, default=False)
+    # État (active_history : l'ancienne valeur est connue des événements qui tiennent le compteur de non lues)
+    is_read = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
     is_sent = db.Column(db.Boolean, default=False)
-    archived = db.Column(db.Boolean, default=False)
+    archived = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
 
     # Dates
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -547,7 +563,72 @@ class Notification(db.Model):
         db.session.commit()
 
     def __repr__(self):
-        return f'<Notification {self.title} - {self.user.email}>'
+        return f'<Notification {self.title} - user {self.user_id}>'
+
+
+def _is_unread_notification(is_read, archived):
+    # Les anciennes lignes à NULL ne sont pas comptées, comme dans filter_by(is_read=False)
+    return is_read is False and archived is False
+
+
+def _adjust_unread_notifications_count(connection, user_id, delta):
+    """Incrémente ou décrémente en base le compteur de notifications non lues d'un utilisateur"""
+    users = User.__table__
+    connection.execute(
+        users.update()
+        .where(users.c.id == user_id)
+        .values(unread_notifications_count=users.c.unread_notifications_count + delta)
+    )
+
+
+@db.event.listens_for(Notification, 'after_insert')
+def _notification_inserted(mapper, connection, target):
+    if _is_unread_notification(target.is_read, target.archived):
+        _adjust_unread_notifications_count(connection, target.user_id, 1)
+
+
+@db.event.listens_for(Notification, 'after_update')
+def _notification_updated(mapper, connection, target):
+    state = db.inspect(target)
+    read_history = state.attrs.is_read.history
+    archived_history = state.attrs.archived.history
+    if not read_history.has_changes() and not archived_history.has_changes():
+        return
+
+    was_read = read_history.deleted[0] if read_history.deleted else target.is_read
+    was_archived = archived_history.deleted[0] if archived_history.deleted else target.archived
+    was_unread = _is_unread_notification(was_read, was_archived)
+    is_unread = _is_unread_notification(target.is_read, target.archived)
+    if was_unread != is_unread:
+        _adjust_unread_notifications_count(connection, target.user_id, 1 if is_unread else -1)
+
+
+@db.event.listens_for(Notification, 'after_delete')
+def _notification_deleted(mapper, connection, target):
+    if _is_unread_notification(target.is_read, target.archived):
+        _adjust_unread_notifications_count(connection, target.user_id, -1)
+
+
+class NotificationArchive(db.Model):
+    """Notification archivée au-delà de la durée de rétention (stockage compact, sans relations)"""
+    __tablename__ = 'notification_archives'
+
+    # Même identifiant que la notification d'origine
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+
+    type = db.Column(db.String(50), nullable=False)
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+
+    # Dates
+    created_at = db.Column(db.DateTime, nullable=True)
+    read_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=True)
+    moved_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<NotificationArchive {self.id} - {self.title}>'
 
 
 class CreditType(db.Model):
@@ -666,7 +747,7 @@ class Credit(db.Model):
         return round((paid / self.total_amount) * 100, 2)
 
     def __repr__(self):
-        return f'<Credit {self.name} - {self.user.email}>'
+        return f'<Credit {self.name} - user {self.user_id}>'
 
 
 class Employer(db.Model):
@@ -822,7 +903,7 @@ class Revenue(db.Model):
         return round(self.total_paid, 2)
 
     def __repr__(self):
-        return f'<Revenue {self.name} - {self.user.email}>'
+        return f'<Revenue {self.name} - user {self.user_id}>'
 
 
 class Bank(db.Model):
@@ -1454,3 +1535,109 @@ class DefaultBank(db.Model):
 
     def __repr__(self):
         return f'<DefaultBank {self.name} ({self.country_code})>'
+
+
+class BackupRecord(db.Model):
+    """Catalogue local des sauvegardes présentes sur le serveur SFTP"""
+    __tablename__ = 'backups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), unique=True, nullable=False)
+    backup_type = db.Column(db.String(20), nullable=False, index=True)  # 'manual', 'auto', 'incremental'
+    size = db.Column(db.BigInteger, nullable=False)  # Taille de l'archive en octets
+    sha256 = db.Column(db.String(64), nullable=True)  # Absent pour les anciennes sauvegardes
+    backup_date = db.Column(db.DateTime, nullable=False, index=True)
+
+    # Dates
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        """Format des sauvegardes de BackupManager.list_backups"""
+        return {
+            'filename': self.filename,
+            'size': self.size,
+            'modified': self.backup_date,
+            'size_mb': round(self.size / (1024 * 1024), 2),
+            'type': self.backup_type,
+            'sha256': self.sha256,
+        }
+
+    def __repr__(self):
+        return f'<BackupRecord {self.filename}>'
+
+
+class CatalogVersion(db.Model):
+    """Version du catalogue global, incrémentée à chaque modification (voir app.services.catalog)"""
+    __tablename__ = 'catalog_version'
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+def _set_logo_hash(target, value, oldvalue, initiator):
+    """Tient à jour l'empreinte du logo à chaque affectation de logo_data"""
+    target.logo_hash = hashlib.sha256(value).hexdigest() if value else None
+
+
+for _model in (Category, Service):
+    db.event.listen(_model.logo_data, 'set', _set_logo_hash)
+
+
+# Modèles contribuant aux agrégats de l'utilisateur (montants ou libellés des répartitions).
+# Les éléments globaux (user_id NULL) servent de libellés à tous les utilisateurs : leurs
+# modifications sont suivies par la version du catalogue.
+AGGREGATED_MODELS = (Subscription, Credit, Revenue, InstallmentPayment, CardPurchase, Employer, Category, Service, CreditType)
+
+
+def _bump_data_version(mapper, connection, target):
+    """
+    Invalide les agrégats mis en cache de l'utilisateur
+
+    Les éléments globaux (user_id NULL) ne touchent pas la table users : ils incrémentent
+    CatalogVersion (voir _bump_catalog_version), qui fait partie de la clé des agrégats.
+    """
+    if target.user_id is None:
+        return
+    users = User.__table__
+    connection.execute(users.update().where(users.c.id == target.user_id).values(data_version=users.c.data_version + 1))
+
+
+def _bump_data_version_if_modified(mapper, connection, target):
+    # after_update est aussi appelé pour les objets marqués modifiés sans changement de colonne
+    if db.inspect(target).session.is_modified(target, include_collections=False):
+        _bump_data_version(mapper, connection, target)
+
+
+for _model in AGGREGATED_MODELS:
+    db.event.listen(_model, 'after_insert', _bump_data_version)
+    db.event.listen(_model, 'after_update', _bump_data_version_if_modified)
+    db.event.listen(_model, 'after_delete', _bump_data_version)
+
+
+# Modèles du catalogue global : seules leurs lignes globales (sans user_id) en font partie
+CATALOG_MODELS = (Category, Service, ServicePlan, CreditType, Plan, DefaultBank)
+
+
+def _bump_catalog_version(mapper, connection, target):
+    """Invalide le catalogue global mis en cache dans chaque processus"""
+    if getattr(target, 'user_id', None) is not None:
+        return
+    versions = CatalogVersion.__table__
+    result = connection.execute(versions.update().values(version=versions.c.version + 1))
+    if result.rowcount == 0:
+        connection.execute(versions.insert().values(version=1))
+    # Le catalogue mémorisé pour la requête en cours n'est plus à jour
+    if has_app_context():
+        g.pop('catalog', None)
+
+
+def _bump_catalog_version_if_modified(mapper, connection, target):
+    if db.inspect(target).session.is_modified(target, include_collections=False):
+        _bump_catalog_version(mapper, connection, target)
+
+
+for _model in CATALOG_MODELS:
+    db.event.listen(_model, 'after_insert', _bump_catalog_version)
+    db.event.listen(_model, 'after_update', _bump_catalog_version_if_modified)
+    db.event.listen(_model, 'after_delete', _bump_catalog_version)
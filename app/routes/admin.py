@@ -318,9 +318,9 @@ def categories_add():
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -371,9 +371,9 @@ def categories_edit(category_id):
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                category.logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                category.logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -463,9 +463,9 @@ def services_add():
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -517,9 +517,9 @@ def services_edit(service_id):
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                service.logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                service.logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -757,9 +757,14 @@ def backups_manage():
 @login_required
 @admin_required
 def backup_list():
-    """Lister les sauvegardes disponibles (API JSON)"""
+    """Lister les sauvegardes disponibles (API JSON)
+
+    Lues depuis le catalogue local ; ?refresh=1 le réaligne d'abord sur le serveur SFTP.
+    """
     try:
         backup_manager = BackupManager()
+        if request.args.get('refresh'):
+            backup_manager.reconcile_catalog()
         backups = backup_manager.list_backups()
         backup_manager.disconnect_sftp()
 
@@ -811,14 +816,14 @@ def backup_download(filename):
     """Télécharger une sauvegarde"""
     try:
         # Vérifier que le nom de fichier est valide
-        if not filename.startswith('budgeefamily_backup_') or not filename.endswith('.tar.gz'):
+        if not BackupManager.is_backup_filename(filename):
             flash('Nom de fichier invalide', 'danger')
             return redirect(url_for('admin.dashboard'))
 
         backup_manager = BackupManager()
 
         # Télécharger dans un fichier temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.tar.gz') as tmp_file:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(filename)[1]) as tmp_file:
             if backup_manager.download_backup(filename, tmp_file.name):
                 backup_manager.disconnect_sftp()
 
@@ -827,7 +832,7 @@ def backup_download(filename):
                     tmp_file.name,
                     as_attachment=True,
                     download_name=filename,
-                    mimetype='application/gzip'
+                    mimetype='application/zstd' if filename.endswith('.zst') else 'application/gzip'
                 )
             else:
                 backup_manager.disconnect_sftp()
@@ -846,7 +851,7 @@ def backup_delete(filename):
     """Supprimer une sauvegarde"""
     try:
         # Vérifier que le nom de fichier est valide
-        if not filename.startswith('budgeefamily_backup_') or not filename.endswith('.tar.gz'):
+        if not BackupManager.is_backup_filename(filename):
             flash('Nom de fichier invalide', 'danger')
             return redirect(url_for('admin.backups_manage'))
 
@@ -2,24 +2,19 @@ from flask import Blueprint, request, jsonify, current_app, redirect, url_for, m
 from flask_login import login_required, current_user
 from flask_babel import gettext as _
 from app import db
-from app.models import User, Plan, Notification, Subscription, Category, Service
+from app.models import User, Plan, Notification, Subscription
+from app.services import aggregates
+from app.utils.logos import LOGO_MODELS, get_logo_info, get_logo_bytes, logo_version
 import stripe
 import os
-import base64
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 
-def init_stripe():
-    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-
-
 @bp.route('/create-checkout-session', methods=['POST'])
 @login_required
 def create_checkout_session():
     try:
-        init_stripe()
-
         # Récupérer le plan demandé (monthly par défaut, ou yearly)
         data = request.get_json() or {}
         plan_type = data.get('plan', 'monthly')  # 'monthly' ou 'yearly'
@@ -79,7 +74,6 @@ def checkout_success():
 
     if session_id:
         try:
-            init_stripe()
             session = stripe.checkout.Session.retrieve(session_id)
 
             if session.payment_status == 'paid':
@@ -153,8 +147,6 @@ def checkout_success():
 @login_required
 def create_portal_session():
     try:
-        init_stripe()
-
         if not current_user.stripe_customer_id:
             return jsonify({'error': 'Aucun abonnement Stripe trouvé'}), 400
 
@@ -314,28 +306,37 @@ def handle_invoice_payment_succeeded(invoice):
 
 @bp.route('/logo/<string:entity_type>/<int:entity_id>')
 def serve_logo(entity_type, entity_id):
-    """Sert les logos depuis la base de données"""
+    """Sert les logos depuis la base de données
+
+    L'ETag est l'empreinte du logo : une revalidation (If-None-Match) reçoit un 304
+    sans que le logo soit lu. Les URL versionnées par l'empreinte (?v=, voir
+    logo_version) sont mises en cache sans limite par le navigateur.
+    """
     try:
-        # Récupérer l'entité (service ou category)
-        if entity_type == 'service':
-            entity = Service.query.get_or_404(entity_id)
-        elif entity_type == 'category':
-            entity = Category.query.get_or_404(entity_id)
-        else:
+        if entity_type not in LOGO_MODELS:
             return jsonify({'error': 'Type invalide'}), 400
 
-        # Vérifier si le logo existe
-        if not entity.logo_data or not entity.logo_mime_type:
+        info = get_logo_info(entity_type, entity_id)
+        if info is None:
             return jsonify({'error': 'Logo non trouvé'}), 404
+        logo_hash, mime_type = info
 
-        # Décoder le base64
-        logo_bytes = base64.b64decode(entity.logo_data)
-
-        # Créer la réponse avec le bon MIME type
-        response = make_response(logo_bytes)
-        response.headers.set('Content-Type', entity.logo_mime_type)
-        response.headers.set('Cache-Control', 'public, max-age=86400')  # Cache 24h
+        if request.args.get('v') == logo_version(logo_hash):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'public, max-age=86400, must-revalidate'  # Cache 24h
 
+        if request.if_none_match.contains(logo_hash):
+            response = make_response('', 304)
+        else:
+            logo_bytes = get_logo_bytes(entity_type, entity_id, logo_hash)
+            if logo_bytes is None:
+                return jsonify({'error': 'Logo non trouvé'}), 404
+            response = make_response(logo_bytes)
+            response.headers.set('Content-Type', mime_type)
+
+        response.set_etag(logo_hash)
+        response.headers.set('Cache-Control', cache_control)
         return response
 
     except Exception as e:
@@ -487,88 +488,24 @@ def stats():
     })
 
 
+def chart_data(items, with_colors=False):
+    """Formate une répartition (liste de dict name, total, color) pour Chart.js"""
+    data = {
+        'labels': [item['name'] for item in items],
+        'values': [round(item['total'], 2) for item in items]
+    }
+    if with_colors:
+        data['colors'] = [item['color'] for item in items]
+    return data
+
+
 @bp.route('/subscriptions/distribution')
 @login_required
 def subscriptions_distribution():
     """API endpoint pour récupérer la répartition des abonnements actifs"""
-
-    # Récupérer tous les abonnements actifs de l'utilisateur
-    active_subscriptions = current_user.subscriptions.filter_by(is_active=True).all()
-
-    # Répartition par service
-    services_data = {}
-    for sub in active_subscriptions:
-        # Calculer le montant mensuel
-        if sub.billing_cycle == 'monthly':
-            monthly_amount = sub.amount
-        elif sub.billing_cycle == 'quarterly':
-            monthly_amount = sub.amount / 3
-        elif sub.billing_cycle == 'yearly':
-            monthly_amount = sub.amount / 12
-        elif sub.billing_cycle == 'weekly':
-            monthly_amount = sub.amount * 4
-        else:
-            monthly_amount = sub.amount
-
-        # Grouper par service
-        if sub.service:
-            service_name = sub.service.name
-        else:
-            service_name = 'Autre'
-
-        if service_name in services_data:
-            services_data[service_name] += monthly_amount
-        else:
-            services_data[service_name] = monthly_amount
-
-    # Répartition par catégorie avec couleurs
-    categories_data = {}
-    categories_colors = {}
-    for sub in active_subscriptions:
-        # Calculer le montant mensuel
-        if sub.billing_cycle == 'monthly':
-            monthly_amount = sub.amount
-        elif sub.billing_cycle == 'quarterly':
-            monthly_amount = sub.amount / 3
-        elif sub.billing_cycle == 'yearly':
-            monthly_amount = sub.amount / 12
-        elif sub.billing_cycle == 'weekly':
-            monthly_amount = sub.amount * 4
-        else:
-            monthly_amount = sub.amount
-
-        # Group by category
-        if sub.category:
-            category_name = sub.category.name
-            category_color = sub.category.color if sub.category.color else '#6c757d'
-        else:
-            category_name = 'Uncategorized'
-            category_color = '#6c757d'
-
-        if category_name in categories_data:
-            categories_data[category_name] += monthly_amount
-        else:
-            categories_data[category_name] = monthly_amount
-            categories_colors[category_name] = category_color
-
-    # Formater les données pour Chart.js
-    services_labels = list(services_data.keys())
-    services_values = [round(v, 2) for v in services_data.values()]
-
-    categories_labels = list(categories_data.keys())
-    categories_values = [round(v, 2) for v in categories_data.values()]
-    categories_colors_list = [categories_colors[label] for label in categories_labels]
-
     return jsonify({
-        'services': {
-            'labels': services_labels,
-            'values': services_values
-        },
-        'categories': {
-            'labels': categories_labels,
-            'values': categories_values,
-            'colors': categories_colors_list
-        }
+        'services': chart_data(aggregates.subscriptions_by_service(current_user)),
+        'categories': chart_data(aggregates.subscriptions_by_category(current_user), with_colors=True)
     })
 
 
@@ -576,49 +513,9 @@ def subscriptions_distribution():
 @login_required
 def credits_distribution():
     """API endpoint pour récupérer la répartition des crédits actifs par type"""
-
-    # Récupérer tous les crédits actifs de l'utilisateur
-    active_credits = current_user.credits.filter_by(is_active=True).all()
-
-    # Répartition par type de crédit avec couleurs
-    types_data = {}
-    types_colors = {}
-    for credit in active_credits:
-        # Calculer le montant mensuel
-        if credit.billing_cycle == 'monthly':
-            monthly_amount = credit.amount
-        elif credit.billing_cycle == 'quarterly':
-            monthly_amount = credit.amount / 3
-        elif credit.billing_cycle == 'yearly':
-            monthly_amount = credit.amount / 12
-        else:
-            monthly_amount = credit.amount
-
-        # Group by credit type
-        if credit.credit_type_obj:
-            type_name = credit.credit_type_obj.get_name(current_user.language or 'fr')
-            type_color = credit.credit_type_obj.color if credit.credit_type_obj.color else '#6c757d'
-        else:
-            type_name = 'No type'
-            type_color = '#6c757d'
-
-        if type_name in types_data:
-            types_data[type_name] += monthly_amount
-        else:
-            types_data[type_name] = monthly_amount
-            types_colors[type_name] = type_color
-
-    # Formater les données pour Chart.js
-    types_labels = list(types_data.keys())
-    types_values = [round(v, 2) for v in types_data.values()]
-    types_colors_list = [types_colors[label] for label in types_labels]
-
+    types = aggregates.credits_by_type(current_user, current_user.language or 'fr')
     return jsonify({
-        'types': {
-            'labels': types_labels,
-            'values': types_values,
-            'colors': types_colors_list
-        }
+        'types': chart_data(types, with_colors=True)
     })
 
 
@@ -626,74 +523,21 @@ def credits_distribution():
 @login_required
 def card_purchases_distribution():
     """API endpoint to retrieve active card purchases distribution"""
-    from app.models import CardPurchase
     from flask_babel import get_locale
 
     # Get filter parameters (month and year)
     filter_month = request.args.get('month', type=int)
     filter_year = request.args.get('year', type=int)
 
-    # Base query for active card purchases
-    query = current_user.card_purchases.filter_by(is_active=True)
-
-    # Apply month and year filters if provided
-    if filter_month and filter_year:
-        query = query.filter(
-            db.extract('month', CardPurchase.purchase_date) == filter_month,
-            db.extract('year', CardPurchase.purchase_date) == filter_year
-        )
-
-    active_purchases = query.all()
-
     # Get current locale for translations
     current_locale = str(get_locale())
 
-    # Distribution by merchant
-    merchants_data = {}
-    for purchase in active_purchases:
-        merchant_name = purchase.merchant_name if purchase.merchant_name else 'Other'
-
-        if merchant_name in merchants_data:
-            merchants_data[merchant_name] += purchase.amount
-        else:
-            merchants_data[merchant_name] = purchase.amount
-
-    # Distribution by category with colors (using translated names)
-    categories_data = {}
-    categories_colors = {}
-    for purchase in active_purchases:
-        if purchase.category:
-            # Use translated category name
-            category_name = purchase.category.get_name(locale=current_locale)
-            category_color = purchase.category.color if purchase.category.color else '#6c757d'
-        else:
-            category_name = 'Uncategorized'
-            category_color = '#6c757d'
-
-        if category_name in categories_data:
-            categories_data[category_name] += purchase.amount
-        else:
-            categories_data[category_name] = purchase.amount
-            categories_colors[category_name] = category_color
-
-    # Formater les données pour Chart.js
-    merchants_labels = list(merchants_data.keys())
-    merchants_values = [round(v, 2) for v in merchants_data.values()]
-
-    categories_labels = list(categories_data.keys())
-    categories_values = [round(v, 2) for v in categories_data.values()]
-    categories_colors_list = [categories_colors[label] for label in categories_labels]
+    merchants = aggregates.card_purchases_by_merchant(current_user, filter_month, filter_year)
+    categories = aggregates.card_purchases_by_category(current_user, current_locale, filter_month, filter_year)
 
     return jsonify({
-        'merchants': {
-            'labels': merchants_labels,
-            'values': merchants_values
-        },
-        'categories': {
-            'labels': categories_labels,
-            'values': categories_values,
-            'colors': categories_colors_list
-        }
+        'merchants': chart_data(merchants),
+        'categories': chart_data(categories, with_colors=True)
     })
 
 
@@ -701,7 +545,6 @@ def card_purchases_distribution():
 @login_required
 def revenues_distribution():
     """API endpoint pour récupérer la répartition des revenus actifs par type"""
-    from app.models import Revenue
     from app.routes.revenues import get_revenue_types
 
     # Définition des types de revenus avec couleurs (avec traductions)
@@ -710,44 +553,16 @@ def revenues_distribution():
     for code, name, icon, color in revenue_types_list:
         REVENUE_TYPES[code] = {'name': name, 'color': color}
 
-    # Récupérer tous les revenus actifs de l'utilisateur
-    active_revenues = current_user.revenues.filter_by(is_active=True).all()
-
-    # Répartition par type de revenu avec couleurs
+    # Grouper par libellé de type (les codes inconnus sont regroupés dans "Autre")
     types_data = {}
-    types_colors = {}
-    for revenue in active_revenues:
-        # Calculer le montant mensuel
-        if revenue.billing_cycle == 'monthly':
-            monthly_amount = revenue.amount
-        elif revenue.billing_cycle == 'quarterly':
-            monthly_amount = revenue.amount / 3
-        elif revenue.billing_cycle == 'yearly':
-            monthly_amount = revenue.amount / 12
+    for item in aggregates.revenues_by_type(current_user):
+        type_info = REVENUE_TYPES.get(item['code'], REVENUE_TYPES['other'])
+        if type_info['name'] in types_data:
+            types_data[type_info['name']]['total'] += item['total']
         else:
-            monthly_amount = revenue.amount
-
-        # Grouper par type de revenu
-        type_code = revenue.revenue_type if revenue.revenue_type else 'other'
-        type_info = REVENUE_TYPES.get(type_code, REVENUE_TYPES['other'])
-        type_name = type_info['name']
-        type_color = type_info['color']
-
-        if type_name in types_data:
-            types_data[type_name] += monthly_amount
-        else:
-            types_data[type_name] = monthly_amount
-            types_colors[type_name] = type_color
-
-    # Formater les données pour Chart.js
-    types_labels = list(types_data.keys())
-    types_values = [round(v, 2) for v in types_data.values()]
-    types_colors_list = [types_colors[label] for label in types_labels]
+            types_data[type_info['name']] = {'name': type_info['name'], 'color': type_info['color'], 'total': item['total']}
 
+    types = sorted(types_data.values(), key=lambda item: item['total'], reverse=True)
     return jsonify({
-        'types': {
-            'labels': types_labels,
-            'values': types_values,
-            'colors': types_colors_list
-        }
+        'types': chart_data(types, with_colors=True)
     })
@@ -9,7 +9,9 @@ from app import db, limiter
 from app.models import Bank, BankDocument, BankAccount, DefaultBank
 from app.utils.file_security import validate_upload, get_safe_content_disposition
 from app.routes.bank_accounts import get_account_type_label
+from app.services import catalog
 import base64
+from sqlalchemy import func, select
 
 bp = Blueprint('banks', __name__, url_prefix='/banks')
 
@@ -94,7 +96,14 @@ def list_banks():
         page=page, per_page=10, error_out=False
     )
 
-    return render_template('banks/list.html', banks=banks, filter_status=filter_status)
+    # Nombre de documents par banque de la page, en une seule requête
+    document_counts = dict(db.session.execute(
+        select(BankDocument.bank_id, func.count())
+        .where(BankDocument.bank_id.in_([bank.id for bank in banks.items]))
+        .group_by(BankDocument.bank_id)
+    ).all())
+
+    return render_template('banks/list.html', banks=banks, document_counts=document_counts, filter_status=filter_status)
 
 
 @bp.route('/add', methods=['GET', 'POST'])
@@ -138,10 +147,7 @@ def add():
 
     # Récupérer les banques par défaut en fonction de la langue de l'utilisateur
     user_language = current_user.language or 'fr'
-    default_banks = DefaultBank.query.filter_by(
-        language=user_language,
-        is_active=True
-    ).order_by(DefaultBank.name).all()
+    default_banks = catalog.default_banks(user_language)
 
     return render_template('banks/add.html', default_banks=default_banks)
 
@@ -2,15 +2,26 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request,
 from flask_login import login_required, current_user
 from app import db, limiter
 from app.models import CardPurchase, Category, Transaction
+from app.services import catalog
 from app.utils.file_security import validate_upload, get_safe_content_disposition
-from app.utils.ocr_processor import process_receipt_ocr
+from app.utils.metrics import track_ocr
 from datetime import datetime
 import json
 import base64
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('card_purchases', __name__, url_prefix='/card-purchases')
 
 
+def get_purchase_categories():
+    """Active card purchase categories: global ones from the cached catalog plus the user's own, sorted by name"""
+    custom_categories = current_user.custom_categories.filter(
+        Category.is_active == True,
+        Category.category_type.in_(catalog.CARD_PURCHASE_CATEGORY_TYPES)
+    ).all()
+    return catalog.sort_by_name(catalog.global_categories(catalog.CARD_PURCHASE_CATEGORY_TYPES) + custom_categories)
+
+
 @bp.route('/')
 @login_required
 def list_purchases():
@@ -42,21 +53,12 @@ def list_purchases():
             db.extract('year', CardPurchase.purchase_date) == filter_year
         )
 
-    purchases = query.order_by(CardPurchase.purchase_date.desc()).paginate(
+    purchases = query.options(joinedload(CardPurchase.category)).order_by(CardPurchase.purchase_date.desc()).paginate(
         page=page, per_page=20, error_out=False
     )
 
     # Get categories for filter (only those for card purchases or 'all')
-    categories = Category.query.filter(
-        db.or_(
-            Category.user_id == current_user.id,
-            Category.user_id == None
-        ),
-        db.or_(
-            Category.category_type == 'card_purchase',
-            Category.category_type == 'all'
-        )
-    ).filter_by(is_active=True).order_by(Category.name).all()
+    categories = get_purchase_categories()
 
     return render_template('card_purchases/list.html',
                          purchases=purchases,
@@ -73,16 +75,7 @@ def add_manual():
     """Add a card purchase manually (default mode)"""
 
     # Get categories (only those for card purchases or 'all')
-    categories = Category.query.filter(
-        db.or_(
-            Category.user_id == current_user.id,
-            Category.user_id == None
-        ),
-        db.or_(
-            Category.category_type == 'card_purchase',
-            Category.category_type == 'all'
-        )
-    ).filter_by(is_active=True).order_by(Category.name).all()
+    categories = get_purchase_categories()
 
     if request.method == 'POST':
         try:
@@ -169,6 +162,9 @@ def add_manual():
 @limiter.limit("50 per hour")
 def upload_receipts():
     """Multiple upload with OCR processing and validation grid"""
+    # OpenCV, Tesseract et pdf2image ne sont chargés que par les workers qui traitent des reçus
+    from app.utils.ocr_processor import process_receipt_ocr
+
 
     # Check if user has Premium access
     if not current_user.is_premium():
@@ -208,7 +204,8 @@ def upload_receipts():
                 logger = logging.getLogger(__name__)
                 logger.info(f"OCR processing {safe_filename} ({file.content_type}, {len(file_data)} bytes)")
 
-                ocr_data = process_receipt_ocr(file_data)
+                with track_ocr():
+                    ocr_data = process_receipt_ocr(file_data)
 
                 logger.info(f"OCR successful: {ocr_data['merchant_name']}, {ocr_data['amount']}€, confidence={ocr_data['ocr_confidence']:.1f}%")
 
@@ -243,16 +240,7 @@ def upload_receipts():
             return redirect(url_for('card_purchases.upload_receipts'))
 
         # Get categories for form (only those for card purchases or 'all')
-        categories = Category.query.filter(
-            db.or_(
-                Category.user_id == current_user.id,
-                Category.user_id == None
-            ),
-            db.or_(
-                Category.category_type == 'card_purchase',
-                Category.category_type == 'all'
-            )
-        ).filter_by(is_active=True).order_by(Category.name).all()
+        categories = get_purchase_categories()
 
         return render_template('card_purchases/validate.html',
                              receipts=processed_receipts,
@@ -445,16 +433,7 @@ def edit(purchase_id):
         return redirect(url_for('card_purchases.detail', purchase_id=purchase.id))
 
     # Get categories (only those for card purchases or 'all')
-    categories = Category.query.filter(
-        db.or_(
-            Category.user_id == current_user.id,
-            Category.user_id == None
-        ),
-        db.or_(
-            Category.category_type == 'card_purchase',
-            Category.category_type == 'all'
-        )
-    ).filter_by(is_active=True).order_by(Category.name).all()
+    categories = get_purchase_categories()
 
     return render_template('card_purchases/edit.html',
                          purchase=purchase,
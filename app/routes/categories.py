@@ -2,10 +2,11 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from app import db
-from app.models import Category
+from app.models import Category, Subscription, hidden_categories
+from app.services import catalog
+from sqlalchemy import func, select
 import os
 from config import Config
-import base64
 import mimetypes
 
 bp = Blueprint('categories', __name__, url_prefix='/categories')
@@ -21,34 +22,32 @@ def allowed_file(filename):
 @login_required
 def list():
     """Liste toutes les catégories (globales + personnalisées de l'utilisateur)"""
-    # Catégories globales (par défaut) - toujours actives et non masquées
+    # Catégories globales (par défaut) - toujours actives et non masquées, depuis le catalogue en cache
     # Filtrer uniquement les catégories d'abonnements
-    all_global_categories = Category.query.filter_by(
-        user_id=None,
-        is_active=True
-    ).filter(
-        db.or_(
-            Category.category_type == 'subscription',
-            Category.category_type == 'all'
-        )
-    ).order_by(Category.name).all()
-
-    # Filtrer les catégories masquées par l'utilisateur
-    hidden_ids = [cat.id for cat in current_user.hidden_categories_list]
-    global_categories = [cat for cat in all_global_categories if cat.id not in hidden_ids]
+    hidden_ids = set(db.session.scalars(
+        select(hidden_categories.c.category_id).where(hidden_categories.c.user_id == current_user.id)
+    ))
+    global_categories = [
+        cat for cat in catalog.global_categories(catalog.SUBSCRIPTION_CATEGORY_TYPES) if cat.id not in hidden_ids
+    ]
 
     # Catégories personnalisées de l'utilisateur (actives ET inactives)
     # Filtrer uniquement les catégories d'abonnements
     custom_categories = current_user.custom_categories.filter(
-        db.or_(
-            Category.category_type == 'subscription',
-            Category.category_type == 'all'
-        )
+        Category.category_type.in_(catalog.SUBSCRIPTION_CATEGORY_TYPES)
     ).order_by(Category.name).all()
 
+    # Nombre d'abonnements actifs par catégorie, en une seule requête
+    subscription_counts = dict(db.session.execute(
+        select(Subscription.category_id, func.count())
+        .where(Subscription.user_id == current_user.id, Subscription.is_active == True)
+        .group_by(Subscription.category_id)
+    ).all())
+
     return render_template('categories/list.html',
                          global_categories=global_categories,
-                         custom_categories=custom_categories)
+                         custom_categories=custom_categories,
+                         subscription_counts=subscription_counts)
 
 
 @bp.route('/add', methods=['GET', 'POST'])
@@ -83,9 +82,9 @@ def add():
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -156,9 +155,9 @@ def edit(category_id):
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                category.logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                category.logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
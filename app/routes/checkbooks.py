@@ -7,6 +7,9 @@ from flask_babel import gettext as _
 from app import db
 from app.models import Checkbook, Check, Bank, Transaction
 from datetime import datetime
+from collections import defaultdict
+from sqlalchemy import select, func
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('checkbooks', __name__, url_prefix='/checkbooks')
 
@@ -31,16 +34,26 @@ def list_checkbooks():
     if filter_bank:
         query = query.filter_by(bank_id=filter_bank)
 
-    checkbooks = query.order_by(Checkbook.created_at.desc()).paginate(
+    checkbooks = query.options(joinedload(Checkbook.bank)).order_by(Checkbook.created_at.desc()).paginate(
         page=page, per_page=10, error_out=False
     )
 
+    # Nombre de chèques par chéquier de la page et par statut, en une seule requête
+    check_counts = defaultdict(dict)
+    for checkbook_id, status, count in db.session.execute(
+        select(Check.checkbook_id, Check.status, func.count())
+        .where(Check.checkbook_id.in_([checkbook.id for checkbook in checkbooks.items]))
+        .group_by(Check.checkbook_id, Check.status)
+    ):
+        check_counts[checkbook_id][status] = count
+
     # Get user's banks for filter dropdown
     banks = current_user.banks.filter_by(is_active=True).order_by(Bank.name).all()
 
     return render_template('checkbooks/list.html',
                          checkbooks=checkbooks,
                          banks=banks,
+                         check_counts=check_counts,
                          filter_status=filter_status,
                          filter_bank=filter_bank)
 
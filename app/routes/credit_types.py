@@ -3,6 +3,7 @@ from flask_login import login_required, current_user
 from flask_babel import gettext as _
 from app import db
 from app.models import CreditType
+from app.services import catalog
 
 bp = Blueprint('credit_types', __name__, url_prefix='/credit-types')
 
@@ -11,8 +12,8 @@ bp = Blueprint('credit_types', __name__, url_prefix='/credit-types')
 @login_required
 def list():
     """Liste tous les types de crédits (globaux + personnalisés de l'utilisateur)"""
-    # Types globaux (par défaut)
-    global_types = CreditType.query.filter_by(user_id=None, is_active=True).order_by(CreditType.name).all()
+    # Types globaux (par défaut), depuis le catalogue en cache
+    global_types = catalog.global_credit_types()
 
     # Types personnalisés de l'utilisateur
     custom_types = current_user.custom_credit_types.order_by(CreditType.name).all()
@@ -3,10 +3,12 @@ from flask_login import login_required, current_user
 from flask_babel import gettext as _
 from app import db, limiter
 from app.models import Credit, Category, CreditType, CreditDocument, Bank, Notification
+from app.services import catalog
 from app.utils.transactions import generate_future_transactions, update_future_transactions, cancel_future_transactions, calculate_next_future_date, delete_all_transactions
 from app.utils.file_security import validate_upload, get_safe_content_disposition
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import joinedload
 
 bp = Blueprint('credits', __name__, url_prefix='/credits')
 
@@ -42,8 +44,8 @@ def get_document_type_info(type_code):
 
 def get_user_categories():
     """Récupère les catégories globales et personnalisées de l'utilisateur actuel"""
-    # Catégories globales (par défaut)
-    global_categories = Category.query.filter_by(user_id=None, is_active=True).order_by(Category.name).all()
+    # Catégories globales (par défaut), depuis le catalogue en cache
+    global_categories = catalog.global_categories()
 
     # Catégories personnalisées de l'utilisateur
     custom_categories = current_user.custom_categories.filter_by(is_active=True).order_by(Category.name).all()
@@ -54,8 +56,8 @@ def get_user_categories():
 
 def get_user_credit_types():
     """Récupère les types de crédits globaux et personnalisés de l'utilisateur actuel"""
-    # Types globaux (par défaut)
-    global_types = CreditType.query.filter_by(user_id=None, is_active=True).order_by(CreditType.name).all()
+    # Types globaux (par défaut), depuis le catalogue en cache
+    global_types = catalog.global_credit_types()
 
     # Types personnalisés de l'utilisateur
     custom_types = current_user.custom_credit_types.filter_by(is_active=True).order_by(CreditType.name).all()
@@ -85,7 +87,7 @@ def list_credits():
     if filter_type_id:
         query = query.filter_by(credit_type_id=filter_type_id)
 
-    credits = query.order_by(Credit.next_payment_date).paginate(
+    credits = query.options(joinedload(Credit.credit_type_obj)).order_by(Credit.next_payment_date).paginate(
         page=page, per_page=10, error_out=False
     )
 
@@ -7,6 +7,7 @@ from app.utils.file_security import validate_upload, get_safe_content_dispositio
 from datetime import datetime
 import base64
 import io
+from sqlalchemy import func, select
 
 bp = Blueprint('employers', __name__, url_prefix='/employers')
 
@@ -67,8 +68,16 @@ def employer_list():
         page=page, per_page=10, error_out=False
     )
 
+    # Nombre de documents par employeur de la page, en une seule requête
+    document_counts = dict(db.session.execute(
+        select(EmployerDocument.employer_id, func.count())
+        .where(EmployerDocument.employer_id.in_([employer.id for employer in employers.items]))
+        .group_by(EmployerDocument.employer_id)
+    ).all())
+
     return render_template('employers/list.html',
                          employers=employers,
+                         document_counts=document_counts,
                          filter_status=filter_status)
 
 
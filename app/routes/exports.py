@@ -1,28 +1,38 @@
 """
 Routes pour les exports PDF et Excel (fonctionnalité Premium uniquement)
 """
-from flask import Blueprint, send_file, flash, redirect, url_for
+from flask import Blueprint, Response, send_file, flash, redirect, url_for, request, render_template, jsonify, abort, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from functools import wraps
-from sqlalchemy import func
-from app import db
-from app.models import Subscription, Category, Service, Credit, Revenue, Transaction
-from app.utils.exports import (
-    export_upcoming_renewals_excel, export_upcoming_renewals_pdf,
-    export_category_distribution_excel, export_category_distribution_pdf,
-    export_monthly_evolution_excel, export_monthly_evolution_pdf,
-    export_subscriptions_excel, export_subscriptions_pdf,
-    export_categories_excel, export_categories_pdf,
-    export_services_excel, export_services_pdf,
-    export_upcoming_credits_excel, export_upcoming_credits_pdf,
-    export_upcoming_revenues_excel, export_upcoming_revenues_pdf,
-    export_revenue_distribution_excel, export_revenue_distribution_pdf,
-    export_unpointed_checks_excel, export_unpointed_checks_pdf
-)
+from sqlalchemy.orm import joinedload
+from app.models import Subscription, Category, Service, Credit, Revenue, Transaction, Employer, hidden_services
+from app.utils.transaction_export import EXPORT_FORMATS, TRANSACTION_SOURCE_TYPES, stream_transactions_export
+from app.utils.pdf_reports import REPORT_READY, REPORT_ERROR, get_or_submit_report
+from app.services import aggregates
 
 bp = Blueprint('exports', __name__, url_prefix='/exports')
 
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Nombre de lignes chargées à la fois depuis le curseur côté serveur pour les exports en flux
+EXPORT_BATCH_SIZE = 500
+
+
+def excel_response(chunks, download_name):
+    """Réponse HTTP envoyant un export Excel au fil de sa génération"""
+    return Response(
+        stream_with_context(chunks),
+        mimetype=XLSX_MIMETYPE,
+        headers={'Content-Disposition': f'attachment; filename="{download_name}"'}
+    )
+
+
+def export_functions():
+    """Fonctions d'export PDF et Excel, importées au premier export plutôt qu'au démarrage des workers (reportlab)"""
+    from app.utils import exports
+    return exports
+
 
 def premium_required(f):
     """Décorateur pour vérifier que l'utilisateur est Premium"""
@@ -35,292 +45,115 @@ def premium_required(f):
     return decorated_function
 
 
-@bp.route('/dashboard/upcoming-renewals/<format>')
-@login_required
-@premium_required
-def export_upcoming_renewals(format):
-    """Exporte les prochains renouvellements"""
-    # Récupérer les 30 prochains jours
-    upcoming_renewals = Subscription.query.filter_by(
-        user_id=current_user.id,
-        is_active=True
-    ).filter(
-        Subscription.next_billing_date <= datetime.now().date() + timedelta(days=30)
-    ).order_by(Subscription.next_billing_date).all()
+def pdf_report_response(report_type):
+    """Sert un rapport PDF depuis le cache, ou lance son rendu en arrière-plan et affiche la page d'attente"""
+    data_function, pdf_name, sources, download_prefix = PDF_REPORTS[report_type]
+    status, pdf_path = get_or_submit_report(
+        current_user.id, report_type, sources,
+        lambda user: getattr(export_functions(), pdf_name)(data_function(user), user)
+    )
 
-    if format == 'excel':
-        output = export_upcoming_renewals_excel(upcoming_renewals, current_user)
+    if status == REPORT_READY:
         return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'abonnements_prochains_renouvellements_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_upcoming_renewals_pdf(upcoming_renewals, current_user)
-        return send_file(
-            output,
+            pdf_path,
             mimetype='application/pdf',
             as_attachment=True,
-            download_name=f'abonnements_prochains_renouvellements_{datetime.now().strftime("%Y%m%d")}.pdf'
+            download_name=f'{download_prefix}_{datetime.now().strftime("%Y%m%d")}.pdf'
         )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
+    if status == REPORT_ERROR:
+        flash('Erreur lors de la génération du rapport PDF. Veuillez réessayer.', 'danger')
+        return redirect(request.referrer or url_for('main.dashboard'))
+
+    return render_template(
+        'exports/report_pending.html',
+        status_url=url_for('exports.pdf_report_status', report_type=report_type),
+        download_url=request.url
+    )
 
 
-@bp.route('/dashboard/upcoming-credits/<format>')
-@login_required
-@premium_required
-def export_upcoming_credits(format):
-    """Exporte les prochains prélèvements pour les crédits"""
-    # Récupérer tous les crédits actifs
-    upcoming_credits = Credit.query.filter_by(
-        user_id=current_user.id,
+# Données des exports (partagées entre les formats Excel et PDF)
+
+def get_upcoming_renewals(user):
+    """Abonnements actifs renouvelés dans les 30 prochains jours"""
+    return Subscription.query.filter_by(
+        user_id=user.id,
         is_active=True
-    ).order_by(Credit.next_payment_date).all()
+    ).filter(
+        Subscription.next_billing_date <= datetime.now().date() + timedelta(days=30)
+    ).order_by(Subscription.next_billing_date).all()
 
-    if format == 'excel':
-        output = export_upcoming_credits_excel(upcoming_credits, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'credits_prochains_prelevements_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_upcoming_credits_pdf(upcoming_credits, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'credits_prochains_prelevements_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
 
+def get_upcoming_credits(user):
+    """Crédits actifs, par date de prochain prélèvement"""
+    return Credit.query.filter_by(
+        user_id=user.id,
+        is_active=True
+    ).order_by(Credit.next_payment_date).all()
 
-@bp.route('/dashboard/upcoming-revenues/<format>')
-@login_required
-@premium_required
-def export_upcoming_revenues(format):
-    """Exporte les prochains versements pour les revenus"""
-    # Récupérer tous les revenus actifs
-    upcoming_revenues = Revenue.query.filter_by(
-        user_id=current_user.id,
+
+def get_upcoming_revenues(user):
+    """Revenus actifs, par date de prochain versement"""
+    return Revenue.query.filter_by(
+        user_id=user.id,
         is_active=True
     ).order_by(Revenue.next_payment_date).all()
 
-    if format == 'excel':
-        output = export_upcoming_revenues_excel(upcoming_revenues, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'revenus_prochains_versements_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_upcoming_revenues_pdf(upcoming_revenues, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'revenus_prochains_versements_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
-
 
-@bp.route('/dashboard/unpointed-checks/<format>')
-@login_required
-@premium_required
-def export_unpointed_checks(format):
-    """Exporte les chèques non débités (non pointés)"""
-    # Récupérer les chèques non pointés
-    unpointed_checks = Transaction.query.filter(
-        Transaction.user_id == current_user.id,
+def unpointed_checks_query(user):
+    """Requête des chèques émis et non débités (non pointés)"""
+    return Transaction.query.filter(
+        Transaction.user_id == user.id,
         Transaction.transaction_type == 'check',
         Transaction.status == 'completed',
         Transaction.is_pointed == False
-    ).order_by(Transaction.transaction_date.desc()).all()
-
-    if format == 'excel':
-        output = export_unpointed_checks_excel(unpointed_checks, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'cheques_non_debites_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_unpointed_checks_pdf(unpointed_checks, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'cheques_non_debites_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
-
-
-@bp.route('/dashboard/category-distribution/<format>')
-@login_required
-@premium_required
-def export_category_distribution(format):
-    """Exporte la répartition des abonnements et crédits par catégorie"""
-    # Utiliser la même logique que le dashboard
-    # Répartition par catégorie (abonnements + crédits) - même requête que le dashboard
-    category_stats = db.session.query(
-        Category.name,
-        Category.color,
-        func.count(Subscription.id).label('subscription_count'),
-        func.sum(Subscription.amount).label('subscription_total'),
-        func.count(Credit.id).label('credit_count'),
-        func.sum(Credit.amount).label('credit_total'),
-        (func.coalesce(func.sum(Subscription.amount), 0) + func.coalesce(func.sum(Credit.amount), 0)).label('total')
-    ).outerjoin(Subscription,
-        (Subscription.category_id == Category.id) &
-        (Subscription.user_id == current_user.id) &
-        (Subscription.is_active == True)
-    ).outerjoin(Credit,
-        (Credit.category_id == Category.id) &
-        (Credit.user_id == current_user.id) &
-        (Credit.is_active == True)
-    ).filter(
-        (Subscription.id != None) | (Credit.id != None)
-    ).group_by(Category.id).all()
-
-    # Convertir en liste de dictionnaires
-    category_data = []
-    for stat in category_stats:
-        category_data.append({
-            'name': stat.name,
-            'color': stat.color,
-            'count': (stat.subscription_count or 0) + (stat.credit_count or 0),
-            'amount': stat.total
-        })
-
-    # Calculer le total des crédits actifs pour la catégorie "Crédits"
-    credits = Credit.query.filter_by(
-        user_id=current_user.id,
-        is_active=True
-    ).all()
-
-    total_credits = sum(
-        credit.amount if credit.billing_cycle == 'monthly' else
-        credit.amount / 3 if credit.billing_cycle == 'quarterly' else
-        credit.amount / 12 if credit.billing_cycle == 'yearly' else 0
-        for credit in credits
-    )
-
-    # Ajouter la catégorie "Crédits" si elle a un montant
-    if total_credits > 0:
+    ).order_by(Transaction.transaction_date.desc())
+
+
+def get_category_distribution(user):
+    """Répartition des abonnements et crédits par catégorie (même logique que le dashboard)"""
+    category_data = [
+        {
+            'name': stat['name'],
+            'color': stat['color'],
+            'count': (stat['subscription_count'] or 0) + (stat['credit_count'] or 0),
+            'amount': stat['total']
+        }
+        for stat in aggregates.category_stats(user)
+    ]
+
+    # Ajouter la catégorie "Crédits" si les crédits actifs ont un montant
+    totals = aggregates.monthly_totals(user)
+    if totals['credits'] > 0:
         category_data.append({
             'name': 'Crédits',
             'color': '#ffc107',
-            'count': len(credits),
-            'amount': total_credits
+            'count': totals['credit_count'],
+            'amount': totals['credits']
         })
 
-    category_list = sorted(category_data, key=lambda x: x['amount'], reverse=True)
+    return sorted(category_data, key=lambda x: x['amount'], reverse=True)
 
-    if format == 'excel':
-        output = export_category_distribution_excel(category_list, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'repartition_categories_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_category_distribution_pdf(category_list, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'repartition_categories_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
 
-
-@bp.route('/dashboard/revenue-distribution/<format>')
-@login_required
-@premium_required
-def export_revenue_distribution(format):
-    """Exporte la répartition des versements (revenus)"""
-    # Calculer la répartition par employeur
-    revenues = Revenue.query.filter_by(
-        user_id=current_user.id,
-        is_active=True
-    ).all()
-
-    revenue_data = {}
-    for revenue in revenues:
-        if revenue.employer:
-            employer_name = revenue.employer.name
-        else:
-            employer_name = 'Autres revenus'
-
-        monthly_amount = revenue.amount
-
-        # Convertir en montant mensuel selon le cycle
-        if revenue.billing_cycle == 'yearly':
-            monthly_amount = revenue.amount / 12
-        elif revenue.billing_cycle == 'quarterly':
-            monthly_amount = revenue.amount / 3
-
-        if employer_name not in revenue_data:
-            revenue_data[employer_name] = {'name': employer_name, 'total': 0}
-
-        revenue_data[employer_name]['total'] += monthly_amount
-
-    revenue_list = sorted(revenue_data.values(), key=lambda x: x['total'], reverse=True)
-
-    if format == 'excel':
-        output = export_revenue_distribution_excel(revenue_list, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'repartition_revenus_{datetime.now().strftime("%Y%m%d")}.xlsx'
-        )
-    elif format == 'pdf':
-        output = export_revenue_distribution_pdf(revenue_list, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'repartition_revenus_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
-    else:
-        flash('Format non supporté', 'danger')
-        return redirect(url_for('main.dashboard'))
+def get_revenue_distribution(user):
+    """Répartition mensuelle des versements (revenus) par employeur"""
+    return aggregates.revenues_by_employer(user)
 
 
-@bp.route('/dashboard/monthly-evolution/<format>')
-@login_required
-@premium_required
-def export_monthly_evolution(format):
-    """Exporte l'évolution des revenus et dépenses mensuelles"""
+def get_monthly_evolution(user):
+    """Évolution des revenus et dépenses mensuelles sur les 12 derniers mois"""
     # Récupérer tous les éléments actifs
     subscriptions = Subscription.query.filter_by(
-        user_id=current_user.id,
+        user_id=user.id,
         is_active=True
     ).all()
 
     credits = Credit.query.filter_by(
-        user_id=current_user.id,
+        user_id=user.id,
         is_active=True
     ).all()
 
     revenues = Revenue.query.filter_by(
-        user_id=current_user.id,
+        user_id=user.id,
         is_active=True
     ).all()
 
@@ -373,22 +206,192 @@ def export_monthly_evolution(format):
             'revenues': revenue_total
         })
 
+    return monthly_data
+
+
+def subscriptions_query(user):
+    """Requête de la liste des abonnements, avec catégorie et service chargés"""
+    return Subscription.query.filter_by(user_id=user.id).options(
+        joinedload(Subscription.category),
+        joinedload(Subscription.service)
+    ).order_by(Subscription.created_at.desc())
+
+
+def get_user_categories(user):
+    """Catégories personnalisées de l'utilisateur puis catégories globales"""
+    custom_categories = Category.query.filter_by(user_id=user.id).order_by(Category.name).all()
+    global_categories = Category.query.filter_by(user_id=None, is_active=True).order_by(Category.name).all()
+
+    return custom_categories + global_categories
+
+
+def get_user_services(user):
+    """Services personnalisés de l'utilisateur puis services globaux non masqués"""
+    custom_services = Service.query.filter_by(user_id=user.id).order_by(Service.name).all()
+    global_services = Service.query.filter_by(user_id=None, is_active=True).filter(
+        ~Service.hidden_by_users.any(id=user.id)
+    ).order_by(Service.name).all()
+
+    return custom_services + global_services
+
+
+# Rapports PDF rendus en arrière-plan : type -> (données, nom de la fonction de rendu, sources des données, nom du fichier)
+# Les sources (modèles et tables) servent à détecter les changements de données pour le cache
+PDF_REPORTS = {
+    'upcoming-renewals': (get_upcoming_renewals, 'export_upcoming_renewals_pdf',
+                          (Subscription,), 'abonnements_prochains_renouvellements'),
+    'upcoming-credits': (get_upcoming_credits, 'export_upcoming_credits_pdf',
+                         (Credit,), 'credits_prochains_prelevements'),
+    'upcoming-revenues': (get_upcoming_revenues, 'export_upcoming_revenues_pdf',
+                          (Revenue, Employer), 'revenus_prochains_versements'),
+    'unpointed-checks': (lambda user: unpointed_checks_query(user).all(), 'export_unpointed_checks_pdf',
+                         (Transaction,), 'cheques_non_debites'),
+    'category-distribution': (get_category_distribution, 'export_category_distribution_pdf',
+                              (Category, Subscription, Credit), 'repartition_categories'),
+    'revenue-distribution': (get_revenue_distribution, 'export_revenue_distribution_pdf',
+                             (Revenue, Employer), 'repartition_revenus'),
+    'monthly-evolution': (get_monthly_evolution, 'export_monthly_evolution_pdf',
+                          (Subscription, Credit, Revenue), 'evolution_mensuelle'),
+    'subscriptions': (lambda user: subscriptions_query(user).all(), 'export_subscriptions_pdf',
+                      (Subscription, Category, Service), 'mes_abonnements'),
+    'categories': (get_user_categories, 'export_categories_pdf',
+                   (Category,), 'mes_categories'),
+    'services': (get_user_services, 'export_services_pdf',
+                 (Service, hidden_services), 'mes_services'),
+}
+
+
+@bp.route('/reports/<report_type>/status')
+@login_required
+@premium_required
+def pdf_report_status(report_type):
+    """État du rendu d'un rapport PDF (interrogé par la page d'attente)"""
+    if report_type not in PDF_REPORTS:
+        abort(404)
+
+    data_function, pdf_name, sources, _ = PDF_REPORTS[report_type]
+    status, _ = get_or_submit_report(
+        current_user.id, report_type, sources,
+        lambda user: getattr(export_functions(), pdf_name)(data_function(user), user)
+    )
+    return jsonify({'status': status})
+
+
+@bp.route('/dashboard/upcoming-renewals/<format>')
+@login_required
+@premium_required
+def export_upcoming_renewals(format):
+    """Exporte les prochains renouvellements"""
     if format == 'excel':
-        output = export_monthly_evolution_excel(monthly_data, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'evolution_mensuelle_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return excel_response(
+            export_functions().export_upcoming_renewals_excel(get_upcoming_renewals(current_user), current_user),
+            f'abonnements_prochains_renouvellements_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
     elif format == 'pdf':
-        output = export_monthly_evolution_pdf(monthly_data, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'evolution_mensuelle_{datetime.now().strftime("%Y%m%d")}.pdf'
+        return pdf_report_response('upcoming-renewals')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/upcoming-credits/<format>')
+@login_required
+@premium_required
+def export_upcoming_credits(format):
+    """Exporte les prochains prélèvements pour les crédits"""
+    if format == 'excel':
+        return excel_response(
+            export_functions().export_upcoming_credits_excel(get_upcoming_credits(current_user), current_user),
+            f'credits_prochains_prelevements_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+    elif format == 'pdf':
+        return pdf_report_response('upcoming-credits')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/upcoming-revenues/<format>')
+@login_required
+@premium_required
+def export_upcoming_revenues(format):
+    """Exporte les prochains versements pour les revenus"""
+    if format == 'excel':
+        return excel_response(
+            export_functions().export_upcoming_revenues_excel(get_upcoming_revenues(current_user), current_user),
+            f'revenus_prochains_versements_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+    elif format == 'pdf':
+        return pdf_report_response('upcoming-revenues')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/unpointed-checks/<format>')
+@login_required
+@premium_required
+def export_unpointed_checks(format):
+    """Exporte les chèques non débités (non pointés)"""
+    if format == 'excel':
+        # Lignes lues par lots depuis un curseur côté serveur pendant l'envoi
+        return excel_response(
+            export_functions().export_unpointed_checks_excel(unpointed_checks_query(current_user).yield_per(EXPORT_BATCH_SIZE), current_user),
+            f'cheques_non_debites_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
+    elif format == 'pdf':
+        return pdf_report_response('unpointed-checks')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/category-distribution/<format>')
+@login_required
+@premium_required
+def export_category_distribution(format):
+    """Exporte la répartition des abonnements et crédits par catégorie"""
+    if format == 'excel':
+        return excel_response(
+            export_functions().export_category_distribution_excel(get_category_distribution(current_user), current_user),
+            f'repartition_categories_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+    elif format == 'pdf':
+        return pdf_report_response('category-distribution')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/revenue-distribution/<format>')
+@login_required
+@premium_required
+def export_revenue_distribution(format):
+    """Exporte la répartition des versements (revenus)"""
+    if format == 'excel':
+        return excel_response(
+            export_functions().export_revenue_distribution_excel(get_revenue_distribution(current_user), current_user),
+            f'repartition_revenus_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+    elif format == 'pdf':
+        return pdf_report_response('revenue-distribution')
+    else:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/dashboard/monthly-evolution/<format>')
+@login_required
+@premium_required
+def export_monthly_evolution(format):
+    """Exporte l'évolution des revenus et dépenses mensuelles"""
+    if format == 'excel':
+        return excel_response(
+            export_functions().export_monthly_evolution_excel(get_monthly_evolution(current_user), current_user),
+            f'evolution_mensuelle_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        )
+    elif format == 'pdf':
+        return pdf_report_response('monthly-evolution')
     else:
         flash('Format non supporté', 'danger')
         return redirect(url_for('main.dashboard'))
@@ -399,24 +402,14 @@ def export_monthly_evolution(format):
 @premium_required
 def export_subscriptions(format):
     """Exporte la liste des abonnements"""
-    subscriptions = Subscription.query.filter_by(user_id=current_user.id).order_by(Subscription.created_at.desc()).all()
-
     if format == 'excel':
-        output = export_subscriptions_excel(subscriptions, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'mes_abonnements_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        # Lignes lues par lots depuis un curseur côté serveur pendant l'envoi
+        return excel_response(
+            export_functions().export_subscriptions_excel(subscriptions_query(current_user).yield_per(EXPORT_BATCH_SIZE), current_user),
+            f'mes_abonnements_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
     elif format == 'pdf':
-        output = export_subscriptions_pdf(subscriptions, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'mes_abonnements_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
+        return pdf_report_response('subscriptions')
     else:
         flash('Format non supporté', 'danger')
         return redirect(url_for('subscriptions.list'))
@@ -427,29 +420,13 @@ def export_subscriptions(format):
 @premium_required
 def export_categories(format):
     """Exporte la liste des catégories"""
-    # Catégories personnalisées de l'utilisateur
-    custom_categories = Category.query.filter_by(user_id=current_user.id).order_by(Category.name).all()
-    # Catégories globales
-    global_categories = Category.query.filter_by(user_id=None, is_active=True).order_by(Category.name).all()
-
-    all_categories = custom_categories + global_categories
-
     if format == 'excel':
-        output = export_categories_excel(all_categories, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'mes_categories_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return excel_response(
+            export_functions().export_categories_excel(get_user_categories(current_user), current_user),
+            f'mes_categories_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
     elif format == 'pdf':
-        output = export_categories_pdf(all_categories, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'mes_categories_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
+        return pdf_report_response('categories')
     else:
         flash('Format non supporté', 'danger')
         return redirect(url_for('categories.list'))
@@ -460,31 +437,47 @@ def export_categories(format):
 @premium_required
 def export_services(format):
     """Exporte la liste des services"""
-    # Services personnalisés de l'utilisateur
-    custom_services = Service.query.filter_by(user_id=current_user.id).order_by(Service.name).all()
-    # Services globaux non masqués
-    global_services = Service.query.filter_by(user_id=None, is_active=True).filter(
-        ~Service.hidden_by_users.any(id=current_user.id)
-    ).order_by(Service.name).all()
-
-    all_services = custom_services + global_services
-
     if format == 'excel':
-        output = export_services_excel(all_services, current_user)
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'mes_services_{datetime.now().strftime("%Y%m%d")}.xlsx'
+        return excel_response(
+            export_functions().export_services_excel(get_user_services(current_user), current_user),
+            f'mes_services_{datetime.now().strftime("%Y%m%d")}.xlsx'
         )
     elif format == 'pdf':
-        output = export_services_pdf(all_services, current_user)
-        return send_file(
-            output,
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f'mes_services_{datetime.now().strftime("%Y%m%d")}.pdf'
-        )
+        return pdf_report_response('services')
     else:
         flash('Format non supporté', 'danger')
         return redirect(url_for('services.list'))
+
+
+@bp.route('/transactions/<format>')
+@login_required
+@premium_required
+def export_transactions(format):
+    """
+    Exporte l'historique des transactions (CSV compressé ou Parquet)
+
+    Paramètres facultatifs : start et end (AAAA-MM-JJ, inclus) et source_type (répétable)
+    """
+    if format not in EXPORT_FORMATS:
+        flash('Format non supporté', 'danger')
+        return redirect(url_for('main.balance'))
+
+    try:
+        start_date = datetime.strptime(request.args['start'], '%Y-%m-%d').date() if request.args.get('start') else None
+        end_date = datetime.strptime(request.args['end'], '%Y-%m-%d').date() if request.args.get('end') else None
+    except ValueError:
+        flash('Date invalide (format attendu : AAAA-MM-JJ)', 'danger')
+        return redirect(url_for('main.balance'))
+
+    source_types = request.args.getlist('source_type')
+    if any(source_type not in TRANSACTION_SOURCE_TYPES for source_type in source_types):
+        flash('Type de transaction inconnu', 'danger')
+        return redirect(url_for('main.balance'))
+
+    mimetype, extension = EXPORT_FORMATS[format]
+    chunks = stream_transactions_export(format, current_user.id, start_date, end_date, source_types)
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="transactions_{datetime.now().strftime("%Y%m%d")}.{extension}"'}
+    )
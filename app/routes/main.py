@@ -1,11 +1,13 @@
 from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app, session, jsonify
 from flask_login import login_required, current_user
 from app import db
-from app.models import Subscription, Category, Plan, Notification, Credit, Revenue, InstallmentPayment, Transaction, Reminder
+from app.models import Subscription, Plan, Notification, Credit, Revenue, InstallmentPayment, Transaction, Reminder, CardPurchase
+from app.utils.transactions import cancel_transactions, month_transactions_criteria, set_transactions_pointed, source_transactions_criteria
+from app.services import aggregates, catalog
 from datetime import datetime, timedelta
-from sqlalchemy import func, case
+from sqlalchemy import case, delete, select, tuple_, update
+from sqlalchemy.orm import joinedload
 import stripe
-import os
 
 bp = Blueprint('main', __name__)
 
@@ -20,31 +22,17 @@ def index():
 @bp.route('/dashboard')
 @login_required
 def dashboard():
-    # Statistiques
-    active_subscriptions = current_user.subscriptions.filter_by(is_active=True).all()
-
-    # Calculer le total mensuel des abonnements actifs uniquement
-    total_subscriptions_cost = sum(
-        sub.amount if sub.billing_cycle == 'monthly' else
-        sub.amount / 3 if sub.billing_cycle == 'quarterly' else
-        sub.amount / 12 if sub.billing_cycle == 'yearly' else
-        sub.amount * 4 if sub.billing_cycle == 'weekly' else 0
-        for sub in active_subscriptions
-    )
+    # Totaux mensuels (abonnements, crédits, paiements en plusieurs fois, revenus)
+    totals = aggregates.monthly_totals(current_user)
+    total_subscriptions_cost = totals['subscriptions']
 
     # Calculer le coût mensuel total (abonnements + crédits + revenus, etc.)
-    total_monthly_cost = sum(
-        sub.amount if sub.billing_cycle == 'monthly' else
-        sub.amount / 3 if sub.billing_cycle == 'quarterly' else
-        sub.amount / 12 if sub.billing_cycle == 'yearly' else
-        sub.amount * 4 if sub.billing_cycle == 'weekly' else 0
-        for sub in active_subscriptions
-    )
+    total_monthly_cost = totals['subscriptions']
 
     # Prochains renouvellements - tous les abonnements actifs triés par date
     upcoming_renewals = current_user.subscriptions.filter(
         Subscription.is_active == True
-    ).order_by(Subscription.next_billing_date).all()
+    ).options(joinedload(Subscription.plan)).order_by(Subscription.next_billing_date).all()
 
     # Prochains débits pour les crédits - tous les crédits actifs triés par date
     upcoming_credits = current_user.credits.filter(
@@ -54,7 +42,7 @@ def dashboard():
     # Prochains versements pour les revenus - tous les revenus actifs triés par date
     upcoming_revenues = current_user.revenues.filter(
         Revenue.is_active == True
-    ).order_by(Revenue.next_payment_date).all()
+    ).options(joinedload(Revenue.employer)).order_by(Revenue.next_payment_date).all()
 
     # Prochains paiements pour les paiements en plusieurs fois - tous les paiements actifs triés par date
     upcoming_installments = current_user.installment_payments.filter(
@@ -62,84 +50,26 @@ def dashboard():
     ).order_by(InstallmentPayment.next_payment_date).all()
 
     # Répartition par catégorie (abonnements + crédits)
-    category_stats = db.session.query(
-        Category.name,
-        Category.color,
-        func.count(Subscription.id).label('subscription_count'),
-        func.sum(Subscription.amount).label('subscription_total'),
-        func.count(Credit.id).label('credit_count'),
-        func.sum(Credit.amount).label('credit_total'),
-        (func.coalesce(func.sum(Subscription.amount), 0) + func.coalesce(func.sum(Credit.amount), 0)).label('total')
-    ).outerjoin(Subscription,
-        (Subscription.category_id == Category.id) &
-        (Subscription.user_id == current_user.id) &
-        (Subscription.is_active == True)
-    ).outerjoin(Credit,
-        (Credit.category_id == Category.id) &
-        (Credit.user_id == current_user.id) &
-        (Credit.is_active == True)
-    ).filter(
-        (Subscription.id != None) | (Credit.id != None)
-    ).group_by(Category.id).all()
-
-    # Calculer le total des crédits actifs pour la catégorie "Crédits"
-    total_credits = sum(
-        credit.amount if credit.billing_cycle == 'monthly' else
-        credit.amount / 3 if credit.billing_cycle == 'quarterly' else
-        credit.amount / 12 if credit.billing_cycle == 'yearly' else 0
-        for credit in upcoming_credits
-    )
-
-    # Ajouter les paiements en plusieurs fois au total des crédits
-    total_installments = sum(
-        installment.installment_amount
-        for installment in upcoming_installments
-    )
+    category_stats = aggregates.category_stats(current_user)
 
-    total_credits += total_installments
+    # Total des crédits actifs pour la catégorie "Crédits", paiements en plusieurs fois inclus
+    total_credits = totals['credits'] + totals['installments']
 
     # Répartition des revenus par employeur
-    revenue_data = {}
     colors_palette = ['#10b981', '#34d399', '#6ee7b7', '#a7f3d0', '#d1fae5', '#ecfdf5']
-
-    for revenue in upcoming_revenues:
-        if revenue.employer:
-            employer_name = revenue.employer.name
-        else:
-            employer_name = 'Autres revenus'
-
-        monthly_amount = revenue.amount
-
-        # Convertir en montant mensuel selon le cycle
-        if revenue.billing_cycle == 'yearly':
-            monthly_amount = revenue.amount / 12
-        elif revenue.billing_cycle == 'quarterly':
-            monthly_amount = revenue.amount / 3
-
-        if employer_name not in revenue_data:
-            revenue_data[employer_name] = {
-                'name': employer_name,
-                'total': 0,
-                'color': colors_palette[len(revenue_data) % len(colors_palette)]
-            }
-
-        revenue_data[employer_name]['total'] += monthly_amount
-
-    revenue_stats = sorted(revenue_data.values(), key=lambda x: x['total'], reverse=True)
+    revenue_stats = [
+        dict(item, color=colors_palette[index % len(colors_palette)])
+        for index, item in enumerate(aggregates.revenues_by_employer(current_user))
+    ]
 
     # Calculer le total des revenus mensuels
-    total_revenues = sum(
-        revenue.amount if revenue.billing_cycle == 'monthly' else
-        revenue.amount / 3 if revenue.billing_cycle == 'quarterly' else
-        revenue.amount / 12 if revenue.billing_cycle == 'yearly' else 0
-        for revenue in upcoming_revenues
-    )
+    total_revenues = totals['revenues']
 
     # Calculer le solde : revenus - (abonnements + crédits)
     solde = total_revenues - (total_subscriptions_cost + total_credits)
 
     # Notifications non lues
-    unread_notifications = current_user.notifications.filter_by(is_read=False).count()
+    unread_notifications = current_user.unread_notifications_count
 
     # Chèques non débités (non pointés dans la balance)
     unpointed_checks = Transaction.query.filter(
@@ -153,7 +83,7 @@ def dashboard():
     from sqlalchemy import or_, and_
     from datetime import date
     today = date.today()
-    upcoming_reminders = current_user.reminders.filter(
+    upcoming_reminders = current_user.reminders.options(joinedload(Reminder.provider)).filter(
         Reminder.is_active == True,
         or_(
             Reminder.reminder_year > today.year,
@@ -165,7 +95,7 @@ def dashboard():
     ).order_by(Reminder.reminder_year, Reminder.reminder_month).limit(10).all()
 
     return render_template('dashboard.html',
-                         active_subscriptions=active_subscriptions,
+                         active_subscriptions=upcoming_renewals,
                          total_subscriptions_cost=round(total_subscriptions_cost, 2),
                          total_monthly_cost=round(total_monthly_cost, 2),
                          upcoming_renewals=upcoming_renewals,
@@ -185,7 +115,7 @@ def dashboard():
 
 @bp.route('/pricing')
 def pricing():
-    plans = Plan.query.filter_by(is_active=True).order_by(Plan.price).all()
+    plans = catalog.active_plans()
     return render_template('pricing.html', plans=plans)
 
 
@@ -193,33 +123,41 @@ def pricing():
 @login_required
 def balance():
     """Page d'affichage du solde avec tous les mouvements (depuis la table transactions)"""
-    from calendar import monthrange
-
     # Récupérer les paramètres de filtre (mois, année et statut)
     now = datetime.utcnow()
     selected_month = request.args.get('month', type=int, default=now.month)
     selected_year = request.args.get('year', type=int, default=now.year)
     selected_status = request.args.get('status', default='all')
 
-    # Calculer le premier et dernier jour du mois sélectionné
-    first_day = datetime(selected_year, selected_month, 1).date()
-    last_day_num = monthrange(selected_year, selected_month)[1]
-    last_day = datetime(selected_year, selected_month, last_day_num).date()
-
-    # Construire la requête de base (transactions du mois, sauf les annulées)
+    # Transactions du mois sélectionné, sauf les annulées, filtrées par statut
     query = current_user.transactions.filter(
-        Transaction.transaction_date >= first_day,
-        Transaction.transaction_date <= last_day,
-        Transaction.status != 'cancelled'
+        *month_transactions_criteria(selected_year, selected_month, selected_status)
     )
 
-    # Ajouter le filtre de statut si nécessaire
-    if selected_status != 'all':
-        query = query.filter(Transaction.status == selected_status)
-
     # Récupérer les transactions
     transactions = query.order_by(Transaction.transaction_date.desc()).all()
 
+    # Reçus des achats CB et progression des paiements en plusieurs fois, en une requête
+    # par type de source (sans charger les images des reçus)
+    card_purchase_ids = {t.source_id for t in transactions if t.source_type == 'card_purchase' and t.source_id}
+    installment_ids = {t.source_id for t in transactions if t.source_type == 'installment' and t.source_id}
+    receipts = {}
+    if card_purchase_ids:
+        receipts = {
+            row.id: row for row in db.session.execute(
+                select(CardPurchase.id, CardPurchase.receipt_image_mime_type, CardPurchase.receipt_image_name)
+                .where(CardPurchase.id.in_(card_purchase_ids), CardPurchase.receipt_image_data.isnot(None))
+            )
+        }
+    installments = {}
+    if installment_ids:
+        installments = {
+            row.id: row for row in db.session.execute(
+                select(InstallmentPayment.id, InstallmentPayment.installments_paid, InstallmentPayment.number_of_installments)
+                .where(InstallmentPayment.id.in_(installment_ids))
+            )
+        }
+
     # Convertir les transactions en dictionnaire pour le template
     movements = []
     for transaction in transactions:
@@ -239,23 +177,18 @@ def balance():
             'status': transaction.status
         }
 
-        # Pour les achats CB, récupérer les infos du reçu si disponible
-        if transaction.source_type == 'card_purchase' and transaction.source_id:
-            from app.models import CardPurchase
-            card_purchase = CardPurchase.query.get(transaction.source_id)
-            if card_purchase and card_purchase.receipt_image_data:
-                movement['has_receipt'] = True
-                movement['receipt_mime_type'] = card_purchase.receipt_image_mime_type
-                movement['receipt_name'] = card_purchase.receipt_image_name
-            else:
-                movement['has_receipt'] = False
+        # Pour les achats CB, infos du reçu si disponible
+        receipt = receipts.get(transaction.source_id) if transaction.source_type == 'card_purchase' else None
+        if receipt:
+            movement['has_receipt'] = True
+            movement['receipt_mime_type'] = receipt.receipt_image_mime_type
+            movement['receipt_name'] = receipt.receipt_image_name
         else:
             movement['has_receipt'] = False
 
-        # Pour les paiements en plusieurs fois, récupérer la progression
-        if transaction.source_type == 'installment' and transaction.source_id:
-            from app.models import InstallmentPayment
-            installment = InstallmentPayment.query.get(transaction.source_id)
+        # Pour les paiements en plusieurs fois, progression
+        if transaction.source_type == 'installment':
+            installment = installments.get(transaction.source_id)
             if installment:
                 movement['installments_paid'] = installment.installments_paid
                 movement['number_of_installments'] = installment.number_of_installments
@@ -369,8 +302,6 @@ def mark_as_pending(transaction_id):
 @login_required
 def toggle_all_month():
     """Pointer/dépointer toutes les transactions d'un mois"""
-    from calendar import monthrange
-
     # Récupérer les paramètres de filtre
     month = request.form.get('month', type=int)
     year = request.form.get('year', type=int)
@@ -381,39 +312,13 @@ def toggle_all_month():
         flash('Paramètres invalides.', 'danger')
         return redirect(url_for('main.balance'))
 
-    # Calculer le premier et dernier jour du mois
-    first_day = datetime(year, month, 1).date()
-    last_day_num = monthrange(year, month)[1]
-    last_day = datetime(year, month, last_day_num).date()
-
-    # Construire la requête de base (transactions du mois, sauf les annulées)
-    query = current_user.transactions.filter(
-        Transaction.transaction_date >= first_day,
-        Transaction.transaction_date <= last_day,
-        Transaction.status != 'cancelled'
+    # Pointer ou dépointer en une seule requête les transactions du mois
+    updated_ids = set_transactions_pointed(
+        current_user.id,
+        action == 'point',
+        *month_transactions_criteria(year, month, status_filter)
     )
-
-    # Ajouter le filtre de statut si nécessaire
-    if status_filter != 'all':
-        query = query.filter(Transaction.status == status_filter)
-
-    # Récupérer toutes les transactions
-    transactions = query.all()
-
-    # Pointer ou dépointer selon l'action
-    count = 0
-    if action == 'point':
-        for transaction in transactions:
-            if not transaction.is_pointed:
-                transaction.is_pointed = True
-                count += 1
-    else:  # unpoint
-        for transaction in transactions:
-            if transaction.is_pointed:
-                transaction.is_pointed = False
-                count += 1
-
-    db.session.commit()
+    count = len(updated_ids)
 
     if action == 'point':
         flash(f'{count} transaction(s) pointée(s) avec succès.', 'success')
@@ -473,52 +378,26 @@ def delete_transactions_bulk(transaction_id):
 
     elif delete_mode == 'past':
         # Supprimer toutes les transactions passées (inclus celle-ci)
-        past_transactions = Transaction.query.filter(
-            Transaction.user_id == current_user.id,
-            Transaction.source_id == source_id,
-            Transaction.source_type == source_type,
-            Transaction.transaction_date <= transaction_date,
-            Transaction.status != 'cancelled'
-        ).all()
-
-        for t in past_transactions:
-            t.status = 'cancelled'
-            count += 1
-
-        db.session.commit()
+        count = len(cancel_transactions(
+            current_user.id,
+            *source_transactions_criteria(source_id, source_type, before=transaction_date)
+        ))
         flash(f'{count} transaction(s) passée(s) ont été annulée(s).', 'success')
 
     elif delete_mode == 'future':
         # Supprimer toutes les transactions futures (inclus celle-ci)
-        future_transactions = Transaction.query.filter(
-            Transaction.user_id == current_user.id,
-            Transaction.source_id == source_id,
-            Transaction.source_type == source_type,
-            Transaction.transaction_date >= transaction_date,
-            Transaction.status != 'cancelled'
-        ).all()
-
-        for t in future_transactions:
-            t.status = 'cancelled'
-            count += 1
-
-        db.session.commit()
+        count = len(cancel_transactions(
+            current_user.id,
+            *source_transactions_criteria(source_id, source_type, after=transaction_date)
+        ))
         flash(f'{count} transaction(s) future(s) ont été annulée(s).', 'success')
 
     elif delete_mode == 'all':
         # Supprimer toutes les transactions liées
-        all_transactions = Transaction.query.filter(
-            Transaction.user_id == current_user.id,
-            Transaction.source_id == source_id,
-            Transaction.source_type == source_type,
-            Transaction.status != 'cancelled'
-        ).all()
-
-        for t in all_transactions:
-            t.status = 'cancelled'
-            count += 1
-
-        db.session.commit()
+        count = len(cancel_transactions(
+            current_user.id,
+            *source_transactions_criteria(source_id, source_type)
+        ))
         flash(f'{count} transaction(s) ont été annulée(s).', 'success')
 
     # Retourner à la page balance avec les mêmes filtres
@@ -527,43 +406,89 @@ def delete_transactions_bulk(transaction_id):
     return redirect(url_for('main.balance', month=month, year=year))
 
 
+NOTIFICATIONS_PER_PAGE = 50
+
+
+def parse_notification_cursor(value):
+    """Décode le curseur de pagination « date_id », None s'il est absent ou invalide"""
+    if not value:
+        return None
+    try:
+        created_at, notification_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(notification_id)
+    except ValueError:
+        return None
+
+
+def notification_filter_criteria(filter_type):
+    """Critères SQL d'un filtre de la page notifications"""
+    if filter_type == 'archived':
+        # Uniquement les notifications archivées
+        return (Notification.archived == True,)
+    if filter_type == 'read':
+        # Uniquement les notifications lues (non archivées)
+        return (Notification.is_read == True, Notification.archived == False)
+    if filter_type == 'all':
+        # Toutes les notifications
+        return ()
+    # 'unread' par défaut : uniquement les notifications non lues
+    return (Notification.is_read == False, Notification.archived == False)
+
+
+def bulk_notification_criteria():
+    """Critères des actions groupées : la sélection cochée, ou tout le filtre courant
+
+    Retourne None si rien n'est sélectionné. Seules les notifications de
+    l'utilisateur connecté sont concernées.
+    """
+    criteria = (Notification.user_id == current_user.id,)
+
+    if request.form.get('apply_to_filter'):
+        return criteria + notification_filter_criteria(request.form.get('filter', 'unread'))
+
+    notification_ids = [int(notif_id) for notif_id in request.form.getlist('notification_ids[]') if notif_id.isdigit()]
+    if not notification_ids:
+        return None
+    return criteria + (Notification.id.in_(notification_ids),)
+
+
+def apply_bulk_notification_action(statement):
+    """Exécute une action groupée en une seule requête et retourne le nombre de lignes modifiées"""
+    result = db.session.execute(statement.execution_options(synchronize_session=False))
+    # La requête ensembliste ne passe pas par les événements ORM : recalculer le compteur
+    current_user.refresh_unread_notifications_count()
+    db.session.commit()
+    return result.rowcount
+
+
 @bp.route('/notifications')
 @login_required
 def notifications():
     filter_type = request.args.get('filter', 'unread')  # 'unread', 'read', 'archived', 'all'
 
-    if filter_type == 'archived':
-        # Afficher uniquement les notifications archivées
-        user_notifications = current_user.notifications.filter_by(
-            archived=True
-        ).order_by(
-            Notification.created_at.desc()
-        ).all()
-    elif filter_type == 'read':
-        # Afficher uniquement les notifications lues (non archivées)
-        user_notifications = current_user.notifications.filter_by(
-            is_read=True,
-            archived=False
-        ).order_by(
-            Notification.created_at.desc()
-        ).all()
-    elif filter_type == 'all':
-        # Afficher toutes les notifications
-        user_notifications = current_user.notifications.order_by(
-            Notification.created_at.desc()
-        ).all()
-    else:  # 'unread' par défaut
-        # Afficher uniquement les notifications non lues
-        user_notifications = current_user.notifications.filter_by(
-            is_read=False,
-            archived=False
-        ).order_by(
-            Notification.created_at.desc()
-        ).all()
+    query = current_user.notifications.filter(*notification_filter_criteria(filter_type))
+
+    # Pagination par curseur (date, id) : pas d'OFFSET, chaque page repart de la dernière ligne affichée
+    cursor = parse_notification_cursor(request.args.get('before'))
+    if cursor:
+        query = query.filter(tuple_(Notification.created_at, Notification.id) < cursor)
+
+    user_notifications = query.order_by(
+        Notification.created_at.desc(),
+        Notification.id.desc()
+    ).limit(NOTIFICATIONS_PER_PAGE + 1).all()
+
+    next_cursor = None
+    if len(user_notifications) > NOTIFICATIONS_PER_PAGE:
+        user_notifications = user_notifications[:NOTIFICATIONS_PER_PAGE]
+        last = user_notifications[-1]
+        next_cursor = f"{last.created_at.isoformat()}_{last.id}"
 
     return render_template('notifications.html',
                          notifications=user_notifications,
-                         filter_type=filter_type)
+                         filter_type=filter_type,
+                         next_cursor=next_cursor,
+                         is_first_page=cursor is None)
 
 
 @bp.route('/notifications/<int:notification_id>/read', methods=['POST'])
@@ -598,79 +523,74 @@ def delete_notification(notification_id):
 @bp.route('/notifications/archive', methods=['POST'])
 @login_required
 def archive_notifications():
-    notification_ids = request.form.getlist('notification_ids[]')
+    filter_type = request.form.get('filter', 'unread')
+    criteria = bulk_notification_criteria()
 
-    if not notification_ids:
+    if criteria is None:
         flash('Veuillez sélectionner au moins une notification à archiver.', 'warning')
-        return redirect(url_for('main.notifications'))
+        return redirect(url_for('main.notifications', filter=filter_type))
 
-    archived_count = 0
-    for notif_id in notification_ids:
-        notification = Notification.query.get(int(notif_id))
-        if notification and notification.user_id == current_user.id:
-            notification.archive()
-            archived_count += 1
+    archived_count = apply_bulk_notification_action(
+        update(Notification)
+        .where(*criteria, Notification.archived == False)
+        .values(archived=True, archived_at=datetime.utcnow())
+    )
 
     if archived_count > 0:
         flash(f'{archived_count} notification(s) archivée(s) avec succès.', 'success')
     else:
         flash('Aucune notification n\'a pu être archivée.', 'warning')
 
-    return redirect(url_for('main.notifications'))
+    return redirect(url_for('main.notifications', filter=filter_type))
 
 
 @bp.route('/notifications/mark-read', methods=['POST'])
 @login_required
 def mark_multiple_notifications_read():
-    notification_ids = request.form.getlist('notification_ids[]')
+    filter_type = request.form.get('filter', 'unread')
+    criteria = bulk_notification_criteria()
 
-    if not notification_ids:
+    if criteria is None:
         flash('Veuillez sélectionner au moins une notification à marquer comme lue.', 'warning')
-        return redirect(url_for('main.notifications'))
+        return redirect(url_for('main.notifications', filter=filter_type))
 
-    marked_count = 0
-    for notif_id in notification_ids:
-        notification = Notification.query.get(int(notif_id))
-        if notification and notification.user_id == current_user.id and not notification.is_read:
-            notification.mark_as_read()
-            marked_count += 1
+    marked_count = apply_bulk_notification_action(
+        update(Notification)
+        .where(*criteria, Notification.is_read == False)
+        .values(is_read=True, read_at=datetime.utcnow())
+    )
 
     if marked_count > 0:
         flash(f'{marked_count} notification(s) marquée(s) comme lue(s) avec succès.', 'success')
     else:
         flash('Aucune notification n\'a pu être marquée comme lue.', 'warning')
 
-    return redirect(url_for('main.notifications'))
+    return redirect(url_for('main.notifications', filter=filter_type))
 
 
 @bp.route('/notifications/delete-multiple', methods=['POST'])
 @login_required
 def delete_multiple_notifications():
+    filter_type = request.form.get('filter', 'unread')
+
     if not current_user.is_admin:
         flash('Vous n\'avez pas les permissions pour supprimer des notifications.', 'danger')
-        return redirect(url_for('main.notifications'))
+        return redirect(url_for('main.notifications', filter=filter_type))
 
-    notification_ids = request.form.getlist('notification_ids[]')
+    criteria = bulk_notification_criteria()
 
-    if not notification_ids:
+    if criteria is None:
         flash('Veuillez sélectionner au moins une notification à supprimer.', 'warning')
-        return redirect(url_for('main.notifications'))
+        return redirect(url_for('main.notifications', filter=filter_type))
 
-    deleted_count = 0
-    for notif_id in notification_ids:
-        notification = Notification.query.get(int(notif_id))
-        if notification:
-            db.session.delete(notification)
-            deleted_count += 1
-
-    db.session.commit()
+    deleted_count = apply_bulk_notification_action(delete(Notification).where(*criteria))
 
     if deleted_count > 0:
         flash(f'{deleted_count} notification(s) supprimée(s) avec succès.', 'success')
     else:
         flash('Aucune notification n\'a pu être supprimée.', 'warning')
 
-    return redirect(url_for('main.notifications'))
+    return redirect(url_for('main.notifications', filter=filter_type))
 
 
 @bp.route('/checkout-redirect')
@@ -680,9 +600,6 @@ def checkout_redirect():
     plan_type = request.args.get('plan', 'monthly')  # 'monthly' ou 'yearly'
 
     try:
-        # Initialiser Stripe
-        stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
-
         # Sélectionner le bon plan
         if plan_type == 'yearly':
             plan_name = 'Premium Annual'
@@ -0,0 +1,29 @@
+import hmac
+from flask import Blueprint, Response, abort, current_app, request
+from flask_login import current_user
+from app import limiter
+from app.utils import metrics
+
+bp = Blueprint('monitoring', __name__)
+
+
+def is_metrics_client():
+    """Administrateur connecté ou collecteur Prometheus présentant METRICS_TOKEN"""
+    if current_user.is_authenticated and current_user.is_admin:
+        return True
+    token = current_app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    return bool(token) and authorization.startswith('Bearer ') and \
+        hmac.compare_digest(authorization[len('Bearer '):].encode(), token.encode())
+
+
+@bp.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    """Métriques Prometheus de tous les workers (réservé aux administrateurs et au collecteur)"""
+    if not is_metrics_client():
+        abort(404)
+
+    metrics.update_scrape_gauges()
+    data, content_type = metrics.render_metrics()
+    return Response(data, content_type=content_type)
@@ -5,8 +5,8 @@ from app import db
 from app.models import Service, ServicePlan, Category
 from werkzeug.utils import secure_filename
 import os
-import base64
 import mimetypes
+from sqlalchemy.orm import joinedload, selectinload
 
 bp = Blueprint('services', __name__, url_prefix='/services')
 
@@ -38,18 +38,26 @@ def get_user_services():
 @login_required
 def list():
     # Services globaux - non masqués
-    all_global_services = Service.query.filter_by(user_id=None, is_active=True).order_by(Service.name).all()
+    all_global_services = Service.query.filter_by(user_id=None, is_active=True).options(
+        joinedload(Service.category), selectinload(Service.plans)
+    ).order_by(Service.name).all()
 
     # Filtrer les services masqués par l'utilisateur
     hidden_ids = [svc.id for svc in current_user.hidden_services_list]
     global_services = [svc for svc in all_global_services if svc.id not in hidden_ids]
 
     # Services personnalisés de l'utilisateur
-    custom_services = Service.query.filter_by(user_id=current_user.id).order_by(Service.name).all()
+    custom_services = Service.query.filter_by(user_id=current_user.id).options(
+        joinedload(Service.category), selectinload(Service.plans)
+    ).order_by(Service.name).all()
+
+    # Même règle que User.can_create_custom_service, sans recompter les services chargés
+    can_create_custom_service = current_user.is_premium() or len(custom_services) < 5
 
     return render_template('services/list.html',
                          global_services=global_services,
-                         custom_services=custom_services)
+                         custom_services=custom_services,
+                         can_create_custom_service=can_create_custom_service)
 
 
 @bp.route('/add', methods=['GET', 'POST'])
@@ -76,9 +84,9 @@ def add():
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -128,9 +136,9 @@ def edit(service_id):
         if 'logo' in request.files:
             file = request.files['logo']
             if file and file.filename and allowed_file(file.filename):
-                # Lire le fichier et le convertir en base64
+                # Lire le fichier (stocké en binaire, empreinte calculée par le modèle)
                 file_bytes = file.read()
-                service.logo_data = base64.b64encode(file_bytes).decode('utf-8')
+                service.logo_data = file_bytes
 
                 # Déterminer le MIME type
                 mime_type, _ = mimetypes.guess_type(file.filename)
@@ -2,35 +2,26 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from flask_babel import gettext as _
 from app import db
-from app.models import Subscription, Category, Notification, Service
+from app.models import Subscription, Category, Notification, Service, ServicePlan
+from app.services import catalog
 from app.utils.transactions import generate_future_transactions, update_future_transactions, cancel_future_transactions, calculate_next_future_date, delete_all_transactions
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import joinedload, selectinload
 
 bp = Blueprint('subscriptions', __name__, url_prefix='/subscriptions')
 
 
 def get_user_categories():
     """Récupère les catégories globales et personnalisées de l'utilisateur actuel"""
-    # Catégories globales (par défaut) - uniquement pour abonnements
-    global_categories = Category.query.filter_by(
-        user_id=None,
-        is_active=True
-    ).filter(
-        db.or_(
-            Category.category_type == 'subscription',
-            Category.category_type == 'all'
-        )
-    ).order_by(Category.name).all()
+    # Catégories globales (par défaut) - uniquement pour abonnements, depuis le catalogue en cache
+    global_categories = catalog.global_categories(catalog.SUBSCRIPTION_CATEGORY_TYPES)
 
     # Catégories personnalisées de l'utilisateur - uniquement pour abonnements
     custom_categories = current_user.custom_categories.filter_by(
         is_active=True
     ).filter(
-        db.or_(
-            Category.category_type == 'subscription',
-            Category.category_type == 'all'
-        )
+        Category.category_type.in_(catalog.SUBSCRIPTION_CATEGORY_TYPES)
     ).order_by(Category.name).all()
 
     # Combiner les deux listes
@@ -39,25 +30,32 @@ def get_user_categories():
 
 def get_user_services():
     """Récupère les services globaux et personnalisés de l'utilisateur actuel avec plans sérialisables"""
-    # Services globaux (par défaut)
-    global_services = Service.query.filter_by(user_id=None, is_active=True).order_by(Service.name).all()
+    # Services personnalisés de l'utilisateur, formules chargées en une requête
+    custom_services = Service.query.filter_by(
+        user_id=current_user.id, is_active=True
+    ).options(selectinload(Service.plans)).order_by(Service.name).all()
 
-    # Services personnalisés de l'utilisateur
-    custom_services = Service.query.filter_by(user_id=current_user.id, is_active=True).order_by(Service.name).all()
-
-    # Combiner les deux listes
-    all_services = global_services + custom_services
+    # Formules personnalisées de l'utilisateur ajoutées aux services globaux
+    custom_plans = {}
+    for plan in ServicePlan.query.filter_by(user_id=current_user.id, is_active=True).order_by(ServicePlan.id):
+        custom_plans.setdefault(plan.service_id, []).append(plan)
 
     # Préparer les données pour le template (rendre les plans sérialisables)
     services_data = []
-    for service in all_services:
-        service_dict = {
+    for service in catalog.global_services():
+        services_data.append({
+            'id': service.id,
+            'name': service.name,
+            'category_id': service.category_id,
+            'plans': [plan.to_dict() for plan in service.plans + tuple(custom_plans.get(service.id, ()))]
+        })
+    for service in custom_services:
+        services_data.append({
             'id': service.id,
             'name': service.name,
             'category_id': service.category_id,
             'plans': [plan.to_dict() for plan in service.plans if plan.is_active]
-        }
-        services_data.append(service_dict)
+        })
 
     return services_data
 
@@ -79,7 +77,9 @@ def list():
     if filter_category:
         query = query.filter_by(category_id=filter_category)
 
-    subscriptions = query.order_by(Subscription.next_billing_date).paginate(
+    subscriptions = query.options(
+        joinedload(Subscription.category), joinedload(Subscription.plan)
+    ).order_by(Subscription.next_billing_date).paginate(
         page=page, per_page=10, error_out=False
     )
 
@@ -0,0 +1 @@
+# Services applicatifs partagés entre les routes
@@ -0,0 +1,306 @@
+"""
+Agrégats financiers partagés entre le tableau de bord, les API de répartition et les exports
+
+Les totaux sont calculés en SQL (GROUP BY et normalisation mensuelle des cycles de
+facturation) plutôt qu'en chargeant toutes les lignes. Les résultats sont mémorisés
+pour la durée de la requête et, dans le processus, par version des données de
+l'utilisateur (User.data_version, incrémentée à chaque modification) et par version du
+catalogue global (libellés et couleurs des catégories, services et types de crédit) :
+ils ne doivent pas être modifiés par les appelants.
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_app_context
+from sqlalchemy import case, extract, func, literal, select, union_all
+from app import db
+from app.services import catalog
+from app.utils.metrics import record_cache
+from app.models import Subscription, Credit, Revenue, InstallmentPayment, CardPurchase, Category, Service, CreditType, Employer
+
+DEFAULT_COLOR = '#6c757d'
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def memoized_aggregate(function):
+    """
+    Mémorise un agrégat par (fonction, utilisateur, version des données, version du catalogue, arguments)
+
+    La fonction décorée reçoit l'utilisateur en premier argument ; les autres arguments
+    doivent être hachables.
+    """
+    @wraps(function)
+    def wrapper(user, *args):
+        if not has_app_context():
+            return function(user, *args)
+        key = (function.__name__, user.id, user.data_version, catalog.get_catalog().version) + args
+
+        request_cache = g.setdefault('aggregates', {})
+        if key in request_cache:
+            return request_cache[key]
+
+        max_size = current_app.config['AGGREGATES_CACHE_SIZE']
+        with _cache_lock:
+            hit = key in _cache
+            if hit:
+                _cache.move_to_end(key)
+                request_cache[key] = _cache[key]
+        record_cache('aggregates', hit)
+        if hit:
+            return request_cache[key]
+
+        result = function(user, *args)
+        request_cache[key] = result
+        if max_size:
+            with _cache_lock:
+                _cache[key] = result
+                while len(_cache) > max_size:
+                    _cache.popitem(last=False)
+        return result
+    return wrapper
+
+
+def monthly_amount(model, amount=None):
+    """
+    Expression SQL du montant ramené au mois selon le cycle de facturation
+
+    Même règle pour les abonnements, les crédits et les revenus : hebdomadaire x 4, cycle
+    inconnu compté 0 (les formulaires des crédits et des revenus ne proposent ni l'un ni
+    l'autre).
+    """
+    amount = model.amount if amount is None else amount
+    return case(
+        (model.billing_cycle == 'monthly', amount),
+        (model.billing_cycle == 'quarterly', amount / 3),
+        (model.billing_cycle == 'yearly', amount / 12),
+        (model.billing_cycle == 'weekly', amount * 4),
+        else_=0
+    )
+
+
+def _merge_by_label(rows):
+    """Fusionne les lignes (libellé, couleur, total) de même libellé, par total décroissant"""
+    merged = {}
+    for label, color, total in rows:
+        if label in merged:
+            merged[label]['total'] += total or 0
+        else:
+            merged[label] = {'name': label, 'color': color or DEFAULT_COLOR, 'total': total or 0}
+    return sorted(merged.values(), key=lambda item: item['total'], reverse=True)
+
+
+@memoized_aggregate
+def monthly_totals(user):
+    """
+    Totaux mensuels des éléments actifs de l'utilisateur
+
+    Returns:
+        dict avec subscriptions, credits, installments et revenues (montants mensuels)
+        ainsi que credit_count
+    """
+    subscriptions = db.session.scalar(
+        select(func.coalesce(func.sum(monthly_amount(Subscription)), 0))
+        .where(Subscription.user_id == user.id, Subscription.is_active == True)
+    )
+    credit_count, credits = db.session.execute(
+        select(func.count(Credit.id), func.coalesce(func.sum(monthly_amount(Credit)), 0))
+        .where(Credit.user_id == user.id, Credit.is_active == True)
+    ).one()
+    installments = db.session.scalar(
+        select(func.coalesce(func.sum(InstallmentPayment.installment_amount), 0))
+        .where(InstallmentPayment.user_id == user.id, InstallmentPayment.is_active == True)
+    )
+    revenues = db.session.scalar(
+        select(func.coalesce(func.sum(monthly_amount(Revenue)), 0))
+        .where(Revenue.user_id == user.id, Revenue.is_active == True)
+    )
+
+    return {
+        'subscriptions': subscriptions,
+        'credits': credits,
+        'credit_count': credit_count,
+        'installments': installments,
+        'revenues': revenues,
+    }
+
+
+@memoized_aggregate
+def category_stats(user):
+    """
+    Répartition des abonnements et crédits actifs par catégorie, en montants mensuels
+
+    Chaque source est agrégée par catégorie séparément puis les résultats sont réunis
+    (UNION ALL) : joindre abonnements et crédits dans une même requête multiplierait
+    les lignes (S abonnements x C crédits) et donc les sommes.
+
+    Returns:
+        Liste de dict (name, color, subscription_count, subscription_total, credit_count,
+        credit_total, total)
+    """
+    subscriptions = (
+        select(
+            Subscription.category_id.label('category_id'),
+            func.count().label('subscription_count'),
+            func.sum(monthly_amount(Subscription)).label('subscription_total'),
+            literal(0).label('credit_count'),
+            literal(0.0).label('credit_total'),
+        )
+        .where(Subscription.user_id == user.id, Subscription.is_active == True)
+        .group_by(Subscription.category_id)
+    )
+    credits = (
+        select(
+            Credit.category_id.label('category_id'),
+            literal(0).label('subscription_count'),
+            literal(0.0).label('subscription_total'),
+            func.count().label('credit_count'),
+            func.sum(monthly_amount(Credit)).label('credit_total'),
+        )
+        .where(Credit.user_id == user.id, Credit.is_active == True)
+        .group_by(Credit.category_id)
+    )
+    by_category = union_all(subscriptions, credits).subquery()
+
+    subscription_total = func.coalesce(func.sum(by_category.c.subscription_total), 0)
+    credit_total = func.coalesce(func.sum(by_category.c.credit_total), 0)
+    rows = db.session.execute(
+        select(
+            Category.name,
+            Category.color,
+            func.sum(by_category.c.subscription_count).label('subscription_count'),
+            subscription_total.label('subscription_total'),
+            func.sum(by_category.c.credit_count).label('credit_count'),
+            credit_total.label('credit_total'),
+            (subscription_total + credit_total).label('total'),
+        )
+        .join(by_category, by_category.c.category_id == Category.id)
+        .group_by(Category.id, Category.name, Category.color)
+        .order_by(Category.id)
+    ).all()
+
+    return [row._asdict() for row in rows]
+
+
+@memoized_aggregate
+def subscriptions_by_service(user):
+    """Montants mensuels des abonnements actifs par service (dict name, total)"""
+    rows = db.session.execute(
+        select(Service.name, func.sum(monthly_amount(Subscription)))
+        .select_from(Subscription)
+        .outerjoin(Service, Service.id == Subscription.service_id)
+        .where(Subscription.user_id == user.id, Subscription.is_active == True)
+        .group_by(Subscription.service_id, Service.name)
+    ).all()
+
+    return [
+        {'name': item['name'], 'total': item['total']}
+        for item in _merge_by_label((name or 'Autre', None, total) for name, total in rows)
+    ]
+
+
+@memoized_aggregate
+def subscriptions_by_category(user):
+    """Montants mensuels des abonnements actifs par catégorie (dict name, color, total)"""
+    rows = db.session.execute(
+        select(Category.name, Category.color, func.sum(monthly_amount(Subscription)))
+        .select_from(Subscription)
+        .outerjoin(Category, Category.id == Subscription.category_id)
+        .where(Subscription.user_id == user.id, Subscription.is_active == True)
+        .group_by(Subscription.category_id, Category.name, Category.color)
+    ).all()
+
+    return _merge_by_label((name or 'Uncategorized', color, total) for name, color, total in rows)
+
+
+@memoized_aggregate
+def credits_by_type(user, locale):
+    """Montants mensuels des crédits actifs par type de crédit, libellés dans la langue demandée"""
+    rows = db.session.execute(
+        select(CreditType.name, CreditType.name_en, CreditType.color, func.sum(monthly_amount(Credit)))
+        .select_from(Credit)
+        .outerjoin(CreditType, CreditType.id == Credit.credit_type_id)
+        .where(Credit.user_id == user.id, Credit.is_active == True)
+        .group_by(Credit.credit_type_id, CreditType.name, CreditType.name_en, CreditType.color)
+    ).all()
+
+    return _merge_by_label(
+        ((name_en if locale == 'en' and name_en else name) or 'No type', color, total)
+        for name, name_en, color, total in rows
+    )
+
+
+@memoized_aggregate
+def revenues_by_type(user):
+    """Montants mensuels des revenus actifs par code de type de revenu (dict code, total)"""
+    rows = db.session.execute(
+        select(Revenue.revenue_type, func.sum(monthly_amount(Revenue)))
+        .where(Revenue.user_id == user.id, Revenue.is_active == True)
+        .group_by(Revenue.revenue_type)
+    ).all()
+
+    totals = {}
+    for code, total in rows:
+        code = code or 'other'
+        totals[code] = totals.get(code, 0) + (total or 0)
+    return [{'code': code, 'total': total} for code, total in totals.items()]
+
+
+@memoized_aggregate
+def revenues_by_employer(user):
+    """Montants mensuels des revenus actifs par employeur (dict name, total)"""
+    rows = db.session.execute(
+        select(Employer.name, func.sum(monthly_amount(Revenue)))
+        .select_from(Revenue)
+        .outerjoin(Employer, Employer.id == Revenue.employer_id)
+        .where(Revenue.user_id == user.id, Revenue.is_active == True)
+        .group_by(Revenue.employer_id, Employer.name)
+    ).all()
+
+    return [
+        {'name': item['name'], 'total': item['total']}
+        for item in _merge_by_label((name or 'Autres revenus', None, total) for name, total in rows)
+    ]
+
+
+def _card_purchases_filter(user, month, year):
+    criteria = [CardPurchase.user_id == user.id, CardPurchase.is_active == True]
+    if month and year:
+        criteria += [
+            extract('month', CardPurchase.purchase_date) == month,
+            extract('year', CardPurchase.purchase_date) == year,
+        ]
+    return criteria
+
+
+@memoized_aggregate
+def card_purchases_by_merchant(user, month=None, year=None):
+    """Montants des achats actifs par commerçant, éventuellement limités à un mois (dict name, total)"""
+    rows = db.session.execute(
+        select(CardPurchase.merchant_name, func.sum(CardPurchase.amount))
+        .where(*_card_purchases_filter(user, month, year))
+        .group_by(CardPurchase.merchant_name)
+    ).all()
+
+    return [
+        {'name': item['name'], 'total': item['total']}
+        for item in _merge_by_label((name or 'Other', None, total) for name, total in rows)
+    ]
+
+
+@memoized_aggregate
+def card_purchases_by_category(user, locale, month=None, year=None):
+    """Montants des achats actifs par catégorie, libellés dans la langue demandée (dict name, color, total)"""
+    rows = db.session.execute(
+        select(Category.name, Category.name_en, Category.color, func.sum(CardPurchase.amount))
+        .select_from(CardPurchase)
+        .outerjoin(Category, Category.id == CardPurchase.category_id)
+        .where(*_card_purchases_filter(user, month, year))
+        .group_by(CardPurchase.category_id, Category.name, Category.name_en, Category.color)
+    ).all()
+
+    return _merge_by_label(
+        ((name_en if locale == 'en' and name_en else name) or 'Uncategorized', color, total)
+        for name, name_en, color, total in rows
+    )
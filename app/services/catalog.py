@@ -0,0 +1,148 @@
+"""
+Catalogue global en cache dans chaque processus
+
+Les catégories, services (avec leurs formules), types de crédit, plans et banques par
+défaut globaux (sans user_id) ne changent que depuis l'administration. Ils sont chargés
+une fois par worker sous forme d'enregistrements immuables et légers (namedtuple des
+colonnes, sans les logos) puis réutilisés tant que CatalogVersion.version, incrémentée
+par les événements ORM de app.models à chaque modification d'une ligne globale, ne
+change pas. La version est lue une fois par requête.
+
+Les éléments personnalisés de l'utilisateur restent lus en base et sont fusionnés
+par les appelants.
+"""
+import threading
+from collections import namedtuple
+from flask import g, has_app_context
+from sqlalchemy import select
+from app import db
+from app.utils.metrics import record_cache
+from app.models import Category, Service, ServicePlan, CreditType, Plan, DefaultBank, CatalogVersion
+
+# Types de catégories proposés pour les abonnements et pour les achats par carte
+SUBSCRIPTION_CATEGORY_TYPES = ('subscription', 'all')
+CARD_PURCHASE_CATEGORY_TYPES = ('card_purchase', 'all')
+
+# Colonnes volumineuses non chargées dans le catalogue (servies par leurs propres routes)
+EXCLUDED_COLUMNS = ('logo_data',)
+
+# Méthodes des modèles réutilisées telles quelles par les enregistrements
+RECORD_METHODS = ('get_name', 'get_description', 'is_global', 'is_custom', 'is_premium', 'to_dict')
+
+
+def _record_type(model, extra_fields=()):
+    """Type namedtuple immuable reprenant les colonnes et les méthodes d'affichage d'un modèle"""
+    columns = [
+        attr.columns[0] for attr in db.inspect(model).column_attrs
+        if not attr.deferred and attr.key not in EXCLUDED_COLUMNS
+    ]
+    base = namedtuple(f'{model.__name__}Record', [column.key for column in columns] + list(extra_fields))
+    namespace = {'__slots__': (), 'columns': tuple(columns), 'model': model}
+    for name in RECORD_METHODS:
+        if hasattr(model, name):
+            namespace[name] = getattr(model, name)
+    return type(base.__name__, (base,), namespace)
+
+
+CategoryRecord = _record_type(Category)
+ServiceRecord = _record_type(Service, extra_fields=('plans',))
+ServicePlanRecord = _record_type(ServicePlan)
+CreditTypeRecord = _record_type(CreditType)
+PlanRecord = _record_type(Plan)
+DefaultBankRecord = _record_type(DefaultBank)
+
+GlobalCatalog = namedtuple('GlobalCatalog', 'version categories services credit_types plans default_banks')
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def _load_records(record_type, *criteria, order_by=None):
+    model = record_type.model
+    query = select(*record_type.columns).where(model.is_active == True, *criteria)
+    if order_by is not None:
+        query = query.order_by(order_by)
+    return tuple(record_type(*row) for row in db.session.execute(query))
+
+
+def load_catalog(version):
+    """Charge le catalogue global actif (une requête par type, formules rattachées à leur service)"""
+    service_plans = {}
+    for plan in _load_records(ServicePlanRecord, ServicePlan.user_id.is_(None), order_by=ServicePlan.id):
+        service_plans.setdefault(plan.service_id, []).append(plan)
+
+    services = tuple(
+        ServiceRecord(*service, plans=tuple(service_plans.get(service.id, ())))
+        for service in db.session.execute(
+            select(*ServiceRecord.columns)
+            .where(Service.is_active == True, Service.user_id.is_(None))
+            .order_by(Service.name)
+        )
+    )
+
+    return GlobalCatalog(
+        version=version,
+        categories=_load_records(CategoryRecord, Category.user_id.is_(None), order_by=Category.name),
+        services=services,
+        credit_types=_load_records(CreditTypeRecord, CreditType.user_id.is_(None), order_by=CreditType.name),
+        plans=_load_records(PlanRecord, order_by=Plan.price),
+        default_banks=_load_records(DefaultBankRecord, order_by=DefaultBank.name),
+    )
+
+
+def catalog_version():
+    """Version courante du catalogue (0 si elle n'a jamais été incrémentée)"""
+    return db.session.scalar(select(CatalogVersion.version).limit(1)) or 0
+
+
+def get_catalog():
+    """Catalogue global du processus, rechargé si sa version a changé depuis son chargement"""
+    global _catalog
+    if has_app_context() and 'catalog' in g:
+        return g.catalog
+
+    version = catalog_version()
+    catalog = _catalog
+    record_cache('catalog', catalog is not None and catalog.version == version)
+    if catalog is None or catalog.version != version:
+        with _catalog_lock:
+            catalog = _catalog
+            if catalog is None or catalog.version != version:
+                catalog = _catalog = load_catalog(version)
+
+    if has_app_context():
+        g.catalog = catalog
+    return catalog
+
+
+def global_categories(category_types=None):
+    """Catégories globales actives triées par nom, éventuellement limitées à certains types"""
+    categories = get_catalog().categories
+    if category_types is None:
+        return list(categories)
+    return [category for category in categories if category.category_type in category_types]
+
+
+def global_services():
+    """Services globaux actifs triés par nom, avec leurs formules globales actives (attribut plans)"""
+    return list(get_catalog().services)
+
+
+def global_credit_types():
+    """Types de crédit globaux actifs triés par nom"""
+    return list(get_catalog().credit_types)
+
+
+def active_plans():
+    """Plans d'abonnement à l'application actifs, par prix croissant"""
+    return list(get_catalog().plans)
+
+
+def default_banks(language):
+    """Banques par défaut actives d'une langue, triées par nom"""
+    return [bank for bank in get_catalog().default_banks if bank.language == language]
+
+
+def sort_by_name(items):
+    """Trie des éléments globaux et personnalisés fusionnés par nom, sans tenir compte de la casse"""
+    return sorted(items, key=lambda item: item.name.casefold())
@@ -1,13 +1,22 @@
 """Module pour gérer les sauvegardes de l'application et de la base de données"""
+import hashlib
+import io
+import json
 import os
+import shutil
 import subprocess
 import tarfile
 import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
 from datetime import datetime
-import paramiko
 from typing import List, Dict, Optional
 import logging
 
+from app import db
+from app.models import BackupRecord
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,13 +34,49 @@ class BackupManager:
     APP_DIR = '/opt/budgeefamily'
     DB_NAME = 'budgeefamily_app'
     DB_USER = 'budgeefamily_user'
-
-    def __init__(self):
-        self.sftp_client = None
+    PG_DUMP_PATH = '/usr/bin/pg_dump'
+
+    # Fichiers/dossiers de l'application exclus de la sauvegarde
+    APP_EXCLUDE_PATTERNS = [
+        '.venv',
+        '__pycache__',
+        '*.pyc',
+        '.git',
+        '.env',
+        'migrations',
+        'app/static/uploads'  # Exclure les uploads pour limiter la taille
+    ]
+
+    # Sauvegarde en flux
+    ZSTD_PATH = 'zstd'
+    ZSTD_LEVEL = 3
+    DUMP_PART_SIZE = 16 * 1024 * 1024  # Taille des morceaux du dump dans l'archive (mémoire utilisée)
+    STREAM_CHUNK_SIZE = 1024 * 1024
+    BACKUP_EXTENSIONS = ('.tar.zst', '.tar.gz')  # .tar.gz : anciennes sauvegardes
+    ROW_COUNTS_NAME = 'database/row_counts.json'
+    DOCUMENT_MANIFEST_NAME = 'documents/manifest.json'  # Sauvegardes incrémentales
+
+    # Dump parallèle et restauration : dossier de travail local (dump non compressé)
+    BACKUP_WORK_DIR = tempfile.gettempdir()
+    PG_RESTORE_PATH = '/usr/bin/pg_restore'
+
+    def __init__(self, sftp_client=None):
+        """
+        Args:
+            sftp_client: Client SFTP déjà ouvert (par exemple LocalSFTPClient pour
+                         sauvegarder dans un dossier local) ; sinon connexion au serveur
+        """
+        self.sftp_client = sftp_client
         self.ssh_client = None
+        self.last_backup = None
+        if sftp_client:
+            self.ensure_remote_dir()
 
     def connect_sftp(self) -> bool:
         """Établir la connexion SFTP"""
+        # paramiko (et cryptography) n'est chargé que par les processus qui se connectent au SFTP
+        import paramiko
+
         try:
             self.ssh_client = paramiko.SSHClient()
             self.ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
@@ -50,14 +95,7 @@ class BackupManager:
             self.sftp_client = self.ssh_client.open_sftp()
             logger.info("SFTP ouvert avec succès")
 
-            # Créer le dossier distant s'il n'existe pas
-            try:
-                self.sftp_client.stat(self.SFTP_REMOTE_DIR)
-                logger.info(f"Dossier {self.SFTP_REMOTE_DIR} existe")
-            except FileNotFoundError:
-                logger.info(f"Création du dossier {self.SFTP_REMOTE_DIR}")
-                self.sftp_client.mkdir(self.SFTP_REMOTE_DIR)
-
+            self.ensure_remote_dir()
             return True
         except Exception as e:
             logger.info(f"Erreur de connexion SFTP: {e}")
@@ -65,6 +103,15 @@ class BackupManager:
             traceback.print_exc()
             return False
 
+    def ensure_remote_dir(self):
+        """Créer le dossier distant s'il n'existe pas"""
+        try:
+            self.sftp_client.stat(self.SFTP_REMOTE_DIR)
+            logger.info(f"Dossier {self.SFTP_REMOTE_DIR} existe")
+        except FileNotFoundError:
+            logger.info(f"Création du dossier {self.SFTP_REMOTE_DIR}")
+            self.sftp_client.mkdir(self.SFTP_REMOTE_DIR)
+
     def disconnect_sftp(self):
         """Fermer la connexion SFTP"""
         if self.sftp_client:
@@ -72,74 +119,287 @@ class BackupManager:
         if self.ssh_client:
             self.ssh_client.close()
 
-    def create_database_backup(self, output_file: str) -> bool:
-        """Créer une sauvegarde de la base de données PostgreSQL"""
-        try:
-            cmd = [
-                '/usr/bin/pg_dump',  # Chemin complet vers pg_dump
-                '-U', self.DB_USER,
-                '-h', 'localhost',
-                '-F', 'c',  # Format custom (compressé)
-                '-b',  # Inclure les large objects
-                '-v',  # Verbose
-                '-f', output_file,
-                self.DB_NAME
-            ]
-
-            # Exécuter pg_dump
-            env = os.environ.copy()
-            # Si vous avez besoin d'un mot de passe, utilisez PGPASSWORD
-            # env['PGPASSWORD'] = 'votre_mot_de_passe'
-
-            result = subprocess.run(
-                cmd,
-                env=env,
-                capture_output=True,
-                text=True
-            )
+    def database_dump_command(self, exclude_table_data=(), snapshot: Optional[str] = None,
+                              jobs: Optional[int] = None, output_dir: Optional[str] = None) -> List[str]:
+        """Commande pg_dump
+
+        Sans jobs : format custom écrit sur la sortie standard. Avec jobs : format
+        répertoire écrit dans output_dir par jobs processus en parallèle (une table par
+        processus). Dans les deux cas sans compression interne (-Z 0) : l'archive
+        complète est compressée une seule fois par zstd.
 
-            if result.returncode == 0:
-                return True
+        Args:
+            exclude_table_data: Tables dont seule la structure est sauvegardée
+            snapshot: Instantané exporté à utiliser (voir database_snapshot)
+            jobs: Nombre de processus pg_dump en parallèle
+            output_dir: Dossier de sortie du format répertoire
+        """
+        if jobs:
+            output_format = ['-F', 'd', '-j', str(jobs), '-f', output_dir]
+        else:
+            output_format = ['-F', 'c']  # Format custom (restauration sélective avec pg_restore)
+
+        return [
+            self.PG_DUMP_PATH,
+            '-U', self.DB_USER,
+            '-h', 'localhost',
+            *output_format,
+            '-Z', '0',
+            '-b',  # Inclure les large objects
+            *([f'--snapshot={snapshot}'] if snapshot else []),
+            *[f'--exclude-table-data={table}' for table in exclude_table_data],
+            self.DB_NAME
+        ]
+
+    @staticmethod
+    def count_rows(connection, exclude=()) -> Dict[str, int]:
+        """Nombre de lignes de chaque table de la base"""
+        from sqlalchemy import inspect, text
+
+        return {
+            table: connection.scalar(text(f'SELECT count(*) FROM "{table}"'))
+            for table in sorted(inspect(connection).get_table_names())
+            if table not in exclude
+        }
+
+    @contextmanager
+    def database_snapshot(self, exclude_table_data=()):
+        """Transaction de lecture dont l'instantané est partagé avec pg_dump
+
+        Les nombres de lignes sont comptés dans l'instantané exporté et pg_dump
+        l'importe (--snapshot) : ils correspondent exactement au contenu du dump,
+        même si la base est modifiée pendant la sauvegarde. Toute lecture faite sur la
+        connexion renvoyée voit le même instantané.
+
+        Yields:
+            Tuple (identifiant de l'instantané ou None hors PostgreSQL, nombres de lignes
+            par table, connexion de l'instantané)
+        """
+        from sqlalchemy import text
+
+        with db.engine.connect() as connection:
+            snapshot = None
+            if connection.dialect.name == 'postgresql':
+                connection = connection.execution_options(isolation_level='REPEATABLE READ')
+            with connection.begin():
+                if connection.dialect.name == 'postgresql':
+                    snapshot = connection.scalar(text('SELECT pg_export_snapshot()'))
+                # L'instantané reste valide tant que la transaction est ouverte
+                yield snapshot, self.count_rows(connection, exclude=exclude_table_data), connection
+
+    def iter_app_files(self):
+        """Fichiers de l'application à sauvegarder (chemin, nom dans l'archive)"""
+        for root, dirs, files in os.walk(self.APP_DIR):
+            # Filtrer les dossiers à exclure
+            dirs[:] = [d for d in dirs if not any(
+                d == pattern.strip('.').strip('/') for pattern in self.APP_EXCLUDE_PATTERNS
+            )]
+
+            for file in files:
+                file_path = os.path.join(root, file)
+                # Vérifier si le fichier doit être exclu
+                if not any(pattern.strip('*') in file_path for pattern in self.APP_EXCLUDE_PATTERNS):
+                    yield file_path, os.path.relpath(file_path, self.APP_DIR)
+
+    def _add_database_dump(self, tar: tarfile.TarFile, stream) -> int:
+        """Ajoute le dump lu en flux à l'archive, en morceaux de DUMP_PART_SIZE octets
+
+        Une entrée tar doit annoncer sa taille avant son contenu : le dump, de taille
+        inconnue, est donc découpé en database/<base>.dump.0000, .0001, etc. Pour
+        restaurer : cat database/<base>.dump.* | pg_restore ...
+        """
+        total = 0
+        index = 0
+        while True:
+            part = stream.read(self.DUMP_PART_SIZE)
+            if not part and index:
+                break
+            info = tarfile.TarInfo(f'database/{self.DB_NAME}.dump.{index:04d}')
+            info.size = len(part)
+            info.mtime = int(time.time())
+            tar.addfile(info, io.BytesIO(part))
+            total += len(part)
+            index += 1
+            if len(part) < self.DUMP_PART_SIZE:
+                break
+        return total
+
+    def _add_database_directory(self, tar: tarfile.TarFile, dump_dir: str) -> int:
+        """Ajoute un dump au format répertoire à l'archive (database/<base>.dir/)"""
+        total = 0
+        for name in sorted(os.listdir(dump_dir)):
+            path = os.path.join(dump_dir, name)
+            tar.add(path, arcname=f'database/{self.DB_NAME}.dir/{name}', recursive=False)
+            total += os.path.getsize(path)
+        return total
+
+    def stream_backup_to_sftp(self, remote_filename: str, exclude_table_data=(), extra_files=(),
+                              jobs: Optional[int] = None, snapshot_files=None) -> Optional[Dict[str, any]]:
+        """Sauvegarde en flux : pg_dump -> tar -> zstd multi-thread -> fichier SFTP
+
+        Les étapes s'exécutent en parallèle (processus pg_dump et zstd, thread
+        d'écriture du tar, upload dans le thread courant) : aucun fichier local
+        n'est écrit et la durée est celle de l'étape la plus lente. Avec jobs, le
+        dump est d'abord écrit au format répertoire par plusieurs processus dans
+        BACKUP_WORK_DIR, puis envoyé de la même façon.
+
+        Le SHA-256 est calculé pendant l'upload et déposé à côté de l'archive
+        (<nom>.sha256). L'archive est écrite sous <nom>.part puis renommée une fois
+        complète. Elle contient aussi database/row_counts.json (nombre de lignes de
+        chaque table au moment du dump) pour vérifier les restaurations.
+
+        Args:
+            remote_filename: Nom de l'archive sur le serveur
+            exclude_table_data: Tables dont les données ne sont pas incluses dans le dump
+            extra_files: Fichiers supplémentaires (nom dans l'archive, contenu en octets)
+            jobs: Nombre de processus pg_dump en parallèle (format répertoire)
+            snapshot_files: Fonction appelée avec la connexion de l'instantané avant le dump,
+                renvoyant des fichiers supplémentaires lus dans le même instantané que le dump
+
+        Returns:
+            Dict avec filename, size et sha256, ou None en cas d'échec
+        """
+        if not self.sftp_client:
+            if not self.connect_sftp():
+                return None
+
+        with ExitStack() as stack:
+            snapshot, row_counts, connection = stack.enter_context(self.database_snapshot(exclude_table_data))
+            extra_files = [(self.ROW_COUNTS_NAME, json.dumps(row_counts).encode('utf-8')), *extra_files]
+            if snapshot_files:
+                extra_files.extend(snapshot_files(connection))
+
+            dump = None
+            dump_dir = None
+            if jobs:
+                work_dir = stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix='budgeefamily_dump_', dir=self.BACKUP_WORK_DIR)
+                )
+                dump_dir = os.path.join(work_dir, self.DB_NAME)
+                started = time.time()
+                result = subprocess.run(
+                    self.database_dump_command(exclude_table_data, snapshot, jobs, dump_dir),
+                    env=os.environ.copy(),
+                    capture_output=True
+                )
+                if result.returncode != 0:
+                    logger.info(f"Erreur lors de la sauvegarde en flux: pg_dump: {result.stderr.decode(errors='replace').strip()}")
+                    return None
+                logger.info(f"Dump parallèle ({jobs} processus) terminé en {time.time() - started:.1f} s")
             else:
-                logger.info(f"Erreur pg_dump: {result.stderr}")
-                return False
-        except Exception as e:
-            logger.info(f"Erreur lors de la sauvegarde de la base de données: {e}")
-            return False
+                dump = subprocess.Popen(
+                    self.database_dump_command(exclude_table_data, snapshot),
+                    env=os.environ.copy(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE
+                )
 
-    def create_app_backup(self, output_file: str) -> bool:
-        """Créer une archive des fichiers de l'application"""
-        try:
-            # Fichiers/dossiers à exclure
-            exclude_patterns = [
-                '.venv',
-                '__pycache__',
-                '*.pyc',
-                '.git',
-                '.env',
-                'migrations',
-                'app/static/uploads'  # Exclure les uploads pour limiter la taille
-            ]
-
-            with tarfile.open(output_file, 'w:gz') as tar:
-                # Ajouter tous les fichiers sauf ceux à exclure
-                for root, dirs, files in os.walk(self.APP_DIR):
-                    # Filtrer les dossiers à exclure
-                    dirs[:] = [d for d in dirs if not any(
-                        d == pattern.strip('.').strip('/') for pattern in exclude_patterns
-                    )]
-
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        # Vérifier si le fichier doit être exclu
-                        if not any(pattern.strip('*') in file_path for pattern in exclude_patterns):
-                            arcname = os.path.relpath(file_path, self.APP_DIR)
-                            tar.add(file_path, arcname=arcname)
+            return self._upload_archive(remote_filename, dump, dump_dir, extra_files)
 
-            return True
+    def _upload_archive(self, remote_filename: str, dump, dump_dir: Optional[str], extra_files) -> Optional[Dict[str, any]]:
+        """Construit l'archive (dump, fichiers supplémentaires, application), la compresse et l'envoie
+
+        Args:
+            dump: Processus pg_dump écrivant sur sa sortie standard, ou None
+            dump_dir: Dump au format répertoire déjà écrit, ou None
+        """
+        remote_path = f"{self.SFTP_REMOTE_DIR}/{remote_filename}"
+        partial_path = f"{remote_path}.part"
+
+        compressor = subprocess.Popen(
+            [self.ZSTD_PATH, f'-{self.ZSTD_LEVEL}', '-T0', '-q', '-c'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+
+        errors = []
+        dump_stderr = []
+        stats = {}
+
+        def stop_dump():
+            # Débloquer pg_dump s'il écrit encore dans un tube que plus personne ne lit
+            if dump:
+                dump.kill()
+
+        def write_archive():
+            try:
+                with tarfile.open(fileobj=compressor.stdin, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                    if dump:
+                        stats['database'] = self._add_database_dump(tar, dump.stdout)
+                    else:
+                        stats['database'] = self._add_database_directory(tar, dump_dir)
+                    for arcname, content in extra_files:
+                        info = tarfile.TarInfo(arcname)
+                        info.size = len(content)
+                        info.mtime = int(time.time())
+                        tar.addfile(info, io.BytesIO(content))
+                    stats['app_files'] = 0
+                    for file_path, arcname in self.iter_app_files():
+                        tar.add(file_path, arcname=f'app/{arcname}', recursive=False)
+                        stats['app_files'] += 1
+            except Exception as e:
+                errors.append(e)
+                stop_dump()
+            finally:
+                try:
+                    compressor.stdin.close()
+                except OSError:
+                    pass
+
+        threads = [threading.Thread(target=write_archive, name='backup-tar', daemon=True)]
+        if dump:
+            threads.append(threading.Thread(
+                target=lambda: dump_stderr.append(dump.stderr.read()), name='backup-pg-dump-stderr', daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        checksum = hashlib.sha256()
+        size = 0
+        try:
+            with self.sftp_client.open(partial_path, 'wb') as remote_file:
+                if hasattr(remote_file, 'set_pipelined'):
+                    remote_file.set_pipelined(True)
+                for chunk in iter(lambda: compressor.stdout.read(self.STREAM_CHUNK_SIZE), b''):
+                    checksum.update(chunk)
+                    remote_file.write(chunk)
+                    size += len(chunk)
         except Exception as e:
-            logger.info(f"Erreur lors de la sauvegarde de l'application: {e}")
-            return False
+            errors.append(e)
+            # Arrêter le pipeline : les écritures en attente échouent et les threads se terminent
+            stop_dump()
+            compressor.kill()
+        finally:
+            for thread in threads:
+                thread.join()
+            if dump:
+                dump.wait()
+            compressor.wait()
+
+        if not errors and dump and dump.returncode != 0:
+            errors.append(RuntimeError(f"pg_dump: {(dump_stderr[0] if dump_stderr else b'').decode(errors='replace').strip()}"))
+        if not errors and compressor.returncode != 0:
+            errors.append(RuntimeError(f"zstd a échoué (code {compressor.returncode})"))
+
+        if errors:
+            logger.info(f"Erreur lors de la sauvegarde en flux: {errors[0]}")
+            try:
+                self.sftp_client.remove(partial_path)
+            except (IOError, OSError):
+                pass
+            return None
+
+        self.sftp_client.rename(partial_path, remote_path)
+        sha256 = checksum.hexdigest()
+        with self.sftp_client.open(f"{remote_path}.sha256", 'w') as checksum_file:
+            checksum_file.write(f"{sha256}  {remote_filename}\n")
+
+        logger.info(
+            f"Sauvegarde envoyée: {size} octets compressés "
+            f"(dump {stats.get('database', 0)} octets, {stats.get('app_files', 0)} fichiers), sha256 {sha256}"
+        )
+        self.record_backup(remote_filename, size, sha256)
+        return {'filename': remote_filename, 'size': size, 'sha256': sha256}
 
     def upload_to_sftp(self, local_file: str, remote_filename: str) -> bool:
         """Uploader un fichier vers le serveur SFTP"""
@@ -155,59 +415,219 @@ class BackupManager:
             logger.info(f"Erreur lors de l'upload SFTP: {e}")
             return False
 
-    def create_full_backup(self, backup_type: str = "manual") -> Optional[str]:
-        """Créer une sauvegarde complète (DB + App) et l'uploader
+    def create_full_backup(self, backup_type: str = "manual", jobs: Optional[int] = None) -> Optional[str]:
+        """Créer une sauvegarde complète (DB + App) et l'envoyer en flux sur le SFTP
 
         Args:
             backup_type: Type de sauvegarde ('manual' ou 'auto')
+            jobs: Nombre de processus pg_dump en parallèle (dump au format répertoire)
         """
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_name = f"budgeefamily_backup_{timestamp}_{backup_type}"
+        backup_name = f"budgeefamily_backup_{timestamp}_{backup_type}.tar.zst"
 
         try:
-            with tempfile.TemporaryDirectory() as tmpdir:
-                logger.info(f"Création de la sauvegarde dans {tmpdir}")
-
-                # Créer la sauvegarde de la base de données
-                logger.info("Étape 1/4: Sauvegarde de la base de données...")
-                db_backup_file = os.path.join(tmpdir, f"{backup_name}_db.dump")
-                if not self.create_database_backup(db_backup_file):
-                    logger.info("Échec de la sauvegarde de la base de données")
-                    return None
-                logger.info(f"Base de données sauvegardée: {os.path.getsize(db_backup_file)} octets")
-
-                # Créer la sauvegarde de l'application
-                logger.info("Étape 2/4: Sauvegarde de l'application...")
-                app_backup_file = os.path.join(tmpdir, f"{backup_name}_app.tar.gz")
-                if not self.create_app_backup(app_backup_file):
-                    logger.info("Échec de la sauvegarde de l'application")
-                    return None
-                logger.info(f"Application sauvegardée: {os.path.getsize(app_backup_file)} octets")
-
-                # Créer une archive finale contenant les deux sauvegardes
-                logger.info("Étape 3/4: Création de l'archive finale...")
-                final_backup_file = os.path.join(tmpdir, f"{backup_name}.tar.gz")
-                with tarfile.open(final_backup_file, 'w:gz') as tar:
-                    tar.add(db_backup_file, arcname=os.path.basename(db_backup_file))
-                    tar.add(app_backup_file, arcname=os.path.basename(app_backup_file))
-                logger.info(f"Archive finale créée: {os.path.getsize(final_backup_file)} octets")
-
-                # Uploader vers SFTP
-                logger.info("Étape 4/4: Upload vers SFTP...")
-                if not self.upload_to_sftp(final_backup_file, f"{backup_name}.tar.gz"):
-                    logger.info("Échec de l'upload SFTP")
-                    return None
-                logger.info("Upload SFTP réussi")
-
-                return f"{backup_name}.tar.gz"
+            logger.info(f"Sauvegarde en flux vers {self.SFTP_REMOTE_DIR}/{backup_name}")
+            result = self.stream_backup_to_sftp(backup_name, jobs=jobs)
+            if not result:
+                logger.info("Échec de la sauvegarde en flux")
+                return None
+
+            self.last_backup = result
+            return backup_name
         except Exception as e:
             logger.info(f"Erreur lors de la création de la sauvegarde complète: {e}")
             import traceback
             traceback.print_exc()
             return None
 
-    def list_backups(self) -> List[Dict[str, any]]:
-        """Lister les sauvegardes disponibles sur le serveur SFTP"""
+    # ------------------------------------------------------------------
+    # Restauration
+    # ------------------------------------------------------------------
+
+    def database_url(self, database: str) -> str:
+        """URL SQLAlchemy de l'application, pointant vers une autre base"""
+        from flask import current_app
+        from sqlalchemy.engine import make_url
+
+        url = make_url(current_app.config['SQLALCHEMY_DATABASE_URI']).set(database=database)
+        return url.render_as_string(hide_password=False)
+
+    def _admin_execute(self, statement: str):
+        """Exécute une commande hors transaction (CREATE/DROP DATABASE) sur la base de maintenance"""
+        from sqlalchemy import create_engine, text
+
+        engine = create_engine(self.database_url('postgres'), isolation_level='AUTOCOMMIT')
+        try:
+            with engine.connect() as connection:
+                connection.execute(text(statement))
+        finally:
+            engine.dispose()
+
+    def create_scratch_database(self, name: str):
+        self._admin_execute(f'CREATE DATABASE "{name}"')
+
+    def drop_scratch_database(self, name: str):
+        self._admin_execute(f'DROP DATABASE IF EXISTS "{name}"')
+
+    def extract_archive(self, filename: str, work_dir: str) -> Dict[str, any]:
+        """Télécharge une sauvegarde et en extrait le dump et les métadonnées
+
+        Gère les trois formats d'archive : dump custom découpé en morceaux, dump au
+        format répertoire et anciennes archives .tar.gz (<nom>_db.dump).
+
+        Returns:
+            Dict avec dump (chemin du fichier ou du dossier, ou None), row_counts et
+            manifest (documents des sauvegardes incrémentales), ces deux derniers
+            valant None s'ils sont absents
+        """
+        archive_path = os.path.join(work_dir, filename)
+        if not self.download_backup(filename, archive_path):
+            raise RuntimeError(f"Téléchargement impossible: {filename}")
+
+        contents = {'dump': None, 'row_counts': None, 'manifest': None}
+        dump_file = os.path.join(work_dir, f'{self.DB_NAME}.dump')
+        dump_dir = os.path.join(work_dir, f'{self.DB_NAME}.dir')
+
+        if filename.endswith('.tar.zst'):
+            decompressor = subprocess.Popen([self.ZSTD_PATH, '-d', '-q', '-c', archive_path], stdout=subprocess.PIPE)
+            tar = tarfile.open(fileobj=decompressor.stdout, mode='r|')
+        else:
+            decompressor = None
+            tar = tarfile.open(archive_path, mode='r|gz')
+
+        with tar:
+            # Lecture séquentielle : les morceaux du dump arrivent dans l'ordre (.0000, .0001, ...)
+            for member in tar:
+                name = member.name
+                if name.startswith(f'database/{self.DB_NAME}.dump.') or name.endswith('_db.dump'):
+                    with open(dump_file, 'ab') as f:
+                        shutil.copyfileobj(tar.extractfile(member), f)
+                    contents['dump'] = dump_file
+                elif name.startswith(f'database/{self.DB_NAME}.dir/') and member.isfile():
+                    os.makedirs(dump_dir, exist_ok=True)
+                    with open(os.path.join(dump_dir, os.path.basename(name)), 'wb') as f:
+                        shutil.copyfileobj(tar.extractfile(member), f)
+                    contents['dump'] = dump_dir
+                elif name == self.ROW_COUNTS_NAME:
+                    contents['row_counts'] = json.loads(tar.extractfile(member).read())
+                elif name == self.DOCUMENT_MANIFEST_NAME:
+                    contents['manifest'] = json.loads(tar.extractfile(member).read())
+
+        if decompressor and decompressor.wait() != 0:
+            raise RuntimeError(f"Décompression impossible: {filename}")
+        os.remove(archive_path)
+        return contents
+
+    def restore_database(self, dump_path: str, database: str, jobs: Optional[int] = None):
+        """Restaure un dump (fichier custom ou dossier) avec pg_restore, en parallèle si jobs est donné"""
+        from sqlalchemy.engine import make_url
+
+        url = make_url(self.database_url(database))
+        command = [
+            self.PG_RESTORE_PATH,
+            '-U', url.username or self.DB_USER,
+            '-h', url.host or 'localhost',
+            '--no-owner',
+            '--exit-on-error',
+            *(['-j', str(jobs)] if jobs else []),
+            '-d', database,
+            dump_path
+        ]
+        env = dict(os.environ, PGPASSWORD=url.password) if url.password else os.environ.copy()
+        result = subprocess.run(command, env=env, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"pg_restore: {result.stderr.decode(errors='replace').strip()}")
+
+    def restore_archive_extras(self, contents: Dict[str, any], database_url: str) -> Dict[str, int]:
+        """Étape exécutée après pg_restore (voir IncrementalBackupManager)"""
+        if contents['manifest'] is not None:
+            raise ValueError("Sauvegarde incrémentale : restaurer avec IncrementalBackupManager")
+        return {}
+
+    def expected_row_counts(self, contents: Dict[str, any]) -> Optional[Dict[str, int]]:
+        """Nombre de lignes attendu par table après restauration de l'archive"""
+        return contents['row_counts']
+
+    def restore_backup(self, filename: str, database: Optional[str] = None, jobs: Optional[int] = None,
+                       verify: bool = True, drop: bool = False) -> Dict[str, any]:
+        """Restaure une sauvegarde dans une base de travail et vérifie le nombre de lignes
+
+        Args:
+            filename: Nom de la sauvegarde
+            database: Base cible, créée par la restauration (budgeefamily_restore_<date> par défaut)
+            jobs: Nombre de processus pg_restore en parallèle
+            verify: Comparer le nombre de lignes de chaque table à celui enregistré dans l'archive
+            drop: Supprimer la base une fois la vérification faite
+
+        Returns:
+            Dict avec database, duration, extras (étape supplémentaire), checked (tables
+            vérifiées) et mismatches (table -> (attendu, trouvé))
+        """
+        from sqlalchemy import create_engine
+
+        if not self.sftp_client:
+            if not self.connect_sftp():
+                raise RuntimeError("Connexion SFTP impossible")
+
+        database = database or f"budgeefamily_restore_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        started = time.time()
+        report = {'database': database, 'extras': {}, 'checked': 0, 'mismatches': {}}
+
+        with tempfile.TemporaryDirectory(prefix='budgeefamily_restore_', dir=self.BACKUP_WORK_DIR) as work_dir:
+            contents = self.extract_archive(filename, work_dir)
+            if not contents['dump']:
+                raise ValueError(f"{filename} ne contient pas de dump de la base")
+
+            self.create_scratch_database(database)
+            try:
+                self.restore_database(contents['dump'], database, jobs)
+                database_url = self.database_url(database)
+                report['extras'] = self.restore_archive_extras(contents, database_url)
+
+                expected = self.expected_row_counts(contents)
+                if verify and expected is not None:
+                    engine = create_engine(database_url)
+                    try:
+                        with engine.connect() as connection:
+                            found = self.count_rows(connection)
+                    finally:
+                        engine.dispose()
+                    for table, count in expected.items():
+                        if found.get(table) != count:
+                            report['mismatches'][table] = (count, found.get(table))
+                    report['checked'] = len(expected)
+                elif verify:
+                    logger.info(f"{filename}: pas de nombre de lignes enregistré, vérification impossible")
+            finally:
+                if drop:
+                    self.drop_scratch_database(database)
+
+        report['duration'] = round(time.time() - started, 1)
+        logger.info(
+            f"Restauration de {filename} dans {database} en {report['duration']} s: "
+            f"{report['checked']} tables vérifiées, {len(report['mismatches'])} différences"
+        )
+        return report
+
+    def verify_backup(self, filename: str, jobs: Optional[int] = None) -> Dict[str, any]:
+        """Restaure une sauvegarde dans une base temporaire, compare les nombres de lignes puis supprime la base"""
+        return self.restore_backup(filename, jobs=jobs, verify=True, drop=True)
+
+    @classmethod
+    def is_backup_filename(cls, filename: str) -> bool:
+        """Vérifie qu'un nom de fichier correspond à une archive de sauvegarde"""
+        return filename.startswith('budgeefamily_backup_') and filename.endswith(cls.BACKUP_EXTENSIONS)
+
+    @classmethod
+    def strip_backup_extension(cls, filename: str) -> str:
+        """Nom de la sauvegarde sans l'extension de l'archive"""
+        for extension in cls.BACKUP_EXTENSIONS:
+            if filename.endswith(extension):
+                return filename[:-len(extension)]
+        return filename
+
+    def list_remote_backups(self) -> List[Dict[str, any]]:
+        """Lister les sauvegardes présentes sur le serveur SFTP (voir reconcile_catalog)"""
         backups = []
         try:
             if not self.sftp_client:
@@ -218,18 +638,13 @@ class BackupManager:
             files = self.sftp_client.listdir_attr(self.SFTP_REMOTE_DIR)
 
             for file_attr in files:
-                if file_attr.filename.startswith('budgeefamily_backup_') and file_attr.filename.endswith('.tar.gz'):
-                    # Extraire le type de sauvegarde depuis le nom du fichier
-                    # Format: budgeefamily_backup_YYYYMMDD_HHMMSS_TYPE.tar.gz
-                    filename_parts = file_attr.filename.replace('.tar.gz', '').split('_')
-                    backup_type = filename_parts[-1] if len(filename_parts) >= 5 else 'inconnu'
-
+                if self.is_backup_filename(file_attr.filename):
                     backups.append({
                         'filename': file_attr.filename,
                         'size': file_attr.st_size,
                         'modified': datetime.fromtimestamp(file_attr.st_mtime),
                         'size_mb': round(file_attr.st_size / (1024 * 1024), 2),
-                        'type': backup_type
+                        'type': self.backup_type_from_filename(file_attr.filename)
                     })
 
             # Trier par date (plus récent en premier)
@@ -240,6 +655,94 @@ class BackupManager:
             logger.info(f"Erreur lors du listage des sauvegardes: {e}")
             return backups
 
+    @classmethod
+    def backup_type_from_filename(cls, filename: str) -> str:
+        """Type de sauvegarde d'après le nom du fichier
+
+        Format: budgeefamily_backup_YYYYMMDD_HHMMSS_TYPE.tar.zst (ou .tar.gz)
+        """
+        filename_parts = cls.strip_backup_extension(filename).split('_')
+        return filename_parts[-1] if len(filename_parts) >= 5 else 'inconnu'
+
+    def list_backups(self, backup_type: Optional[str] = None) -> List[Dict[str, any]]:
+        """Lister les sauvegardes depuis le catalogue local, de la plus récente à la plus ancienne
+
+        Args:
+            backup_type: Limiter à un type de sauvegarde ('manual', 'auto', 'incremental')
+        """
+        query = BackupRecord.query
+        if backup_type:
+            query = query.filter_by(backup_type=backup_type)
+        return [record.to_dict() for record in query.order_by(BackupRecord.backup_date.desc())]
+
+    def record_backup(self, filename: str, size: int, sha256: Optional[str] = None,
+                      backup_date: Optional[datetime] = None) -> BackupRecord:
+        """Ajoute ou met à jour une sauvegarde dans le catalogue local"""
+        record = BackupRecord.query.filter_by(filename=filename).first()
+        if record is None:
+            record = BackupRecord(filename=filename, backup_type=self.backup_type_from_filename(filename))
+            db.session.add(record)
+        record.size = size
+        record.sha256 = sha256
+        record.backup_date = backup_date or datetime.now()
+        db.session.commit()
+        return record
+
+    def read_remote_checksum(self, filename: str) -> Optional[str]:
+        """SHA-256 déposé à côté d'une sauvegarde (<nom>.sha256), None s'il est absent"""
+        try:
+            with self.sftp_client.open(f"{self.SFTP_REMOTE_DIR}/{filename}.sha256", 'r') as checksum_file:
+                content = checksum_file.read()
+        except (IOError, OSError):
+            return None
+        if isinstance(content, bytes):
+            content = content.decode()
+        return content.split()[0] if content.strip() else None
+
+    def reconcile_catalog(self) -> Dict[str, int]:
+        """Aligne le catalogue local sur le contenu du serveur SFTP
+
+        Ajoute les sauvegardes absentes du catalogue (copiées ou restaurées à la main),
+        retire celles qui n'existent plus sur le serveur et corrige les tailles.
+
+        Returns:
+            Dict avec le nombre de sauvegardes ajoutées, retirées et mises à jour
+        """
+        if not self.sftp_client:
+            if not self.connect_sftp():
+                raise RuntimeError("Connexion SFTP impossible")
+
+        remote = {backup['filename']: backup for backup in self.list_remote_backups()}
+        records = {record.filename: record for record in BackupRecord.query}
+        result = {'added': 0, 'removed': 0, 'updated': 0}
+
+        for filename, record in records.items():
+            if filename not in remote:
+                db.session.delete(record)
+                result['removed'] += 1
+            elif record.size != remote[filename]['size']:
+                record.size = remote[filename]['size']
+                record.sha256 = self.read_remote_checksum(filename)
+                result['updated'] += 1
+
+        for filename, backup in remote.items():
+            if filename not in records:
+                db.session.add(BackupRecord(
+                    filename=filename,
+                    backup_type=backup['type'],
+                    size=backup['size'],
+                    sha256=self.read_remote_checksum(filename),
+                    backup_date=backup['modified']
+                ))
+                result['added'] += 1
+
+        db.session.commit()
+        logger.info(
+            f"Catalogue des sauvegardes: {result['added']} ajoutées, {result['removed']} retirées, "
+            f"{result['updated']} mises à jour"
+        )
+        return result
+
     def download_backup(self, filename: str, local_path: str) -> bool:
         """Télécharger une sauvegarde depuis le serveur SFTP"""
         try:
@@ -262,7 +765,20 @@ class BackupManager:
                     return False
 
             remote_path = f"{self.SFTP_REMOTE_DIR}/{filename}"
-            self.sftp_client.remove(remote_path)
+            try:
+                self.sftp_client.remove(remote_path)
+            except FileNotFoundError:
+                # Déjà absente du serveur : seul le catalogue était en retard
+                logger.info(f"Sauvegarde {filename} absente du serveur")
+
+            # Somme de contrôle associée (absente pour les anciennes sauvegardes)
+            try:
+                self.sftp_client.remove(f"{remote_path}.sha256")
+            except (IOError, OSError):
+                pass
+
+            BackupRecord.query.filter_by(filename=filename).delete()
+            db.session.commit()
             return True
         except Exception as e:
             logger.info(f"Erreur lors de la suppression: {e}")
@@ -280,11 +796,8 @@ class BackupManager:
             Dict avec le nombre de sauvegardes conservées et supprimées
         """
         try:
-            # Récupérer toutes les sauvegardes
-            all_backups = self.list_backups()
-
-            # Filtrer uniquement les sauvegardes automatiques
-            auto_backups = [b for b in all_backups if b.get('type') == 'auto']
+            # Sauvegardes automatiques du catalogue local
+            auto_backups = self.list_backups('auto')
 
             if not auto_backups:
                 return {'kept': 0, 'deleted': 0}
@@ -354,3 +867,50 @@ class BackupManager:
             import traceback
             traceback.print_exc()
             return {'kept': 0, 'deleted': 0}
+
+
+class LocalSFTPClient:
+    """Équivalent local d'un client SFTP paramiko, limité aux opérations des sauvegardes
+
+    Les chemins distants sont résolus sous un dossier local : permet de sauvegarder
+    sans serveur SFTP (développement, tests du pipeline de sauvegarde).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _local(self, path: str) -> str:
+        return os.path.join(self.root, path.lstrip('/'))
+
+    def open(self, path: str, mode: str = 'r'):
+        return open(self._local(path), mode)
+
+    def stat(self, path: str):
+        from paramiko import SFTPAttributes
+        return SFTPAttributes.from_stat(os.stat(self._local(path)))
+
+    def mkdir(self, path: str):
+        os.makedirs(self._local(path))
+
+    def listdir_attr(self, path: str):
+        from paramiko import SFTPAttributes
+        directory = self._local(path)
+        return [
+            SFTPAttributes.from_stat(os.stat(os.path.join(directory, name)), name)
+            for name in os.listdir(directory)
+        ]
+
+    def remove(self, path: str):
+        os.remove(self._local(path))
+
+    def rename(self, old_path: str, new_path: str):
+        os.rename(self._local(old_path), self._local(new_path))
+
+    def put(self, local_path: str, remote_path: str):
+        shutil.copyfile(local_path, self._local(remote_path))
+
+    def get(self, remote_path: str, local_path: str):
+        shutil.copyfile(self._local(remote_path), local_path)
+
+    def close(self):
+        pass
@@ -0,0 +1,251 @@
+"""
+Pool de connexions SQLAlchemy : options configurables et instrumentation
+
+Les options du moteur (taille du pool, débordement, pre-ping, recyclage, délai
+maximal des requêtes) sont construites depuis la configuration (DB_POOL_*,
+DB_STATEMENT_TIMEOUT_MS) ; SQLALCHEMY_ENGINE_OPTIONS, s'il est défini, reste
+prioritaire. Chaque processus compte ses emprunts de connexion, le temps d'attente
+d'une connexion libre, les connexions ouvertes et fermées (renouvellement) et
+l'état courant du pool (connexions actives, débordement).
+
+Mode PgBouncer (DB_PGBOUNCER) : l'application se connecte à PgBouncer en mode
+« transaction pooling », où deux transactions successives d'une même connexion
+applicative peuvent être servies par deux connexions PostgreSQL différentes.
+Aucun état de session ne doit donc être posé : pas de paramètre de démarrage
+(`options`), pas de SET hors transaction, de LISTEN, de PREPARE, de table
+temporaire ni de verrou consultatif de session. Le pool applicatif est remplacé
+par NullPool (PgBouncer gère la réutilisation des connexions) et les requêtes qui
+posent un état de session sont signalées dans les journaux.
+"""
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import NullPool, QueuePool
+from app import db
+
+# Requêtes qui posent un état de session, incompatibles avec PgBouncer en mode transaction
+SESSION_STATE_PATTERN = re.compile(
+    r'^\s*(SET\s+(?!(LOCAL|TRANSACTION)\b)(SESSION\s+)?\w|RESET\b|LISTEN\b|UNLISTEN\b|PREPARE\b|DEALLOCATE\b'
+    r'|DECLARE\b.*\bWITH\s+HOLD\b|CREATE\s+(GLOBAL\s+|LOCAL\s+)?TEMP(ORARY)?\b)'
+    r'|\bpg_advisory_lock\b|\bset_config\s*\([^)]*,\s*false\s*\)',
+    re.IGNORECASE | re.DOTALL,
+)
+
+# Temps d'attente d'une connexion mesuré dans _do_get et lu par l'événement checkout du même thread
+_checkout_wait = threading.local()
+
+
+class _TimedCheckoutMixin:
+    """Mesure le temps passé à obtenir une connexion (attente d'une connexion libre ou ouverture)"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _checkout_wait.seconds = time.perf_counter() - start
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckoutMixin, NullPool):
+    pass
+
+
+class PoolStats:
+    """Compteurs du pool d'un moteur dans le processus courant"""
+
+    COUNTERS = ('checkouts', 'checkins', 'connects', 'closes', 'invalidations', 'slow_checkouts', 'session_state_statements')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for name in self.COUNTERS:
+                setattr(self, name, 0)
+            self.checkout_wait_total = 0.0
+            self.checkout_wait_max = 0.0
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_checkout(self, wait, slow_threshold):
+        with self._lock:
+            self.checkouts += 1
+            self.checkout_wait_total += wait
+            self.checkout_wait_max = max(self.checkout_wait_max, wait)
+            if wait >= slow_threshold:
+                self.slow_checkouts += 1
+
+    def as_dict(self):
+        with self._lock:
+            stats = {name: getattr(self, name) for name in self.COUNTERS}
+            stats['checkout_wait_total_ms'] = round(self.checkout_wait_total * 1000, 2)
+            stats['checkout_wait_max_ms'] = round(self.checkout_wait_max * 1000, 2)
+            stats['checkout_wait_avg_ms'] = round(self.checkout_wait_total * 1000 / self.checkouts, 2) if self.checkouts else 0.0
+        return stats
+
+
+def is_postgresql(uri):
+    return make_url(uri).get_backend_name() == 'postgresql'
+
+
+def engine_options(config):
+    """
+    Options du moteur SQLAlchemy déduites de la configuration
+
+    Le dimensionnement du pool et le délai maximal des requêtes ne concernent que
+    PostgreSQL (SQLite garde le pool choisi par Flask-SQLAlchemy). Les options de
+    SQLALCHEMY_ENGINE_OPTIONS remplacent celles calculées ici.
+    """
+    options = {
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+    }
+
+    if is_postgresql(config['SQLALCHEMY_DATABASE_URI']):
+        if config['DB_PGBOUNCER']:
+            # PgBouncer réutilise déjà les connexions : une connexion applicative par
+            # transaction, sans paramètre de démarrage. Le pre-ping ne testerait que PgBouncer.
+            options.update(poolclass=TimedNullPool, pool_pre_ping=False)
+        else:
+            options.update(
+                poolclass=TimedQueuePool,
+                pool_size=config['DB_POOL_SIZE'],
+                max_overflow=config['DB_POOL_MAX_OVERFLOW'],
+                pool_timeout=config['DB_POOL_TIMEOUT'],
+                pool_use_lifo=True,
+            )
+            if config['DB_STATEMENT_TIMEOUT_MS']:
+                options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+
+    options.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return options
+
+
+def configure_engine_options(app):
+    """Renseigne SQLALCHEMY_ENGINE_OPTIONS avant l'initialisation de Flask-SQLAlchemy"""
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+
+def _instrument_engine(app, engine, stats):
+    slow_threshold = app.config['DB_POOL_SLOW_CHECKOUT_MS'] / 1000
+    logger = app.logger
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        stats.increment('connects')
+
+    @event.listens_for(engine, 'close')
+    def on_close(dbapi_connection, connection_record):
+        stats.increment('closes')
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        stats.increment('invalidations')
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        stats.increment('checkins')
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        wait = getattr(_checkout_wait, 'seconds', 0.0)
+        _checkout_wait.seconds = 0.0
+        stats.record_checkout(wait, slow_threshold)
+        if wait >= slow_threshold:
+            logger.warning(
+                f"Pool SQL : connexion obtenue en {wait * 1000:.0f} ms "
+                f"({engine.pool.status()}) ; augmenter DB_POOL_SIZE ou réduire les threads par worker"
+            )
+
+    if app.config['DB_PGBOUNCER']:
+        @event.listens_for(engine, 'before_cursor_execute')
+        def on_execute(conn, cursor, statement, parameters, context, executemany):
+            if SESSION_STATE_PATTERN.search(statement):
+                stats.increment('session_state_statements')
+                logger.warning(f"PgBouncer (mode transaction) : requête posant un état de session : {statement[:200]}")
+
+
+def init_app(app):
+    """Instrumente le pool de chaque moteur de l'application"""
+    app.extensions['db_pool_stats'] = {}
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            stats = app.extensions['db_pool_stats'][bind_key] = PoolStats()
+            _instrument_engine(app, engine, stats)
+
+    check_thread_capacity(app)
+
+
+def check_thread_capacity(app, threads=None):
+    """Signale un pool plus petit que le nombre de threads d'un worker Gunicorn gthread"""
+    if threads is None:
+        if os.environ.get('GUNICORN_WORKER_CLASS') != 'gthread':
+            return True
+        threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    if 'pool_size' not in options:
+        return True
+    capacity = options['pool_size'] + max(options.get('max_overflow', 0), 0)
+    if capacity >= threads:
+        return True
+    app.logger.warning(
+        f"Pool SQL : {capacity} connexions pour {threads} threads par worker ; "
+        f"des requêtes attendront une connexion (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW >= GUNICORN_THREADS)"
+    )
+    return False
+
+
+def reset_stats(app):
+    """Remet à zéro les compteurs du processus (nouveau worker)"""
+    for stats in app.extensions.get('db_pool_stats', {}).values():
+        stats.reset()
+
+
+def pool_status(app):
+    """
+    État des pools du processus courant
+
+    Returns:
+        Dict par moteur (None = moteur par défaut) : classe du pool, taille, connexions
+        actives, disponibles et en débordement, et compteurs de PoolStats
+    """
+    status = {}
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            pool = engine.pool
+            entry = {'pool': type(pool).__name__}
+            if isinstance(pool, QueuePool):
+                entry.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(), overflow=max(pool.overflow(), 0))
+            stats = app.extensions.get('db_pool_stats', {}).get(bind_key)
+            if stats is not None:
+                entry.update(stats.as_dict())
+            status[bind_key] = entry
+    return status
+
+
+def pgbouncer_problems(app):
+    """Options du moteur incompatibles avec PgBouncer en mode transaction (liste vide si compatible)"""
+    problems = []
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    connect_args = options.get('connect_args') or {}
+    if 'options' in connect_args:
+        problems.append("connect_args['options'] : paramètres de démarrage refusés par PgBouncer (définir statement_timeout par ALTER ROLE)")
+    if make_url(app.config['SQLALCHEMY_DATABASE_URI']).query.get('options'):
+        problems.append("paramètre options dans DATABASE_URL : refusé par PgBouncer")
+    if options.get('poolclass') not in (NullPool, TimedNullPool):
+        problems.append("pool applicatif actif : utiliser NullPool, PgBouncer réutilise les connexions")
+    for stats in app.extensions.get('db_pool_stats', {}).values():
+        if stats.session_state_statements:
+            problems.append(f"{stats.session_state_statements} requête(s) posant un état de session exécutée(s)")
+    return problems
@@ -0,0 +1,224 @@
+"""
+Génération en flux des exports Excel (.xlsx)
+
+Le fichier est écrit ligne par ligne dans l'archive zip du classeur et les octets
+produits sont rendus au fur et à mesure : la mémoire utilisée ne dépend pas du
+nombre de lignes et le téléchargement commence avant la fin de la génération.
+Seules les fonctionnalités utilisées par les exports sont prises en charge
+(une feuille, largeurs de colonnes et quelques styles prédéfinis).
+"""
+import io
+import re
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+from functools import lru_cache
+
+# Nombre de lignes écrites entre deux envois d'octets au client
+FLUSH_EVERY_ROWS = 500
+
+# Index des styles déclarés dans STYLES_XML
+STYLE_DEFAULT = 0
+STYLE_HEADER = 1
+STYLE_TITLE = 2
+STYLE_SUBTITLE = 3
+STYLE_TOTAL = 4
+
+# Caractères interdits en XML (caractères de contrôle hors tabulation et retours à la ligne)
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '</Types>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{sheet_title}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '<Relationship Id="rId2" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Mêmes styles que les anciens exports : en-têtes blancs en gras sur fond bleu et bordés,
+# titre en gras 16, date de génération en italique 10, ligne de total en gras 12
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="5">'
+    '<font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="12"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="16"/><name val="Calibri"/></font>'
+    '<font><i/><sz val="10"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="12"/><name val="Calibri"/></font>'
+    '</fonts>'
+    '<fills count="3">'
+    '<fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill>'
+    '<fill><patternFill patternType="solid"><fgColor rgb="FF4472C4"/><bgColor rgb="FF4472C4"/></patternFill></fill>'
+    '</fills>'
+    '<borders count="2">'
+    '<border><left/><right/><top/><bottom/><diagonal/></border>'
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>'
+    '</borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="5">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" '
+    'applyBorder="1" applyAlignment="1"><alignment horizontal="center" vertical="center"/></xf>'
+    '<xf numFmtId="0" fontId="2" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="0" fontId="3" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '<xf numFmtId="0" fontId="4" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+
+class ChunkSink(io.RawIOBase):
+    """Flux d'écriture non positionnable qui accumule les octets jusqu'au prochain envoi"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+@lru_cache(maxsize=None)
+def get_column_letter(column):
+    """Lettres de colonne Excel (1 -> A, 27 -> AA), sans importer openpyxl au démarrage"""
+    letters = ''
+    while column:
+        column, remainder = divmod(column - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell_xml(ref, value, style):
+    style_attr = f' s="{style}"' if style else ''
+    if value is None or value == '':
+        return f'<c r="{ref}"{style_attr}/>' if style else ''
+    if isinstance(value, bool):
+        return f'<c r="{ref}"{style_attr} t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style_attr}><v>{value!r}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c r="{ref}"{style_attr} t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row_xml(row_number, values, style=STYLE_DEFAULT):
+    cells = ''.join(
+        _cell_xml(f'{get_column_letter(column)}{row_number}', value, style)
+        for column, value in enumerate(values, start=1)
+    )
+    return f'<row r="{row_number}">{cells}</row>'.encode('utf-8')
+
+
+def _sheet_title(title):
+    """Nom de feuille valide pour Excel (31 caractères, sans caractères réservés)"""
+    return escape(re.sub(r'[\[\]:*?/\\]', ' ', title)[:31], {'"': '&quot;'})
+
+
+def stream_excel_export(sheet_title, title, headers, rows, column_widths=20, total_row=None):
+    """
+    Génère un export Excel au format des exports Budgee Family, morceau par morceau
+
+    Args:
+        sheet_title: Nom de la feuille
+        title: Titre affiché en première ligne
+        headers: En-têtes des colonnes (ligne 4)
+        rows: Itérable de lignes (listes de valeurs), consommé au fil de l'écriture
+        column_widths: Largeur commune des colonnes, ou liste de largeurs par colonne
+        total_row: Ligne de total facultative, écrite en gras après une ligne vide
+
+    Returns:
+        Générateur d'octets du fichier .xlsx
+    """
+    if isinstance(column_widths, (int, float)):
+        column_widths = [column_widths] * len(headers)
+
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES_XML)
+        archive.writestr('_rels/.rels', ROOT_RELS_XML)
+        archive.writestr('xl/workbook.xml', WORKBOOK_XML.format(sheet_title=_sheet_title(sheet_title)))
+        archive.writestr('xl/_rels/workbook.xml.rels', WORKBOOK_RELS_XML)
+        archive.writestr('xl/styles.xml', STYLES_XML)
+        yield sink.drain()
+
+        with archive.open('xl/worksheets/sheet1.xml', mode='w') as sheet:
+            cols = ''.join(
+                f'<col min="{column}" max="{column}" width="{width}" customWidth="1"/>'
+                for column, width in enumerate(column_widths, start=1)
+            )
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<cols>{cols}</cols><sheetData>'
+            ).encode('utf-8'))
+
+            # En-tête du document
+            sheet.write(_row_xml(1, [title], STYLE_TITLE))
+            sheet.write(_row_xml(2, [f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"], STYLE_SUBTITLE))
+            sheet.write(_row_xml(4, headers, STYLE_HEADER))
+
+            # Données
+            row_number = 4
+            for values in rows:
+                row_number += 1
+                sheet.write(_row_xml(row_number, values))
+                if row_number % FLUSH_EVERY_ROWS == 0:
+                    yield sink.drain()
+
+            if total_row is not None:
+                sheet.write(_row_xml(row_number + 2, total_row, STYLE_TOTAL))
+
+            sheet.write(b'</sheetData></worksheet>')
+
+    yield sink.drain()
@@ -13,9 +13,7 @@ from reportlab.lib.enums import TA_LEFT
 from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.piecharts import Pie
 from reportlab.graphics.charts.legends import Legend
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
-from openpyxl.utils import get_column_letter
+from app.utils.excel_stream import stream_excel_export
 
 
 def add_pdf_header(elements, title, user):
@@ -57,70 +55,26 @@ def add_pdf_header(elements, title, user):
     elements.append(Spacer(1, 15))
 
 
-def create_excel_workbook():
-    """Crée un nouveau classeur Excel avec des styles de base"""
-    wb = Workbook()
-    return wb
-
-
-def style_excel_header(ws, row=1):
-    """Applique un style aux en-têtes d'un classeur Excel"""
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True, size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
-
-    for cell in ws[row]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-
-
 def export_upcoming_renewals_excel(renewals, user):
-    """Exporte les prochains renouvellements en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Abonnements"
-
-    # En-tête du document
-    ws['A1'] = f"Abonnements : Prochains renouvellements - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Date de renouvellement', 'Abonnement', 'Montant', 'Devise', 'Cycle', 'Jours restants']
-    ws.append([])  # Ligne vide
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
+    """Exporte les prochains renouvellements en Excel (générateur d'octets)"""
     now = datetime.now().date()
-    for sub in renewals:
-        days_until = (sub.next_billing_date - now).days
-        ws.append([
+    rows = (
+        [
             sub.next_billing_date.strftime('%d/%m/%Y'),
             sub.name,
             sub.amount,
             sub.currency,
             sub.billing_cycle,
-            days_until
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 20
-
-    # Sauvegarder dans un buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+            (sub.next_billing_date - now).days
+        ]
+        for sub in renewals
+    )
+    return stream_excel_export(
+        "Abonnements",
+        f"Abonnements : Prochains renouvellements - {user.first_name} {user.last_name or ''}",
+        ['Date de renouvellement', 'Abonnement', 'Montant', 'Devise', 'Cycle', 'Jours restants'],
+        rows
+    )
 
 
 def export_upcoming_renewals_pdf(renewals, user):
@@ -167,49 +121,24 @@ def export_upcoming_renewals_pdf(renewals, user):
 
 
 def export_category_distribution_excel(category_data, user):
-    """Exporte la répartition par catégorie en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Répartition par catégorie"
-
-    # En-tête du document
-    ws['A1'] = f"Répartition par catégorie - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Catégorie', 'Nombre d\'abonnements', 'Montant mensuel', 'Pourcentage']
-    ws.append([])
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
+    """Exporte la répartition par catégorie en Excel (générateur d'octets)"""
     total = sum(cat['amount'] for cat in category_data)
-    for cat in category_data:
-        percentage = (cat['amount'] / total * 100) if total > 0 else 0
-        ws.append([
+    rows = (
+        [
             cat['name'],
             cat['count'],
             cat['amount'],
-            f"{percentage:.1f}%"
-        ])
-
-    # Total
-    ws.append([])
-    ws.append(['TOTAL', sum(cat['count'] for cat in category_data), total, '100%'])
-    last_row = ws.max_row
-    for cell in ws[last_row]:
-        cell.font = Font(bold=True)
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 20
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+            f"{(cat['amount'] / total * 100) if total > 0 else 0:.1f}%"
+        ]
+        for cat in category_data
+    )
+    return stream_excel_export(
+        "Répartition par catégorie",
+        f"Répartition par catégorie - {user.first_name} {user.last_name or ''}",
+        ['Catégorie', 'Nombre d\'abonnements', 'Montant mensuel', 'Pourcentage'],
+        rows,
+        total_row=['TOTAL', sum(cat['count'] for cat in category_data), total, '100%']
+    )
 
 
 def export_category_distribution_pdf(category_data, user):
@@ -300,42 +229,23 @@ def export_category_distribution_pdf(category_data, user):
 
 
 def export_monthly_evolution_excel(monthly_data, user):
-    """Exporte l'évolution des revenus et dépenses mensuelles en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Evolution mensuelle"
-
-    # En-tête du document
-    ws['A1'] = f"Evolution des revenus et des dépenses mensuelles - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Mois', 'Abonnements', 'Crédits', 'Revenus']
-    ws.append([])
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    for month_data in monthly_data:
-        ws.append([
+    """Exporte l'évolution des revenus et dépenses mensuelles en Excel (générateur d'octets)"""
+    rows = (
+        [
             month_data['month'],
             round(month_data['subscriptions'], 2),
             round(month_data['credits'], 2),
             round(month_data['revenues'], 2)
-        ])
-
-    # Ajuster la largeur des colonnes
-    ws.column_dimensions['A'].width = 25
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 20
-    ws.column_dimensions['D'].width = 20
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+        ]
+        for month_data in monthly_data
+    )
+    return stream_excel_export(
+        "Evolution mensuelle",
+        f"Evolution des revenus et des dépenses mensuelles - {user.first_name} {user.last_name or ''}",
+        ['Mois', 'Abonnements', 'Crédits', 'Revenus'],
+        rows,
+        column_widths=[25, 20, 20, 20]
+    )
 
 
 def export_monthly_evolution_pdf(monthly_data, user):
@@ -452,26 +362,9 @@ def export_monthly_evolution_pdf(monthly_data, user):
 
 
 def export_subscriptions_excel(subscriptions, user):
-    """Exporte la liste des abonnements en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Mes abonnements"
-
-    # En-tête du document
-    ws['A1'] = f"Mes abonnements - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Nom', 'Catégorie', 'Service', 'Montant', 'Devise', 'Cycle', 'Date début', 'Prochain paiement', 'Statut']
-    ws.append([])
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    for sub in subscriptions:
-        ws.append([
+    """Exporte la liste des abonnements en Excel (générateur d'octets)"""
+    rows = (
+        [
             sub.name,
             sub.category.name if sub.category else '-',
             sub.service.name if sub.service else '-',
@@ -481,16 +374,16 @@ def export_subscriptions_excel(subscriptions, user):
             sub.start_date.strftime('%d/%m/%Y'),
             sub.next_billing_date.strftime('%d/%m/%Y'),
             'Actif' if sub.is_active else 'Inactif'
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 18
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+        ]
+        for sub in subscriptions
+    )
+    return stream_excel_export(
+        "Mes abonnements",
+        f"Mes abonnements - {user.first_name} {user.last_name or ''}",
+        ['Nom', 'Catégorie', 'Service', 'Montant', 'Devise', 'Cycle', 'Date début', 'Prochain paiement', 'Statut'],
+        rows,
+        column_widths=18
+    )
 
 
 def export_subscriptions_pdf(subscriptions, user):
@@ -537,42 +430,24 @@ def export_subscriptions_pdf(subscriptions, user):
 
 
 def export_categories_excel(categories, user):
-    """Exporte la liste des catégories en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Mes catégories"
-
-    # En-tête du document
-    ws['A1'] = f"Mes catégories - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Nom', 'Description', 'Couleur', 'Icône', 'Type', 'Date création']
-    ws.append([])
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    for cat in categories:
-        ws.append([
+    """Exporte la liste des catégories en Excel (générateur d'octets)"""
+    rows = (
+        [
             cat.name,
             cat.description[:50] if cat.description else '-',
             cat.color,
             cat.icon if cat.icon else '-',
             'Personnalisée' if cat.user_id else 'Globale',
             cat.created_at.strftime('%d/%m/%Y')
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 20
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+        ]
+        for cat in categories
+    )
+    return stream_excel_export(
+        "Mes catégories",
+        f"Mes catégories - {user.first_name} {user.last_name or ''}",
+        ['Nom', 'Description', 'Couleur', 'Icône', 'Type', 'Date création'],
+        rows
+    )
 
 
 def export_categories_pdf(categories, user):
@@ -616,42 +491,24 @@ def export_categories_pdf(categories, user):
 
 
 def export_services_excel(services, user):
-    """Exporte la liste des services en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Mes services"
-
-    # En-tête du document
-    ws['A1'] = f"Mes services - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Nom', 'Catégorie', 'Description', 'Nb formules', 'Type', 'Date création']
-    ws.append([])
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    for service in services:
-        ws.append([
+    """Exporte la liste des services en Excel (générateur d'octets)"""
+    rows = (
+        [
             service.name,
             service.category.name if service.category else '-',
             service.description[:50] if service.description else '-',
             len(service.plans),
             'Personnalisé' if service.user_id else 'Global',
             service.created_at.strftime('%d/%m/%Y')
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 20
-
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+        ]
+        for service in services
+    )
+    return stream_excel_export(
+        "Mes services",
+        f"Mes services - {user.first_name} {user.last_name or ''}",
+        ['Nom', 'Catégorie', 'Description', 'Nb formules', 'Type', 'Date création'],
+        rows
+    )
 
 
 def export_services_pdf(services, user):
@@ -696,28 +553,10 @@ def export_services_pdf(services, user):
 
 
 def export_upcoming_credits_excel(credits, user):
-    """Exporte les prochains prélèvements pour les crédits en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Crédits"
-
-    # En-tête du document
-    ws['A1'] = f"Crédits : Prochains prélèvements - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Date de paiement', 'Nom du crédit', 'Montant', 'Devise', 'Cycle', 'Montant restant', 'Taux intérêt', 'Jours restants']
-    ws.append([])  # Ligne vide
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
+    """Exporte les prochains prélèvements pour les crédits en Excel (générateur d'octets)"""
     now = datetime.now().date()
-    for credit in credits:
-        days_until = (credit.next_payment_date - now).days
-        ws.append([
+    rows = (
+        [
             credit.next_payment_date.strftime('%d/%m/%Y'),
             credit.name,
             credit.amount,
@@ -725,18 +564,17 @@ def export_upcoming_credits_excel(credits, user):
             credit.billing_cycle,
             credit.remaining_amount if credit.remaining_amount else '-',
             f"{credit.interest_rate}%" if credit.interest_rate else '-',
-            days_until
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 18
-
-    # Sauvegarder dans un buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+            (credit.next_payment_date - now).days
+        ]
+        for credit in credits
+    )
+    return stream_excel_export(
+        "Crédits",
+        f"Crédits : Prochains prélèvements - {user.first_name} {user.last_name or ''}",
+        ['Date de paiement', 'Nom du crédit', 'Montant', 'Devise', 'Cycle', 'Montant restant', 'Taux intérêt', 'Jours restants'],
+        rows,
+        column_widths=18
+    )
 
 
 def export_upcoming_credits_pdf(credits, user):
@@ -788,47 +626,27 @@ def export_upcoming_credits_pdf(credits, user):
 
 
 def export_upcoming_revenues_excel(revenues, user):
-    """Exporte les prochains versements pour les revenus en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Revenus"
-
-    # En-tête du document
-    ws['A1'] = f"Revenus : Prochains versements - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Date de paiement', 'Nom du revenu', 'Montant', 'Devise', 'Cycle', 'Employeur', 'Jours restants']
-    ws.append([])  # Ligne vide
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
+    """Exporte les prochains versements pour les revenus en Excel (générateur d'octets)"""
     now = datetime.now().date()
-    for revenue in revenues:
-        days_until = (revenue.next_payment_date - now).days
-        employer_name = revenue.employer.name if revenue.employer else '-'
-        ws.append([
+    rows = (
+        [
             revenue.next_payment_date.strftime('%d/%m/%Y'),
             revenue.name,
             revenue.amount,
             revenue.currency,
             revenue.billing_cycle,
-            employer_name,
-            days_until
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 18
-
-    # Sauvegarder dans un buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+            revenue.employer.name if revenue.employer else '-',
+            (revenue.next_payment_date - now).days
+        ]
+        for revenue in revenues
+    )
+    return stream_excel_export(
+        "Revenus",
+        f"Revenus : Prochains versements - {user.first_name} {user.last_name or ''}",
+        ['Date de paiement', 'Nom du revenu', 'Montant', 'Devise', 'Cycle', 'Employeur', 'Jours restants'],
+        rows,
+        column_widths=18
+    )
 
 
 def export_upcoming_revenues_pdf(revenues, user):
@@ -878,49 +696,20 @@ def export_upcoming_revenues_pdf(revenues, user):
 
 
 def export_revenue_distribution_excel(revenue_list, user):
-    """Exporte la répartition des versements en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Répartition revenus"
-
-    # En-tête du document
-    ws['A1'] = f"Répartition des versements - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Employeur / Source', 'Montant mensuel (€)']
-    ws.append([])  # Ligne vide
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    total = 0
-    for item in revenue_list:
-        ws.append([
-            item['name'],
-            round(item['total'], 2)
-        ])
-        total += item['total']
-
-    # Ligne de total
-    ws.append([])
-    total_row = ws.max_row
-    ws[f'A{total_row}'] = 'TOTAL'
-    ws[f'A{total_row}'].font = Font(bold=True, size=12)
-    ws[f'B{total_row}'] = round(total, 2)
-    ws[f'B{total_row}'].font = Font(bold=True, size=12)
-
-    # Ajuster la largeur des colonnes
-    ws.column_dimensions['A'].width = 30
-    ws.column_dimensions['B'].width = 20
-
-    # Sauvegarder dans un buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+    """Exporte la répartition des versements en Excel (générateur d'octets)"""
+    total = sum(item['total'] for item in revenue_list)
+    rows = (
+        [item['name'], round(item['total'], 2)]
+        for item in revenue_list
+    )
+    return stream_excel_export(
+        "Répartition revenus",
+        f"Répartition des versements - {user.first_name} {user.last_name or ''}",
+        ['Employeur / Source', 'Montant mensuel (€)'],
+        rows,
+        column_widths=[30, 20],
+        total_row=['TOTAL', round(total, 2)]
+    )
 
 
 def export_revenue_distribution_pdf(revenue_list, user):
@@ -1008,43 +797,24 @@ def export_revenue_distribution_pdf(revenue_list, user):
     return buffer
 
 def export_unpointed_checks_excel(checks, user):
-    """Exporte les chèques non débités en Excel"""
-    wb = create_excel_workbook()
-    ws = wb.active
-    ws.title = "Chèques non débités"
-
-    # En-tête du document
-    ws['A1'] = f"Chèques : Non débités - {user.first_name} {user.last_name or ''}"
-    ws['A1'].font = Font(size=16, bold=True)
-    ws['A2'] = f"Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}"
-    ws['A2'].font = Font(size=10, italic=True)
-
-    # En-têtes des colonnes
-    headers = ['Date', 'Numéro de chèque', 'Bénéficiaire', 'Montant', 'Devise', 'Description']
-    ws.append([])  # Ligne vide
-    ws.append(headers)
-    style_excel_header(ws, row=4)
-
-    # Données
-    for check in checks:
-        ws.append([
+    """Exporte les chèques non débités en Excel (générateur d'octets)"""
+    rows = (
+        [
             check.transaction_date.strftime('%d/%m/%Y'),
             check.name,
             check.description or '-',
             check.amount,
             check.currency,
             check.description or ''
-        ])
-
-    # Ajuster la largeur des colonnes
-    for column in range(1, len(headers) + 1):
-        ws.column_dimensions[get_column_letter(column)].width = 20
-
-    # Sauvegarder dans un buffer
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    return output
+        ]
+        for check in checks
+    )
+    return stream_excel_export(
+        "Chèques non débités",
+        f"Chèques : Non débités - {user.first_name} {user.last_name or ''}",
+        ['Date', 'Numéro de chèque', 'Bénéficiaire', 'Montant', 'Devise', 'Description'],
+        rows
+    )
 
 
 def export_unpointed_checks_pdf(checks, user):
@@ -0,0 +1,486 @@
+"""Sauvegardes incrémentales des documents, dédupliquées par découpage selon le contenu
+
+Les documents et reçus sont stockés en base (colonnes binaires) : une sauvegarde
+complète les ré-envoie tous chaque nuit. En mode incrémental :
+
+- le dump PostgreSQL exclut les données des tables de documents ;
+- chaque document est découpé en morceaux dont les frontières dépendent du contenu
+  (hachage glissant « gear », comme FastCDC), si bien qu'une modification locale ne
+  déplace pas les morceaux suivants ;
+- les morceaux sont adressés par leur SHA-256 dans {SFTP_REMOTE_DIR}/chunks : seuls
+  ceux absents de l'index local (SQLite) sont envoyés ;
+- l'archive du jour contient le dump allégé et un manifeste (documents/manifest.json)
+  listant chaque ligne des tables de documents et les morceaux de son contenu.
+
+Un point de restauration est donc complet à lui seul : dump + manifeste + morceaux
+(flask restore-backup restaure le dump puis réinsère les documents).
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import EmployerDocument, BankDocument, CreditDocument, ReminderDocument, CardPurchase
+from app.utils.backup import BackupManager
+
+logger = logging.getLogger(__name__)
+
+# Table de hachage « gear » : 256 valeurs pseudo-aléatoires de 64 bits, fixes d'une
+# exécution à l'autre pour que les mêmes contenus donnent les mêmes frontières
+_GEAR = [
+    int.from_bytes(hashlib.sha256(f'budgeefamily-gear-{i}'.encode()).digest()[:8], 'big')
+    for i in range(256)
+]
+_HASH_MASK = (1 << 64) - 1
+
+
+class IncrementalBackupManager(BackupManager):
+    """Sauvegardes incrémentales : dump sans les documents + morceaux de documents dédupliqués"""
+
+    # Colonnes binaires sauvegardées par morceaux (modèle, attribut)
+    DOCUMENT_BLOB_COLUMNS = [
+        (EmployerDocument, 'file_data'),
+        (BankDocument, 'file_data'),
+        (CreditDocument, 'file_data'),
+        (ReminderDocument, 'file_data'),
+        (CardPurchase, 'receipt_image_data'),
+    ]
+
+    # Découpage : taille moyenne 64 Kio (16 bits testés), bornée entre 16 et 256 Kio.
+    # Les bits de poids fort du hachage dépendent des 64 derniers octets lus.
+    CHUNK_MIN_SIZE = 16 * 1024
+    CHUNK_MAX_SIZE = 256 * 1024
+    CHUNK_MASK = 0xFFFF << 48
+
+    CHUNK_INDEX_PATH = os.path.join(BackupManager.APP_DIR, 'instance', 'backup_chunk_index.sqlite3')
+
+    # Une sauvegarde complète est faite si la dernière date de plus de FULL_BACKUP_INTERVAL_DAYS
+    FULL_BACKUP_INTERVAL_DAYS = 7
+    INCREMENTAL_RETENTION_DAYS = 14
+
+    def __init__(self, sftp_client=None, index_path: Optional[str] = None):
+        """
+        Args:
+            sftp_client: Voir BackupManager
+            index_path: Chemin de l'index local des morceaux (CHUNK_INDEX_PATH par défaut)
+        """
+        self.index_path = index_path or self.CHUNK_INDEX_PATH
+        self._index = None
+        self._remote_dirs = set()
+        super().__init__(sftp_client)
+
+    @property
+    def chunks_remote_dir(self) -> str:
+        return f"{self.SFTP_REMOTE_DIR}/chunks"
+
+    # ------------------------------------------------------------------
+    # Index local
+    # ------------------------------------------------------------------
+
+    @property
+    def index(self) -> sqlite3.Connection:
+        """Index SQLite : morceaux présents sur le serveur, morceaux de chaque document et de chaque sauvegarde"""
+        if self._index is None:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            self._index = sqlite3.connect(self.index_path)
+            self._index.executescript('''
+                CREATE TABLE IF NOT EXISTS chunks (
+                    hash TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS blobs (
+                    table_name TEXT NOT NULL,
+                    row_id INTEGER NOT NULL,
+                    version TEXT NOT NULL,
+                    chunks TEXT NOT NULL,
+                    snapshot TEXT NOT NULL,
+                    PRIMARY KEY (table_name, row_id)
+                );
+                CREATE TABLE IF NOT EXISTS snapshot_chunks (
+                    snapshot TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    PRIMARY KEY (snapshot, hash)
+                );
+            ''')
+        return self._index
+
+    def disconnect_sftp(self):
+        super().disconnect_sftp()
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+
+    def sync_chunk_index(self) -> int:
+        """Reconstruit la liste des morceaux présents sur le serveur (index perdu ou incohérent)
+
+        Returns:
+            Nombre de morceaux trouvés
+        """
+        found = []
+        try:
+            prefixes = self.sftp_client.listdir_attr(self.chunks_remote_dir)
+        except FileNotFoundError:
+            prefixes = []
+        for prefix in prefixes:
+            for attr in self.sftp_client.listdir_attr(f"{self.chunks_remote_dir}/{prefix.filename}"):
+                if len(attr.filename) == 64:
+                    found.append((attr.filename, attr.st_size))
+
+        with self.index:
+            self.index.execute('DELETE FROM chunks')
+            self.index.executemany('INSERT INTO chunks (hash, size) VALUES (?, ?)', found)
+        return len(found)
+
+    # ------------------------------------------------------------------
+    # Découpage et envoi des morceaux
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def chunk_boundaries(cls, data: bytes):
+        """Découpe un contenu selon son contenu
+
+        Returns:
+            Itérateur de (début, fin) couvrant tout le contenu
+        """
+        length = len(data)
+        start = 0
+        while start < length:
+            end = min(start + cls.CHUNK_MAX_SIZE, length)
+            if end - start > cls.CHUNK_MIN_SIZE:
+                fingerprint = 0
+                position = start + cls.CHUNK_MIN_SIZE
+                for byte in data[position:end]:
+                    fingerprint = ((fingerprint << 1) + _GEAR[byte]) & _HASH_MASK
+                    position += 1
+                    if not fingerprint & cls.CHUNK_MASK:
+                        end = position
+                        break
+            yield start, end
+            start = end
+
+    def chunk_path(self, digest: str) -> str:
+        return f"{self.chunks_remote_dir}/{digest[:2]}/{digest}"
+
+    def _ensure_dir(self, path: str):
+        if path in self._remote_dirs:
+            return
+        try:
+            self.sftp_client.stat(path)
+        except FileNotFoundError:
+            self.sftp_client.mkdir(path)
+        self._remote_dirs.add(path)
+
+    def store_blob(self, data: bytes, stats: Dict[str, int]) -> list:
+        """Envoie les morceaux d'un contenu absents du serveur
+
+        Returns:
+            Liste des SHA-256 des morceaux, dans l'ordre
+        """
+        hashes = []
+        for start, end in self.chunk_boundaries(data):
+            chunk = data[start:end]
+            digest = hashlib.sha256(chunk).hexdigest()
+            hashes.append(digest)
+            if self.index.execute('SELECT 1 FROM chunks WHERE hash = ?', (digest,)).fetchone():
+                continue
+
+            self._ensure_dir(self.chunks_remote_dir)
+            self._ensure_dir(f"{self.chunks_remote_dir}/{digest[:2]}")
+            with self.sftp_client.open(self.chunk_path(digest), 'wb') as remote_file:
+                remote_file.write(chunk)
+            # Enregistré après l'envoi : un envoi interrompu est refait à la prochaine sauvegarde
+            with self.index:
+                self.index.execute('INSERT OR REPLACE INTO chunks (hash, size) VALUES (?, ?)', (digest, len(chunk)))
+            stats['uploaded_chunks'] += 1
+            stats['uploaded_bytes'] += len(chunk)
+        return hashes
+
+    def read_blob(self, hashes: list) -> bytes:
+        """Réassemble un contenu à partir de ses morceaux, en vérifiant leur SHA-256"""
+        parts = []
+        for digest in hashes:
+            with self.sftp_client.open(self.chunk_path(digest), 'rb') as remote_file:
+                chunk = remote_file.read()
+            if hashlib.sha256(chunk).hexdigest() != digest:
+                raise ValueError(f"Morceau corrompu: {digest}")
+            parts.append(chunk)
+        return b''.join(parts)
+
+    # ------------------------------------------------------------------
+    # Sauvegarde
+    # ------------------------------------------------------------------
+
+    def build_document_manifest(self, snapshot: str, connection, rescan: bool = False):
+        """Envoie les morceaux des documents nouveaux ou modifiés et construit le manifeste
+
+        Un document dont la date de modification et la taille n'ont pas changé depuis la
+        sauvegarde précédente n'est pas relu : sa liste de morceaux vient de l'index.
+
+        Les documents sont lus sur la connexion de l'instantané partagé avec pg_dump
+        (voir BackupManager.database_snapshot) : un document ajouté ou supprimé pendant
+        la sauvegarde est absent à la fois du manifeste et du dump, ou présent dans les deux.
+
+        Args:
+            snapshot: Nom de la sauvegarde (références des morceaux pour la rotation)
+            connection: Connexion de l'instantané exporté
+            rescan: Relire tous les documents, sans se fier à l'index
+
+        Returns:
+            Tuple (manifeste en octets, statistiques)
+        """
+        stats = {'documents': 0, 'read_documents': 0, 'uploaded_chunks': 0, 'uploaded_bytes': 0}
+        manifest = {'format': 1, 'created_at': datetime.now().isoformat(), 'tables': {}}
+
+        for model, blob_attribute in self.DOCUMENT_BLOB_COLUMNS:
+            table = model.__table__
+            blob_column = table.c[blob_attribute]
+            columns = [column for column in table.columns if column is not blob_column]
+            rows = []
+
+            result = connection.execute(
+                select(*columns, func.length(blob_column)).order_by(table.c.id)
+            )
+            for row in result.all():
+                *values, blob_size = row
+                row_id = row.id
+                hashes = None
+                if blob_size is not None:
+                    version = f"{row.updated_at.isoformat() if row.updated_at else ''}:{blob_size}"
+                    cached = None if rescan else self.index.execute(
+                        'SELECT version, chunks FROM blobs WHERE table_name = ? AND row_id = ?',
+                        (table.name, row_id)
+                    ).fetchone()
+
+                    if cached and cached[0] == version:
+                        hashes = json.loads(cached[1])
+                    else:
+                        data = connection.scalar(select(blob_column).where(table.c.id == row_id))
+                        hashes = self.store_blob(data, stats)
+                        stats['read_documents'] += 1
+
+                    self.index.execute(
+                        'INSERT OR REPLACE INTO blobs (table_name, row_id, version, chunks, snapshot) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        (table.name, row_id, version, json.dumps(hashes), snapshot)
+                    )
+                    self.index.executemany(
+                        'INSERT OR IGNORE INTO snapshot_chunks (snapshot, hash) VALUES (?, ?)',
+                        [(snapshot, digest) for digest in hashes]
+                    )
+
+                rows.append([
+                    value.isoformat() if isinstance(value, (date, datetime)) else value
+                    for value in values
+                ] + [hashes])
+                stats['documents'] += 1
+
+            self.index.commit()
+            manifest['tables'][table.name] = {
+                'blob_column': blob_column.name,
+                'columns': [column.name for column in columns],
+                'rows': rows,
+            }
+
+        # Documents supprimés : leurs morceaux ne sont plus référencés que par les anciennes sauvegardes
+        with self.index:
+            self.index.execute('DELETE FROM blobs WHERE snapshot != ?', (snapshot,))
+
+        return json.dumps(manifest).encode('utf-8'), stats
+
+    def create_incremental_backup(self, rescan: bool = False, jobs: Optional[int] = None) -> Optional[str]:
+        """Créer une sauvegarde incrémentale (dump sans les documents + manifeste) et l'envoyer sur le SFTP
+
+        Args:
+            rescan: Relire tous les documents et resynchroniser l'index avec le serveur
+            jobs: Nombre de processus pg_dump en parallèle (voir BackupManager.stream_backup_to_sftp)
+        """
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_name = f"budgeefamily_backup_{timestamp}_incremental.tar.zst"
+
+        try:
+            if not self.sftp_client:
+                if not self.connect_sftp():
+                    return None
+
+            if rescan or not self.index.execute('SELECT 1 FROM chunks LIMIT 1').fetchone():
+                logger.info(f"Index des morceaux resynchronisé: {self.sync_chunk_index()} morceaux sur le serveur")
+
+            stats = {}
+
+            def document_manifest(connection):
+                # Lu dans l'instantané du dump, avant le lancement de pg_dump
+                manifest, manifest_stats = self.build_document_manifest(backup_name, connection, rescan=rescan)
+                stats.update(manifest_stats)
+                logger.info(
+                    f"Documents: {stats['documents']} au total, {stats['read_documents']} relus, "
+                    f"{stats['uploaded_chunks']} morceaux envoyés ({stats['uploaded_bytes']} octets)"
+                )
+                return [(self.DOCUMENT_MANIFEST_NAME, manifest)]
+
+            result = self.stream_backup_to_sftp(
+                backup_name,
+                exclude_table_data=[model.__tablename__ for model, _ in self.DOCUMENT_BLOB_COLUMNS],
+                snapshot_files=document_manifest,
+                jobs=jobs
+            )
+            if not result:
+                logger.info("Échec de la sauvegarde incrémentale")
+                return None
+
+            self.last_backup = dict(result, documents=stats)
+            return backup_name
+        except Exception as e:
+            logger.info(f"Erreur lors de la création de la sauvegarde incrémentale: {e}")
+            import traceback
+            traceback.print_exc()
+            return None
+
+    def full_backup_due(self) -> bool:
+        """Indique si la dernière sauvegarde complète automatique est trop ancienne"""
+        full_backups = self.list_backups('auto')
+        if not full_backups:
+            return True
+        return datetime.now() - full_backups[0]['modified'] >= timedelta(days=self.FULL_BACKUP_INTERVAL_DAYS)
+
+    def rotate_incremental_backups(self) -> Dict[str, int]:
+        """Supprime les sauvegardes incrémentales expirées et les morceaux qui ne sont plus référencés
+
+        La plus récente est toujours conservée. Un morceau est conservé tant qu'une
+        sauvegarde restante ou un document de l'index y fait référence.
+
+        Returns:
+            Dict avec le nombre de sauvegardes conservées et supprimées et de morceaux supprimés
+        """
+        try:
+            incremental_backups = self.list_backups('incremental')
+            limit = datetime.now() - timedelta(days=self.INCREMENTAL_RETENTION_DAYS)
+
+            kept = set()
+            deleted_count = 0
+            for position, backup in enumerate(incremental_backups):
+                if position == 0 or backup['modified'] >= limit:
+                    kept.add(backup['filename'])
+                elif self.delete_backup(backup['filename']):
+                    logger.info(f"Suppression de la sauvegarde incrémentale expirée: {backup['filename']}")
+                    deleted_count += 1
+                else:
+                    kept.add(backup['filename'])
+                    logger.error(f"Échec de la suppression de {backup['filename']}")
+
+            # Références des sauvegardes supprimées (rotation, interface d'administration ou envoi échoué)
+            with self.index:
+                for (snapshot,) in self.index.execute('SELECT DISTINCT snapshot FROM snapshot_chunks').fetchall():
+                    if snapshot not in kept:
+                        self.index.execute('DELETE FROM snapshot_chunks WHERE snapshot = ?', (snapshot,))
+
+            referenced = {row[0] for row in self.index.execute('SELECT DISTINCT hash FROM snapshot_chunks')}
+            for (chunks,) in self.index.execute('SELECT chunks FROM blobs'):
+                referenced.update(json.loads(chunks))
+
+            chunks_deleted = 0
+            for (digest,) in self.index.execute('SELECT hash FROM chunks').fetchall():
+                if digest in referenced:
+                    continue
+                try:
+                    self.sftp_client.remove(self.chunk_path(digest))
+                except FileNotFoundError:
+                    pass
+                with self.index:
+                    self.index.execute('DELETE FROM chunks WHERE hash = ?', (digest,))
+                chunks_deleted += 1
+
+            logger.info(
+                f"Rotation des sauvegardes incrémentales: {len(kept)} conservées, {deleted_count} supprimées, "
+                f"{chunks_deleted} morceaux supprimés"
+            )
+            return {'kept': len(kept), 'deleted': deleted_count, 'chunks_deleted': chunks_deleted}
+        except Exception as e:
+            logger.error(f"Erreur lors de la rotation des sauvegardes incrémentales: {e}")
+            import traceback
+            traceback.print_exc()
+            return {'kept': 0, 'deleted': 0, 'chunks_deleted': 0}
+
+    # ------------------------------------------------------------------
+    # Restauration
+    # ------------------------------------------------------------------
+
+    def restore_documents(self, manifest: dict, engine) -> Dict[str, int]:
+        """Réinsère les documents d'un manifeste, contenus réassemblés depuis les morceaux
+
+        Une ligne qui ne peut pas être insérée (référence absente du dump, document déjà
+        présent) est ignorée et comptée. Les lignes gardent leur identifiant : les
+        séquences PostgreSQL des tables sont ensuite recalées sur le plus grand.
+        """
+        stats = {'restored': 0, 'skipped': 0}
+        with engine.connect() as connection:
+            for table_name, content in manifest['tables'].items():
+                table = db.metadata.tables[table_name]
+                converters = {}
+                for name in content['columns']:
+                    try:
+                        python_type = table.c[name].type.python_type
+                    except (KeyError, NotImplementedError):
+                        continue
+                    if python_type is datetime:
+                        converters[name] = datetime.fromisoformat
+                    elif python_type is date:
+                        converters[name] = date.fromisoformat
+
+                for *values, hashes in content['rows']:
+                    row = {
+                        name: converters[name](value) if value is not None and name in converters else value
+                        for name, value in zip(content['columns'], values)
+                        if name in table.c
+                    }
+                    row[content['blob_column']] = self.read_blob(hashes) if hashes is not None else None
+                    savepoint = connection.begin_nested()
+                    try:
+                        connection.execute(table.insert().values(**row))
+                        savepoint.commit()
+                        stats['restored'] += 1
+                    except IntegrityError as e:
+                        savepoint.rollback()
+                        stats['skipped'] += 1
+                        logger.info(f"Document ignoré ({table_name} #{row.get('id')}): {e.orig}")
+                if connection.dialect.name == 'postgresql':
+                    self.reset_id_sequence(connection, table)
+            connection.commit()
+        return stats
+
+    @staticmethod
+    def reset_id_sequence(connection, table):
+        """Recale la séquence de la colonne id sur le plus grand identifiant de la table"""
+        connection.execute(
+            select(func.setval(
+                func.pg_get_serial_sequence(table.name, 'id'),
+                func.coalesce(func.max(table.c.id), 1),
+                func.max(table.c.id).isnot(None),
+            ))
+        )
+
+    def restore_archive_extras(self, contents, database_url: str) -> Dict[str, int]:
+        """Après pg_restore : réinsère les documents des sauvegardes incrémentales"""
+        if contents['manifest'] is None:
+            return {}
+        engine = create_engine(database_url)
+        try:
+            return self.restore_documents(contents['manifest'], engine)
+        finally:
+            engine.dispose()
+
+    def expected_row_counts(self, contents) -> Optional[Dict[str, int]]:
+        """Nombre de lignes du dump, complété par les documents du manifeste"""
+        expected = contents['row_counts']
+        if expected is None or contents['manifest'] is None:
+            return expected
+        expected = dict(expected)
+        for table_name, content in contents['manifest']['tables'].items():
+            expected[table_name] = len(content['rows'])
+        return expected
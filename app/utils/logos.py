@@ -0,0 +1,83 @@
+"""
+Cache des logos des services et catégories
+
+Les logos sont identifiés par leur SHA-256 (colonne logo_hash) : le cache est
+adressé par contenu, un même logo partagé par plusieurs lignes (copie d'un élément
+global) n'est gardé qu'une fois et une modification ne peut pas servir d'ancienne
+version. La taille totale est bornée par LOGO_CACHE_MAX_BYTES, les logos les moins
+récemment servis étant retirés en premier.
+"""
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.utils.metrics import record_cache
+from app.models import Category, Service
+
+LOGO_MODELS = {
+    'service': Service,
+    'category': Category,
+}
+
+_cache = OrderedDict()
+_cache_size = 0
+_cache_lock = threading.Lock()
+
+
+def get_logo_info(entity_type, entity_id):
+    """
+    Empreinte et type MIME du logo, sans charger son contenu
+
+    Returns:
+        Tuple (logo_hash, logo_mime_type), ou None si l'élément ou son logo n'existe pas
+    """
+    model = LOGO_MODELS[entity_type]
+    row = db.session.execute(
+        select(model.logo_hash, model.logo_mime_type).where(model.id == entity_id)
+    ).first()
+    if row is None or not row.logo_hash or not row.logo_mime_type:
+        return None
+    return row.logo_hash, row.logo_mime_type
+
+
+def get_logo_bytes(entity_type, entity_id, logo_hash):
+    """
+    Contenu du logo d'empreinte logo_hash, depuis le cache ou la base
+
+    Returns:
+        Le contenu, ou None si le logo a été supprimé ou remplacé depuis la lecture de
+        son empreinte (un autre contenu ne doit pas être servi ni mis en cache sous
+        cette empreinte)
+    """
+    global _cache_size
+
+    with _cache_lock:
+        data = _cache.get(logo_hash)
+        if data is not None:
+            _cache.move_to_end(logo_hash)
+    record_cache('logos', data is not None)
+    if data is not None:
+        return data
+
+    model = LOGO_MODELS[entity_type]
+    data = db.session.scalar(select(model.logo_data).where(model.id == entity_id, model.logo_hash == logo_hash))
+    if data is None:
+        return None
+
+    max_bytes = current_app.config['LOGO_CACHE_MAX_BYTES']
+    if len(data) <= max_bytes:
+        with _cache_lock:
+            if logo_hash not in _cache:
+                _cache[logo_hash] = data
+                _cache_size += len(data)
+                while _cache_size > max_bytes:
+                    _, evicted = _cache.popitem(last=False)
+                    _cache_size -= len(evicted)
+    return data
+
+
+def logo_version(logo_hash):
+    """Version d'un logo dans ses URL (?v=) : change dès que le contenu change"""
+    return logo_hash[:16] if logo_hash else ''
+
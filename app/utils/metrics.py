@@ -0,0 +1,190 @@
+"""
+Métriques Prometheus de l'application, des tâches planifiées et de l'OCR
+
+Les workers Gunicorn et les commandes lancées par cron écrivent leurs valeurs dans
+un répertoire partagé (PROMETHEUS_MULTIPROC_DIR, fixé par config.py avant le premier
+import de prometheus_client) ; /metrics agrège les fichiers de tous les processus.
+Les jauges des tâches (durée, nombre d'éléments traités, dernier succès) gardent la
+valeur la plus récente : elles restent visibles après la fin de la commande cron.
+
+Au démarrage de Gunicorn (clean_multiprocess_dir), les fichiers des processus
+terminés sont supprimés, sauf les jauges récentes des tâches planifiées.
+"""
+import glob
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+# Jauges des tâches planifiées conservées au redémarrage de Gunicorn (en jours)
+JOB_METRICS_RETENTION_DAYS = 7
+
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROCESS_DIR:
+    os.makedirs(MULTIPROCESS_DIR, exist_ok=True)
+
+REQUEST_DURATION = Histogram(
+    'budgee_http_request_duration_seconds', 'Durée de traitement des requêtes HTTP',
+    ['method', 'endpoint'],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+REQUESTS = Counter('budgee_http_requests_total', 'Requêtes HTTP traitées', ['method', 'endpoint', 'status'])
+REQUEST_DB_QUERIES = Histogram(
+    'budgee_http_db_queries', 'Requêtes SQL exécutées par requête HTTP', ['endpoint'],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200),
+)
+REQUEST_DB_DURATION = Histogram(
+    'budgee_http_db_duration_seconds', 'Temps SQL cumulé par requête HTTP', ['endpoint'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+CACHE_REQUESTS = Counter('budgee_cache_requests_total', 'Consultations des caches du processus', ['cache', 'result'])
+
+OCR_DURATION = Histogram(
+    'budgee_ocr_duration_seconds', "Durée d'analyse OCR d'un reçu", ['result'],
+    buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120),
+)
+OCR_IN_PROGRESS = Gauge('budgee_ocr_in_progress', "Reçus en cours d'analyse OCR", multiprocess_mode='livesum')
+PDF_RENDER_DURATION = Histogram(
+    'budgee_pdf_report_render_seconds', "Durée de rendu d'un rapport PDF", ['report', 'result'],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300),
+)
+PDF_RENDER_QUEUE = Gauge('budgee_pdf_report_queue_depth', 'Rapports PDF en attente ou en cours de rendu', multiprocess_mode='livesum')
+
+EMAIL_BACKLOG = Gauge('budgee_email_digest_backlog', 'Notifications en attente de récapitulatif par email', multiprocess_mode='mostrecent')
+EMAIL_BACKLOG_AGE = Gauge(
+    'budgee_email_digest_oldest_age_seconds', 'Âge de la plus ancienne notification en attente de récapitulatif',
+    multiprocess_mode='mostrecent',
+)
+
+JOB_RUNS = Counter('budgee_job_runs_total', 'Exécutions des tâches planifiées', ['job', 'status'])
+JOB_DURATION = Gauge('budgee_job_last_duration_seconds', 'Durée de la dernière exécution', ['job'], multiprocess_mode='mostrecent')
+JOB_PROCESSED = Gauge('budgee_job_last_processed', 'Éléments traités par la dernière exécution', ['job'], multiprocess_mode='mostrecent')
+JOB_BYTES = Gauge('budgee_job_last_bytes', 'Octets produits par la dernière exécution', ['job'], multiprocess_mode='mostrecent')
+JOB_LAST_SUCCESS = Gauge(
+    'budgee_job_last_success_timestamp_seconds', 'Horodatage de la dernière exécution réussie', ['job'],
+    multiprocess_mode='mostrecent',
+)
+
+
+def record_cache(cache, hit):
+    """Compte une consultation d'un cache du processus (hit ou miss)"""
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+@contextmanager
+def track_ocr():
+    """Mesure une analyse OCR et la compte parmi les analyses en cours"""
+    start = time.perf_counter()
+    result = 'error'
+    OCR_IN_PROGRESS.inc()
+    try:
+        yield
+        result = 'success'
+    finally:
+        OCR_IN_PROGRESS.dec()
+        OCR_DURATION.labels(result).observe(time.perf_counter() - start)
+
+
+def track_job(name):
+    """
+    Décorateur d'une commande planifiée : durée, statut et horodatage du dernier succès
+
+    L'exécution échoue si la commande lève une exception ou renvoie False.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            status = 'failure'
+            try:
+                result = function(*args, **kwargs)
+                if result is not False:
+                    status = 'success'
+                return result
+            finally:
+                JOB_DURATION.labels(name).set(time.time() - start)
+                JOB_RUNS.labels(name, status).inc()
+                if status == 'success':
+                    JOB_LAST_SUCCESS.labels(name).set_to_current_time()
+        return wrapper
+    return decorator
+
+
+def record_job_processed(name, count, size=None):
+    """Nombre d'éléments traités (et octets produits) par l'exécution en cours d'une tâche planifiée"""
+    JOB_PROCESSED.labels(name).set(count)
+    if size is not None:
+        JOB_BYTES.labels(name).set(size)
+
+
+def _start_request_timer():
+    g.setdefault('request_start', time.perf_counter())
+
+
+def _observe_request(response):
+    if 'request_start' not in g:
+        return response
+    # Les URL inconnues (404) n'ont pas d'endpoint : regroupées pour borner le nombre de séries
+    endpoint = request.endpoint or 'none'
+    REQUEST_DURATION.labels(request.method, endpoint).observe(time.perf_counter() - g.request_start)
+    REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+    REQUEST_DB_QUERIES.labels(endpoint).observe(g.get('db_queries', 0))
+    REQUEST_DB_DURATION.labels(endpoint).observe(g.get('db_time', 0.0))
+    return response
+
+
+def init_app(app):
+    """Mesure la durée, le statut et les requêtes SQL de chaque requête HTTP"""
+    app.before_request(_start_request_timer)
+    app.after_request(_observe_request)
+
+
+def update_scrape_gauges():
+    """Jauges calculées en base au moment de la collecte (file d'attente des emails)"""
+    from datetime import datetime, timedelta
+    from flask import current_app
+    from sqlalchemy import func
+    from app.models import Notification
+    from app.utils.notifications import pending_digest_notifications
+
+    now = datetime.utcnow()
+    pending = pending_digest_notifications(now - timedelta(hours=current_app.config['NOTIFICATION_DIGEST_MAX_AGE_HOURS']))
+    count, oldest = pending.with_entities(func.count(Notification.id), func.min(Notification.created_at)).one()
+    EMAIL_BACKLOG.set(count)
+    EMAIL_BACKLOG_AGE.set((now - oldest).total_seconds() if oldest else 0)
+
+
+def render_metrics():
+    """Métriques au format texte Prometheus, agrégées sur tous les processus en mode multiprocessus"""
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROCESS_DIR)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Retire les jauges « live » d'un worker terminé"""
+    if MULTIPROCESS_DIR:
+        multiprocess.mark_process_dead(pid, MULTIPROCESS_DIR)
+
+
+def clean_multiprocess_dir():
+    """Supprime les fichiers de métriques des processus terminés, sauf les jauges récentes des tâches planifiées"""
+    if not MULTIPROCESS_DIR:
+        return
+    import psutil
+
+    oldest_kept = time.time() - JOB_METRICS_RETENTION_DAYS * 86400
+    for path in glob.glob(os.path.join(MULTIPROCESS_DIR, '*.db')):
+        name = os.path.basename(path)
+        pid = int(name.rsplit('_', 1)[-1][:-len('.db')])
+        if psutil.pid_exists(pid):
+            continue
+        if name.startswith('gauge_mostrecent_') and os.path.getmtime(path) >= oldest_kept:
+            continue
+        os.remove(path)
@@ -0,0 +1,74 @@
+"""
+Récapitulatif groupé des notifications par email.
+
+Lorsque NOTIFICATION_DIGEST_WINDOW_MINUTES est supérieur à 0, les notifications
+non urgentes ne sont pas envoyées au moment de leur création : elles restent en
+attente (is_sent à False). La fenêtre de regroupement est propre à chaque
+utilisateur et démarre avec sa plus ancienne notification en attente ; une fois
+écoulée, toutes ses notifications en attente partent dans un seul email.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from app import db
+from app.models import Notification, User
+from app.utils.email import URGENT_NOTIFICATION_TYPES, send_digest_email
+
+
+def pending_digest_notifications(oldest_allowed):
+    """Requête des notifications en attente d'un récapitulatif
+
+    Les notifications déjà lues ou archivées dans l'application ne sont plus
+    envoyées, de même que celles des utilisateurs sans notifications par email.
+    """
+    return Notification.query.join(User, Notification.user_id == User.id).filter(
+        Notification.is_sent == False,
+        Notification.is_read == False,
+        Notification.archived == False,
+        Notification.type.notin_(URGENT_NOTIFICATION_TYPES),
+        Notification.created_at >= oldest_allowed,
+        User.email_notifications == True
+    )
+
+
+def send_notification_digests(now=None, flush=False):
+    """Envoie un récapitulatif à chaque utilisateur dont la fenêtre est écoulée
+
+    flush=True envoie immédiatement toutes les notifications en attente, sans
+    attendre la fin des fenêtres. Retourne un tuple (emails envoyés, notifications envoyées).
+    """
+    now = now or datetime.utcnow()
+    window = timedelta(minutes=current_app.config['NOTIFICATION_DIGEST_WINDOW_MINUTES'])
+    oldest_allowed = now - timedelta(hours=current_app.config['NOTIFICATION_DIGEST_MAX_AGE_HOURS'])
+
+    pending = pending_digest_notifications(oldest_allowed)
+
+    # Utilisateurs dont la plus ancienne notification en attente a dépassé la fenêtre
+    due_users = pending.with_entities(Notification.user_id).group_by(Notification.user_id)
+    if not flush:
+        due_users = due_users.having(func.min(Notification.created_at) <= now - window)
+    user_ids = [row.user_id for row in due_users]
+    if not user_ids:
+        return 0, 0
+
+    users = {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+    notifications_by_user = defaultdict(list)
+    for notification in pending.filter(Notification.user_id.in_(user_ids)).order_by(Notification.created_at):
+        notifications_by_user[notification.user_id].append(notification)
+
+    emails_sent = 0
+    notifications_sent = 0
+    for user_id, notifications in notifications_by_user.items():
+        if not send_digest_email(users[user_id], notifications):
+            continue
+
+        Notification.query.filter(
+            Notification.id.in_([notification.id for notification in notifications])
+        ).update({'is_sent': True, 'sent_at': now}, synchronize_session=False)
+        db.session.commit()
+
+        emails_sent += 1
+        notifications_sent += len(notifications)
+
+    return emails_sent, notifications_sent
@@ -2,6 +2,7 @@
 Module de traitement OCR pour les reçus de carte bancaire
 """
 import io
+import os
 import re
 import pytesseract
 from PIL import Image
@@ -13,8 +14,9 @@ from pdf2image import convert_from_bytes
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import multiprocessing
 
-# Configuration Tesseract
-pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'  # Chemin par défaut Linux
+# Configuration Tesseract, fixée une fois à l'import : aucun état n'est modifié pendant
+# un traitement, plusieurs reçus peuvent être analysés en parallèle dans les threads d'un worker
+pytesseract.pytesseract.tesseract_cmd = os.environ.get('TESSERACT_CMD', '/usr/bin/tesseract')  # Chemin par défaut Linux
 
 
 def detect_and_correct_skew(gray: np.ndarray) -> np.ndarray:
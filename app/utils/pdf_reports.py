@@ -0,0 +1,172 @@
+"""
+Génération des rapports PDF en arrière-plan avec cache des résultats
+
+Chaque rapport est identifié par (user_id, type de rapport, paramètres, version des
+données). Le PDF produit est conservé sur disque : un nouveau téléchargement d'un
+rapport dont les données n'ont pas changé est servi directement depuis le cache.
+Les rendus sont exécutés dans un pool de threads pour ne pas bloquer le worker qui
+traite la requête ; le cache et les marqueurs de travaux en cours étant des fichiers,
+ils sont partagés entre les workers d'une même machine.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent import futures
+from datetime import date
+from sqlalchemy import func, or_, select
+from flask import current_app
+from app import db
+from app.utils import metrics
+
+REPORT_READY = 'ready'
+REPORT_PENDING = 'pending'
+REPORT_ERROR = 'error'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Pool de threads des rendus, créé à la première utilisation (après le fork des workers)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = futures.ThreadPoolExecutor(
+                max_workers=current_app.config['PDF_REPORT_WORKERS'],
+                thread_name_prefix='pdf-report'
+            )
+    return _executor
+
+
+def data_version(user_id, sources):
+    """
+    Empreinte des données dont dépend un rapport
+
+    Args:
+        user_id: ID de l'utilisateur
+        sources: Modèles (nombre de lignes, somme des IDs et dernière modification,
+                 éléments globaux inclus) ou tables d'association (nombre de lignes)
+
+    Returns:
+        Liste de valeurs qui change dès qu'une ligne est ajoutée, modifiée ou supprimée
+    """
+    version = []
+    for source in sources:
+        if isinstance(source, db.Table):
+            version.append(db.session.scalar(
+                select(func.count()).select_from(source).where(source.c.user_id == user_id)
+            ))
+            continue
+
+        owner = source.user_id == user_id
+        if source.__table__.c.user_id.nullable:
+            owner = or_(owner, source.user_id.is_(None))
+        count, id_sum, last_update = db.session.execute(
+            select(func.count(source.id), func.coalesce(func.sum(source.id), 0), func.max(source.updated_at))
+            .where(owner)
+        ).one()
+        version.append([count, id_sum, last_update.isoformat() if last_update else None])
+    return version
+
+
+def report_cache_key(user_id, report_type, params, version):
+    """Clé de cache d'un rapport"""
+    payload = json.dumps([user_id, report_type, params, version], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def report_paths(user_id, report_type, key):
+    """Chemins du PDF, du marqueur de travail en cours et du marqueur d'erreur d'un rapport"""
+    directory = os.path.join(current_app.config['PDF_REPORT_CACHE_DIR'], str(user_id))
+    base = os.path.join(directory, f'{report_type}-{key}')
+    return base + '.pdf', base + '.pending', base + '.error'
+
+
+def _render_report(app, user_id, report_type, key, build):
+    """Rend le rapport dans le contexte de l'application et le publie atomiquement dans le cache"""
+    from app.models import User
+
+    start = time.perf_counter()
+    result = 'error'
+    with app.app_context():
+        pdf_path, pending_path, error_path = report_paths(user_id, report_type, key)
+        try:
+            output = build(db.session.get(User, user_id))
+            tmp_path = f'{pdf_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(output.getvalue())
+            os.replace(tmp_path, pdf_path)
+
+            # Une seule version conservée par rapport : les PDF des anciennes données sont supprimés
+            directory = os.path.dirname(pdf_path)
+            for name in os.listdir(directory):
+                if name.startswith(f'{report_type}-') and name.endswith('.pdf') and os.path.join(directory, name) != pdf_path:
+                    os.remove(os.path.join(directory, name))
+            result = 'success'
+        except Exception:
+            app.logger.exception(f'Erreur lors du rendu du rapport PDF {report_type} (utilisateur {user_id})')
+            open(error_path, 'w').close()
+        finally:
+            if os.path.exists(pending_path):
+                os.remove(pending_path)
+            metrics.PDF_RENDER_QUEUE.dec()
+            metrics.PDF_RENDER_DURATION.labels(report_type, result).observe(time.perf_counter() - start)
+
+
+def get_or_submit_report(user_id, report_type, sources, build, params=None):
+    """
+    Renvoie l'état d'un rapport PDF et lance son rendu en arrière-plan si nécessaire
+
+    Args:
+        user_id: ID de l'utilisateur
+        report_type: Identifiant du rapport
+        sources: Modèles et tables dont dépendent les données (voir data_version)
+        build: Fonction recevant l'utilisateur et renvoyant le PDF (BytesIO)
+        params: Paramètres du rapport (la date du jour est toujours incluse)
+
+    Returns:
+        Tuple (état, chemin du PDF) ; l'état vaut REPORT_READY, REPORT_PENDING ou REPORT_ERROR
+    """
+    params = dict(params or {}, date=date.today().isoformat())
+    key = report_cache_key(user_id, report_type, params, data_version(user_id, sources))
+    pdf_path, pending_path, error_path = report_paths(user_id, report_type, key)
+
+    if os.path.exists(pdf_path):
+        metrics.record_cache('pdf_reports', True)
+        return REPORT_READY, pdf_path
+    metrics.record_cache('pdf_reports', False)
+
+    if os.path.exists(error_path):
+        # L'erreur est signalée une fois ; la demande suivante relance le rendu
+        os.remove(error_path)
+        return REPORT_ERROR, None
+
+    try:
+        started_at = os.path.getmtime(pending_path)
+    except OSError:
+        started_at = None
+
+    # Rendu déjà en cours (éventuellement dans un autre worker), sauf s'il a été interrompu
+    if started_at is not None and time.time() - started_at < current_app.config['PDF_REPORT_JOB_TIMEOUT']:
+        return REPORT_PENDING, None
+
+    os.makedirs(os.path.dirname(pending_path), exist_ok=True)
+    open(pending_path, 'w').close()
+    metrics.PDF_RENDER_QUEUE.inc()
+    future = get_executor().submit(
+        _render_report, current_app._get_current_object(), user_id, report_type, key, build
+    )
+
+    # Les petits rapports sont servis directement sans passer par la page d'attente
+    try:
+        future.result(timeout=current_app.config['PDF_REPORT_INLINE_WAIT_SECONDS'])
+    except futures.TimeoutError:
+        return REPORT_PENDING, None
+
+    if os.path.exists(pdf_path):
+        return REPORT_READY, pdf_path
+    if os.path.exists(error_path):
+        os.remove(error_path)
+    return REPORT_ERROR, None
@@ -0,0 +1,64 @@
+"""
+Préparation de l'application chargée une seule fois par le maître Gunicorn (preload_app)
+
+Le maître importe l'application, compile les templates, charge les catalogues de
+traduction et configure les mappers avant de créer les workers : ces objets sont
+partagés en copie sur écriture par tous les workers au lieu d'être reconstruits dans
+chacun. gc.freeze() déplace ensuite tous les objets existants dans une génération
+permanente que le ramasse-miettes ne parcourt plus ; sans cela, chaque collecte dans
+un worker écrit dans les en-têtes des objets et recopie les pages mémoire partagées.
+
+Après le fork, chaque worker abandonne les connexions SQL héritées du maître
+(dispose_engines) : une connexion ne doit jamais être utilisée par deux processus.
+"""
+import gc
+import os
+from app import db
+
+# Langues dont les catalogues de traduction sont chargés dans le maître
+PRELOAD_LOCALES = ('fr', 'en')
+
+
+def warm_up(app):
+    """Construit dans le processus courant ce que les workers construiraient à la première requête"""
+    import flask_babel
+    from sqlalchemy.orm import configure_mappers
+
+    configure_mappers()
+
+    for name in app.jinja_env.list_templates():
+        if name.endswith('.html'):
+            app.jinja_env.get_template(name)
+
+    for locale in PRELOAD_LOCALES:
+        with app.test_request_context(headers={'Accept-Language': locale}):
+            flask_babel.get_translations()
+
+
+def freeze_for_fork(app):
+    """Prépare le maître au fork : préchauffage puis gel des objets existants"""
+    warm_up(app)
+    gc.collect()
+    gc.freeze()
+
+
+def dispose_engines(app):
+    """Oublie, dans un worker fraîchement créé, les connexions ouvertes par le maître"""
+    from app.utils.db_pool import reset_stats
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False : les connexions du maître restent ouvertes pour lui
+            engine.dispose(close=False)
+    reset_stats(app)
+
+
+def process_memory(pid=None):
+    """Mémoire d'un processus en Mo : rss, et sous Linux pss (part proportionnelle) et uss (pages propres)"""
+    import psutil
+
+    info = psutil.Process(pid or os.getpid()).memory_full_info()
+    return {
+        key: round(getattr(info, key) / (1024 * 1024), 1)
+        for key in ('rss', 'pss', 'uss') if hasattr(info, key)
+    }
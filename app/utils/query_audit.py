@@ -0,0 +1,228 @@
+"""
+Détection des chargements N+1 des relations
+
+En développement et en test, chaque chargement paresseux d'une relation (accès à
+sub.category sans option de chargement) est compté pour la requête HTTP en cours. Une
+même relation chargée paresseusement pour plusieurs objets est parcourue dans une
+boucle : une requête SQL par ligne affichée. Le problème est journalisé (mode 'log')
+ou lève NPlusOneError (mode 'raise', utilisé en test) ; la correction consiste à
+ajouter selectinload()/joinedload() à la requête qui charge les objets.
+
+Les relations déjà présentes dans la session (identity map) ne déclenchent aucune
+requête et ne sont pas comptées.
+
+Compteur de requêtes SQL : toutes les requêtes exécutées pendant une requête HTTP
+sont comptées et leur durée cumulée (g.db_queries, g.db_time). Une requête plus lente
+que SLOW_QUERY_MS est journalisée avec son SQL normalisé (paramètres remplacés par ?)
+et la route appelante. Avec SERVER_TIMING, chaque réponse porte un en-tête
+Server-Timing (db, render, total) lisible dans l'onglet réseau du navigateur ; sans
+lui, l'en-tête n'est envoyé qu'en mode debug et aux administrateurs connectés, pour
+ne pas exposer le temps et le nombre de requêtes SQL aux visiteurs. Les
+durées db et render peuvent se recouvrir : une requête SQL exécutée pendant le rendu
+d'un template compte dans les deux.
+"""
+import re
+import time
+from flask import before_render_template, current_app, g, has_request_context, request, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+NPLUSONE_MODES = ('off', 'log', 'raise')
+
+# Plafond de requêtes SQL par page, vérifié par `flask check-query-budgets`.
+# Les pages listées doivent garder un nombre de requêtes constant quel que soit le
+# volume de données de l'utilisateur.
+QUERY_BUDGETS = {
+    '/dashboard': 16,
+    '/subscriptions/': 8,
+    '/subscriptions/add': 8,
+    '/credits/': 8,
+    '/revenues/': 6,
+    '/installments/': 6,
+    '/card-purchases/': 8,
+    '/checkbooks/': 6,
+    '/banks/': 6,
+    '/employers/': 6,
+    '/categories/': 6,
+    '/services/': 6,
+    '/balance': 6,
+    '/reminders/': 6,
+    '/api/subscriptions/distribution': 4,
+    '/api/credits/distribution': 4,
+    '/api/revenues/distribution': 4,
+    '/api/card-purchases/distribution': 4,
+}
+
+
+class NPlusOneError(RuntimeError):
+    """Relation chargée paresseusement dans une boucle"""
+
+
+def nplusone_mode(app):
+    """Mode du détecteur : NPLUSONE_MODE, sinon 'raise' en test, 'log' en debug et 'off' en production"""
+    mode = app.config.get('NPLUSONE_MODE')
+    if mode:
+        return mode
+    if app.testing:
+        return 'raise'
+    return 'log' if app.debug else 'off'
+
+
+def _on_orm_execute(orm_execute_state):
+    """Compte les chargements paresseux de chaque relation pendant la requête HTTP"""
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None or not has_request_context():
+        return
+    mode = current_app.extensions.get('nplusone_mode', 'off')
+    if mode == 'off':
+        return
+
+    relationship = str(orm_execute_state.loader_strategy_path[-1])
+    loads = g.setdefault('lazy_loads', {})
+    loads[relationship] = loads.get(relationship, 0) + 1
+    if loads[relationship] != current_app.config['NPLUSONE_MAX_LAZY_LOADS'] + 1:
+        return
+
+    message = (
+        f"N+1 : {relationship} chargé paresseusement pour plusieurs objets ({request.method} {request.path}) ; "
+        f"ajouter selectinload()/joinedload() à la requête d'origine"
+    )
+    if mode == 'raise':
+        raise NPlusOneError(message)
+    current_app.logger.warning(message)
+
+
+def set_nplusone_mode(app, mode):
+    """Change le mode du détecteur de N+1 de l'application"""
+    if mode not in NPLUSONE_MODES:
+        raise ValueError(f"NPLUSONE_MODE invalide : {mode} (valeurs possibles : {', '.join(NPLUSONE_MODES)})")
+    app.extensions['nplusone_mode'] = mode
+    if mode != 'off' and not event.contains(Session, 'do_orm_execute', _on_orm_execute):
+        event.listen(Session, 'do_orm_execute', _on_orm_execute)
+
+
+# Paramètres liés ('%(name)s', '?', ':name') et littéraux remplacés par ? dans le SQL journalisé
+_PARAMETER_PATTERN = re.compile(r"%\(\w+\)s|(?<!:):\w+\b|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_PATTERN = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """SQL d'une requête sans ses valeurs, pour regrouper les requêtes identiques dans les journaux"""
+    statement = _PARAMETER_PATTERN.sub('?', statement)
+    statement = _IN_LIST_PATTERN.sub('(?)', statement)
+    return _WHITESPACE_PATTERN.sub(' ', statement).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_audit_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """Compte la requête SQL pour la requête HTTP en cours et journalise les requêtes lentes"""
+    start = getattr(context, '_query_audit_start', None)
+    if start is None or not has_request_context():
+        return
+    elapsed = time.perf_counter() - start
+    g.db_queries = g.get('db_queries', 0) + 1
+    g.db_time = g.get('db_time', 0.0) + elapsed
+
+    threshold = current_app.config['SLOW_QUERY_MS']
+    if threshold and elapsed * 1000 >= threshold:
+        current_app.logger.warning(
+            f"Requête SQL lente : {elapsed * 1000:.0f} ms ({request.method} {request.url_rule or request.path}, "
+            f"{request.endpoint}) : {normalize_sql(statement)[:1000]}"
+        )
+
+
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+def _start_render_timer(sender, template, context, **extra):
+    if has_request_context():
+        g.render_start = time.perf_counter()
+
+
+def _stop_render_timer(sender, template, context, **extra):
+    if has_request_context() and 'render_start' in g:
+        g.render_time = g.get('render_time', 0.0) + time.perf_counter() - g.pop('render_start')
+
+
+def _add_server_timing(response):
+    """En-tête Server-Timing : temps SQL (et nombre de requêtes), rendu des templates et total"""
+    if 'request_start' not in g:
+        return response
+    if not (current_app.config['SERVER_TIMING'] or current_app.debug
+            or (current_user.is_authenticated and current_user.is_admin)):
+        return response
+    metrics = [
+        f'db;dur={g.get("db_time", 0.0) * 1000:.1f};desc="{g.get("db_queries", 0)} SQL"',
+        f'render;dur={g.get("render_time", 0.0) * 1000:.1f}',
+        f'total;dur={(time.perf_counter() - g.request_start) * 1000:.1f}',
+    ]
+    response.headers.add('Server-Timing', ', '.join(metrics))
+    return response
+
+
+def init_app(app):
+    """Active le détecteur de N+1 selon la configuration, le compteur de requêtes SQL et Server-Timing"""
+    set_nplusone_mode(app, nplusone_mode(app))
+
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.before_request(_start_request_timer)
+    before_render_template.connect(_start_render_timer, app)
+    template_rendered.connect(_stop_render_timer, app)
+    app.after_request(_add_server_timing)
+
+
+def check_query_budgets(app, user_id, budgets=None):
+    """
+    Appelle chaque page de QUERY_BUDGETS pour un utilisateur et compte ses requêtes SQL
+
+    Le détecteur de N+1 est en mode 'raise' pendant la vérification : une relation
+    chargée dans une boucle fait échouer la page (statut 500).
+
+    Returns:
+        Liste de dict (path, status, queries, budget, ok)
+    """
+    budgets = QUERY_BUDGETS if budgets is None else budgets
+    statements = []
+
+    # Catalogue global chargé au préalable : son chargement unique (une requête par type)
+    # ne doit pas être compté dans la première page qui l'utilise
+    from app.services import catalog
+    with app.app_context():
+        catalog.get_catalog()
+
+    def count_statement(*args):
+        statements.append(1)
+
+    previous_mode = app.extensions.get('nplusone_mode', 'off')
+    set_nplusone_mode(app, 'raise')
+    event.listen(Engine, 'before_cursor_execute', count_statement)
+    try:
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+        results = []
+        for path, budget in budgets.items():
+            statements.clear()
+            status = client.get(path).status_code
+            results.append({
+                'path': path,
+                'status': status,
+                'queries': len(statements),
+                'budget': budget,
+                'ok': status < 400 and len(statements) <= budget,
+            })
+        return results
+    finally:
+        event.remove(Engine, 'before_cursor_execute', count_statement)
+        set_nplusone_mode(app, previous_mode)
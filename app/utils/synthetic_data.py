@@ -0,0 +1,440 @@
+"""
+Génération de données synthétiques au volume de la production
+
+Crée des utilisateurs fictifs (adresse en @synthetic.budgeefamily.test) avec un
+historique réaliste : abonnements sur tous les cycles de facturation, crédits,
+revenus et employeurs, paiements en plusieurs fois, chéquiers et chèques, achats par
+carte avec de petits reçus, documents, rappels et plusieurs années de transactions.
+
+Les lignes sont insérées par lots (insert() ORM en masse, sans charger d'objets ni
+déclencher les événements des modèles) : quelques milliers d'utilisateurs et
+plusieurs millions de transactions se génèrent en quelques minutes. La génération
+est reproductible pour une même graine. À n'utiliser que sur une base de
+développement, de test de charge ou de préproduction.
+"""
+import io
+import random
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import delete, func, insert, select
+from app import db
+from app.models import (
+    User, Subscription, Credit, CreditDocument, Employer, EmployerDocument, Revenue, Bank, BankAccount,
+    BankDocument, InstallmentPayment, Transaction, Checkbook, Check, CardPurchase, Provider, Reminder,
+    ReminderDocument, Notification, NotificationArchive, Category, Service, ServicePlan, CreditType,
+    hidden_categories, hidden_services,
+)
+from app.services import catalog
+
+SYNTHETIC_EMAIL_DOMAIN = 'synthetic.budgeefamily.test'
+
+# Répartition des cycles de facturation des abonnements
+BILLING_CYCLE_WEIGHTS = {'monthly': 60, 'yearly': 20, 'quarterly': 12, 'weekly': 8}
+BILLING_CYCLE_STEPS = {
+    'weekly': relativedelta(weeks=1),
+    'monthly': relativedelta(months=1),
+    'quarterly': relativedelta(months=3),
+    'yearly': relativedelta(years=1),
+}
+
+# Transactions futures générées, comme generate_future_transactions()
+MONTHS_AHEAD = 12
+
+FIRST_NAMES = ('Camille', 'Louis', 'Léa', 'Hugo', 'Chloé', 'Lucas', 'Manon', 'Jules', 'Inès', 'Gabriel', 'Sarah', 'Arthur')
+LAST_NAMES = ('Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau', 'Simon', 'Laurent')
+SUBSCRIPTION_NAMES = ('Netflix', 'Spotify', 'Deezer', 'Disney+', 'Canal+', 'Amazon Prime', 'Salle de sport', 'Box internet',
+                      'Forfait mobile', 'Assurance habitation', 'Mutuelle', 'iCloud', 'Presse en ligne', 'Électricité', 'Gaz')
+CREDIT_KINDS = (('mortgage', 'Prêt immobilier', 120000, 300000, 240), ('car_loan', 'Crédit auto', 8000, 30000, 60),
+                ('personal_loan', 'Prêt personnel', 2000, 15000, 36))
+BANK_NAMES = ('Crédit Agricole', 'BNP Paribas', 'Société Générale', 'LCL', 'Banque Populaire', "Caisse d'Épargne", 'Boursorama')
+COMPANY_NAMES = ('Acme SAS', 'Dupont & Fils', 'Hôpital Saint-Louis', 'Mairie de Lyon', 'Studio Lumière', 'Transports Morel')
+MERCHANTS = (('Carrefour', 'Alimentation'), ('Leclerc', 'Alimentation'), ('Monoprix', 'Alimentation'), ('Boulangerie Paul', 'Alimentation'),
+             ('Total', 'Carburant'), ('Shell', 'Carburant'), ('Fnac', 'Loisirs'), ('Decathlon', 'Sport'), ('Pharmacie', 'Santé'),
+             ('Ikea', 'Maison'), ('Zara', 'Vêtements'), ('Restaurant Le Central', 'Restaurants'))
+INSTALLMENT_PRODUCTS = (('Four Darty', 'Darty', 'Électroménager'), ('Ordinateur portable', 'Fnac', 'Informatique'),
+                        ('Canapé', 'Ikea', 'Maison'), ('Vélo électrique', 'Decathlon', 'Sport'), ('Smartphone', 'Amazon', 'Informatique'))
+INSTALLMENT_PROVIDERS = ('ALMA', 'Klarna', 'PayPal', 'Amazon', 'Autre')
+PROVIDER_KINDS = (('Chauffagiste', 'Entretien chaudière'), ('Garage', 'Révision voiture'), ('Ramoneur', 'Ramonage'),
+                  ('Dentiste', 'Contrôle dentaire'), ('Vétérinaire', 'Vaccin du chat'))
+PAYEES = ('Trésor public', 'Assistante maternelle', 'Club de tennis', 'Syndic', 'École de musique', 'Plombier')
+
+# Tables des données d'un utilisateur, dans l'ordre de suppression (dépendances d'abord)
+USER_DATA_TABLES = tuple(getattr(model, '__table__', model) for model in (
+    Notification, NotificationArchive, Transaction, Check, Checkbook, CardPurchase, ReminderDocument, Reminder,
+    Provider, InstallmentPayment, CreditDocument, Credit, EmployerDocument, Revenue, Employer, BankDocument,
+    BankAccount, Bank, Subscription, hidden_categories, hidden_services, ServicePlan, Service, CreditType, Category,
+))
+
+
+def synthetic_email(index):
+    return f'user{index:06d}@{SYNTHETIC_EMAIL_DOMAIN}'
+
+
+def _tiny_pdf(title):
+    """Document PDF minimal valide (quelques centaines d'octets)"""
+    content = f'BT /F1 12 Tf 72 720 Td ({title}) Tj ET'.encode('latin-1', 'replace')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 4 0 R /Resources << /Font << /F1 5 0 R >> >> >>',
+        b'<< /Length %d >>\nstream\n%s\nendstream' % (len(content), content),
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+    ]
+    output = io.BytesIO()
+    output.write(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+    xref = output.tell()
+    output.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b'%010d 00000 n \n' % offset)
+    output.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+def _receipt_images(rng, count=8):
+    """Petits reçus JPEG (quelques Ko) réutilisés par les achats par carte"""
+    from PIL import Image, ImageDraw
+
+    images = []
+    for index in range(count):
+        image = Image.new('L', (240, 360), 255)
+        draw = ImageDraw.Draw(image)
+        draw.text((20, 20), MERCHANTS[index % len(MERCHANTS)][0], fill=0)
+        for line in range(12):
+            draw.text((20, 60 + line * 22), f'Article {line + 1}   {rng.uniform(0.5, 30):6.2f}', fill=0)
+        draw.text((20, 330), f'TOTAL   {rng.uniform(10, 150):6.2f} EUR', fill=0)
+        output = io.BytesIO()
+        image.save(output, format='JPEG', quality=60)
+        images.append(output.getvalue())
+    return images
+
+
+def _occurrences(start, step, until, limit=None):
+    """Dates d'échéance depuis start, tous les step, jusqu'à until incluse"""
+    dates = []
+    current = start
+    while current <= until and (limit is None or len(dates) < limit):
+        dates.append(current)
+        current = current + step
+    return dates
+
+
+class SyntheticDataGenerator:
+    """Génère et insère par lots les données d'utilisateurs fictifs"""
+
+    def __init__(self, password, years=3, seed=0, premium_ratio=0.5):
+        self.rng = random.Random(seed)
+        self.years = years
+        self.today = date.today()
+        self.history_start = self.today - relativedelta(years=years)
+        self.horizon = self.today + relativedelta(months=MONTHS_AHEAD)
+        self.premium_ratio = premium_ratio
+        self.counts = Counter()
+
+        # Un seul hachage pour tous les comptes (le hachage est volontairement lent)
+        user = User()
+        user.set_password(password)
+        self.password_hash = user.password_hash
+
+        plans = catalog.active_plans()
+        self.premium_plan_id = next((plan.id for plan in plans if plan.name == 'Premium'), None)
+        self.free_plan_id = next((plan.id for plan in plans if not plan.is_premium() and not plan.price), None)
+        self.services = [service for service in catalog.global_services() if service.plans]
+        self.categories = catalog.global_categories(catalog.SUBSCRIPTION_CATEGORY_TYPES)
+        self.purchase_categories = catalog.global_categories(catalog.CARD_PURCHASE_CATEGORY_TYPES)
+        self.credit_types = catalog.global_credit_types()
+        self.receipts = _receipt_images(self.rng)
+        self.documents = {kind: _tiny_pdf(kind) for kind in ('payslip', 'contract', 'statement', 'invoice')}
+
+    # Insertion en masse
+
+    def _insert(self, model, rows, returning=False):
+        """Insère des lignes (dict) ; renvoie leurs identifiants dans l'ordre si returning"""
+        if not rows:
+            return []
+        self.counts[model.__tablename__] += len(rows)
+        if returning:
+            return db.session.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows).all()
+        db.session.execute(insert(model), rows)
+        return []
+
+    def _random_date(self, start=None, end=None):
+        start = start or self.history_start
+        end = end or self.today
+        return start + timedelta(days=self.rng.randint(0, max((end - start).days, 0)))
+
+    def _timestamps(self, day):
+        moment = datetime.combine(day, datetime.min.time()) + timedelta(hours=self.rng.randint(8, 20))
+        return {'created_at': moment, 'updated_at': moment}
+
+    def _transaction(self, user_id, source_type, source_id, name, amount, day, category_name, is_positive=False, status=None):
+        status = status or ('completed' if day < self.today else 'pending')
+        return dict(
+            user_id=user_id, transaction_date=day, transaction_type=source_type, source_id=source_id,
+            source_type=source_type, name=name, amount=round(amount, 2), currency='EUR', is_positive=is_positive,
+            category_name=category_name, status=status,
+            is_pointed=status == 'completed' and self.rng.random() < 0.8,
+            **self._timestamps(min(day, self.today)),
+        )
+
+    def _document(self, user_id, kind, name, day, **columns):
+        data = self.documents[kind]
+        return dict(
+            user_id=user_id, name=name, document_type=kind, file_data=data, file_name=f'{name}.pdf',
+            file_mime_type='application/pdf', file_size=len(data), document_date=day, year=day.year,
+            month=day.month, **columns, **self._timestamps(day),
+        )
+
+    # Génération
+
+    def generate(self, first_index, count):
+        """Génère count utilisateurs à partir de l'index first_index (un lot, sans commit)"""
+        premium_count = round(count * self.premium_ratio)
+        users = []
+        for offset in range(count):
+            index = first_index + offset
+            created = self.history_start - timedelta(days=self.rng.randint(0, 60))
+            users.append(dict(
+                email=synthetic_email(index), password_hash=self.password_hash,
+                first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+                language='fr' if self.rng.random() < 0.85 else 'en', timezone='Europe/Paris',
+                plan_id=self.premium_plan_id if offset < premium_count else self.free_plan_id,
+                email_verified=True, email_notifications=self.rng.random() < 0.3, is_active=True,
+                created_at=datetime.combine(created, datetime.min.time()), updated_at=datetime.utcnow(),
+            ))
+        user_ids = self._insert(User, users, returning=True)
+
+        banks, employers, providers = [], [], []
+        for user_id in user_ids:
+            for name in self.rng.sample(BANK_NAMES, self.rng.randint(1, 2)):
+                banks.append(dict(user_id=user_id, name=name, is_active=True, **self._timestamps(self.history_start)))
+            for name in self.rng.sample(COMPANY_NAMES, self.rng.choice((1, 1, 2))):
+                employers.append(dict(user_id=user_id, name=name, contract_type=self.rng.choice(('CDI', 'CDD', 'Freelance')),
+                                      hire_date=self.history_start, is_active=True, **self._timestamps(self.history_start)))
+            for provider_type, _ in self.rng.sample(PROVIDER_KINDS, self.rng.randint(1, 3)):
+                providers.append(dict(user_id=user_id, name=f'{provider_type} {self.rng.choice(LAST_NAMES)}',
+                                      provider_type=provider_type, is_active=True, **self._timestamps(self.history_start)))
+        bank_ids = self._insert(Bank, banks, returning=True)
+        employer_ids = self._insert(Employer, employers, returning=True)
+        provider_ids = self._insert(Provider, providers, returning=True)
+        user_banks, user_employers, user_providers = defaultdict(list), defaultdict(list), defaultdict(list)
+        for rows, row_ids, by_user in ((banks, bank_ids, user_banks), (employers, employer_ids, user_employers),
+                                       (providers, provider_ids, user_providers)):
+            for row, row_id in zip(rows, row_ids):
+                row['id'] = row_id
+                by_user[row['user_id']].append(row)
+
+        self._insert(BankAccount, [
+            dict(user_id=bank['user_id'], bank_id=bank['id'], name='Compte courant', account_type='checking',
+                 currency='EUR', opening_balance=round(self.rng.uniform(0, 5000), 2), is_active=True,
+                 is_default=index == 0, **self._timestamps(self.history_start))
+            for user_id in user_ids for index, bank in enumerate(user_banks[user_id])
+        ])
+        self._insert(BankDocument, [
+            self._document(bank['user_id'], 'statement', f'Relevé {day:%Y-%m}', day, bank_id=bank['id'])
+            for bank in banks for day in _occurrences(self.history_start, relativedelta(months=3), self.today)
+        ])
+
+        for user_id in user_ids:
+            self._generate_user(user_id, user_banks[user_id], user_employers[user_id], user_providers[user_id])
+        return len(user_ids)
+
+    def _generate_user(self, user_id, banks, employers, providers):
+        rng = self.rng
+        transactions = []
+
+        # Revenus : un salaire mensuel par employeur, parfois un revenu locatif ou annuel
+        revenues = []
+        for employer in employers:
+            amount = round(rng.uniform(1600, 4200), 2)
+            revenues.append(('Salaire', employer, amount, 'monthly', self.history_start.replace(day=rng.randint(25, 28))))
+        if rng.random() < 0.3:
+            revenues.append(('Loyer perçu', None, round(rng.uniform(400, 1200), 2), 'monthly', self._random_date()))
+        if rng.random() < 0.3:
+            revenues.append(('Prime annuelle', employers[0], round(rng.uniform(500, 3000), 2), 'yearly', self._random_date()))
+        rows = []
+        schedules = []
+        for name, employer, amount, cycle, start in revenues:
+            dates = _occurrences(start, BILLING_CYCLE_STEPS[cycle], self.horizon)
+            past = [day for day in dates if day < self.today]
+            rows.append(dict(
+                user_id=user_id, employer_id=employer['id'] if employer else None, name=name, amount=amount,
+                currency='EUR', revenue_type='salary' if employer else 'rental', billing_cycle=cycle, start_date=start,
+                next_payment_date=next(day for day in dates if day >= self.today), is_active=True,
+                total_paid=round(amount * len(past), 2), **self._timestamps(start),
+            ))
+            schedules.append((name, amount, dates, employer['name'] if employer else 'Autres revenus'))
+        for revenue_id, (name, amount, dates, category) in zip(self._insert(Revenue, rows, returning=True), schedules):
+            transactions += [self._transaction(user_id, 'revenue', revenue_id, name, amount, day, category, is_positive=True) for day in dates]
+
+        # Fiches de paie mensuelles et contrat de l'employeur principal
+        employer = employers[0]
+        self._insert(EmployerDocument, [self._document(user_id, 'contract', 'Contrat de travail', self.history_start, employer_id=employer['id'])] + [
+            self._document(user_id, 'payslip', f'Fiche de paie {day:%Y-%m}', day, employer_id=employer['id'])
+            for day in _occurrences(self.history_start.replace(day=28), relativedelta(months=1), self.today)
+        ])
+
+        # Abonnements sur tous les cycles de facturation
+        rows, schedules = [], []
+        cycles, weights = zip(*BILLING_CYCLE_WEIGHTS.items())
+        for _ in range(rng.randint(4, 20)):
+            service = rng.choice(self.services) if self.services and rng.random() < 0.6 else None
+            service_plan = rng.choice(service.plans) if service else None
+            cycle = service_plan.billing_cycle if service_plan and service_plan.billing_cycle in BILLING_CYCLE_STEPS else rng.choices(cycles, weights)[0]
+            category_id = service.category_id if service else (rng.choice(self.categories).id if self.categories else None)
+            category = next((item.name for item in self.categories if item.id == category_id), 'Non catégorisé')
+            name = service.name if service else rng.choice(SUBSCRIPTION_NAMES)
+            amount = round(service_plan.amount if service_plan else rng.uniform(2, 60) * (10 if cycle == 'yearly' else 1), 2)
+            start = self._random_date()
+            dates = _occurrences(start, BILLING_CYCLE_STEPS[cycle], self.horizon)
+            is_active = rng.random() < 0.85
+            if not is_active:
+                dates = [day for day in dates if day < self.today]
+            past = [day for day in dates if day < self.today]
+            rows.append(dict(
+                user_id=user_id, category_id=category_id, service_id=service.id if service else None,
+                plan_id=service_plan.id if service_plan else None, name=name, amount=amount, currency='EUR',
+                billing_cycle=cycle, start_date=start, is_active=is_active, auto_renew=True,
+                next_billing_date=next((day for day in dates if day >= self.today), self.today + BILLING_CYCLE_STEPS[cycle]),
+                total_paid=round(amount * len(past), 2), cancelled_at=None if is_active else datetime.utcnow(),
+                **self._timestamps(start),
+            ))
+            schedules.append((name, amount, dates, category))
+        for subscription_id, (name, amount, dates, category) in zip(self._insert(Subscription, rows, returning=True), schedules):
+            transactions += [self._transaction(user_id, 'subscription', subscription_id, name, amount, day, category) for day in dates]
+
+        # Crédits mensuels et leurs documents
+        rows, schedules = [], []
+        for kind, label, minimum, maximum, months in rng.sample(CREDIT_KINDS, rng.choice((0, 1, 1, 2))):
+            total = round(rng.uniform(minimum, maximum), 2)
+            amount = round(total / months * 1.1, 2)
+            start = self._random_date()
+            end = start + relativedelta(months=months)
+            dates = _occurrences(start, relativedelta(months=1), min(end, self.horizon))
+            past = [day for day in dates if day < self.today]
+            credit_type = rng.choice(self.credit_types) if self.credit_types else None
+            rows.append(dict(
+                user_id=user_id, credit_type_id=credit_type.id if credit_type else None, bank_id=rng.choice(banks)['id'],
+                name=label, amount=amount, currency='EUR', credit_type=kind, billing_cycle='monthly', start_date=start,
+                end_date=end, next_payment_date=next((day for day in dates if day >= self.today), end), total_amount=total,
+                remaining_amount=round(max(total - amount * len(past), 0), 2), interest_rate=round(rng.uniform(1, 6), 2),
+                is_active=True, total_paid=round(amount * len(past), 2), **self._timestamps(start),
+            ))
+            schedules.append((label, amount, dates, start))
+        credit_ids = self._insert(Credit, rows, returning=True)
+        for credit_id, (name, amount, dates, start) in zip(credit_ids, schedules):
+            transactions += [self._transaction(user_id, 'credit', credit_id, name, amount, day, 'Crédit') for day in dates]
+        self._insert(CreditDocument, [
+            self._document(user_id, 'contract', f'Offre de prêt {name}', start, credit_id=credit_id)
+            for credit_id, (name, _, _, start) in zip(credit_ids, schedules)
+        ])
+
+        # Paiements en plusieurs fois (certains terminés)
+        rows, schedules = [], []
+        for _ in range(rng.choice((0, 0, 1, 2, 3))):
+            name, merchant, product_category = rng.choice(INSTALLMENT_PRODUCTS)
+            count = rng.choice((3, 4, 10))
+            total = round(rng.uniform(150, 2500), 2)
+            start = self._random_date()
+            dates = _occurrences(start, relativedelta(months=1), self.horizon, limit=count)
+            paid = len([day for day in dates if day < self.today])
+            rows.append(dict(
+                user_id=user_id, name=name, merchant=merchant, total_amount=total,
+                installment_amount=round(total / count, 2), number_of_installments=count, installments_paid=paid,
+                provider=rng.choice(INSTALLMENT_PROVIDERS), product_category=product_category, start_date=start,
+                next_payment_date=dates[min(paid, count - 1)], end_date=dates[-1], currency='EUR',
+                is_active=paid < count, is_completed=paid >= count, **self._timestamps(start),
+            ))
+            schedules.append((name, round(total / count, 2), dates, product_category))
+        for installment_id, (name, amount, dates, category) in zip(self._insert(InstallmentPayment, rows, returning=True), schedules):
+            transactions += [self._transaction(user_id, 'installment', installment_id, name, amount, day, category) for day in dates]
+
+        # Chéquiers de 25 chèques, une partie émis
+        for bank in banks[:rng.choice((0, 1, 1))]:
+            start_number = rng.randint(1000000, 9000000)
+            checkbook_id = self._insert(Checkbook, [dict(
+                user_id=user_id, name=f'Chéquier {bank["name"]}', bank_id=bank['id'], start_number=start_number,
+                end_number=start_number + 24, is_active=True, status='active', **self._timestamps(self.history_start),
+            )], returning=True)[0]
+            checks = []
+            for number in range(start_number, start_number + 25):
+                status = rng.choices(('available', 'used', 'cancelled'), (50, 45, 5))[0]
+                day = self._random_date() if status != 'available' else self.today
+                amount = round(rng.uniform(15, 400), 2) if status == 'used' else 0.0
+                checks.append(dict(
+                    user_id=user_id, checkbook_id=checkbook_id, check_number=number, amount=amount, currency='EUR',
+                    payee=rng.choice(PAYEES) if status == 'used' else None, check_date=day, status=status,
+                    **self._timestamps(day),
+                ))
+            for check_id, check in zip(self._insert(Check, checks, returning=True), checks):
+                if check['status'] == 'used':
+                    transactions.append(self._transaction(
+                        user_id, 'check', check_id, f"Chèque #{check['check_number']} - {check['payee']}",
+                        check['amount'], check['check_date'], 'Chèques', status='completed',
+                    ))
+
+        # Achats par carte : une quinzaine par mois, un sur trois avec son reçu
+        rows = []
+        for _ in range(rng.randint(8, 20) * self.years * 12):
+            merchant, category_name = rng.choice(MERCHANTS)
+            category = next((item for item in self.purchase_categories if item.name == category_name), None)
+            day = self._random_date()
+            with_receipt = rng.random() < 0.33
+            receipt = rng.choice(self.receipts) if with_receipt else None
+            rows.append(dict(
+                user_id=user_id, purchase_date=datetime.combine(day, datetime.min.time()) + timedelta(minutes=rng.randint(480, 1260)),
+                merchant_name=merchant, amount=round(rng.uniform(2, 180), 2), currency='EUR', payment_type='card',
+                category_id=category.id if category else None, category_name=category_name,
+                receipt_image_data=receipt, receipt_image_name=f'recu_{day:%Y%m%d}.jpg' if receipt else None,
+                receipt_image_mime_type='image/jpeg' if receipt else None, receipt_image_size=len(receipt) if receipt else None,
+                ocr_confidence=round(rng.uniform(60, 95), 1) if receipt else 0, was_manually_edited=False,
+                entry_method='ocr' if receipt else 'manual', is_active=True, **self._timestamps(day),
+            ))
+        for purchase_id, row in zip(self._insert(CardPurchase, rows, returning=True), rows):
+            transactions.append(self._transaction(
+                user_id, 'card_purchase', purchase_id, row['merchant_name'], row['amount'],
+                row['purchase_date'].date(), row['category_name'], status='completed',
+            ))
+
+        # Rappels annuels chez les prestataires, avec une facture pour les rendez-vous passés
+        rows = []
+        for provider in providers:
+            _, reminder_name = next(kind for kind in PROVIDER_KINDS if kind[0] == provider['provider_type'])
+            day = self._random_date(self.today - relativedelta(months=6), self.today + relativedelta(months=10))
+            booked = rng.random() < 0.4
+            rows.append(dict(
+                user_id=user_id, provider_id=provider['id'], name=reminder_name, reminder_month=day.month,
+                reminder_year=day.year, estimated_cost=round(rng.uniform(40, 250), 2), currency='EUR',
+                appointment_booked=booked, appointment_date=day if booked else None, recurrence='annual',
+                is_active=True, **self._timestamps(self.history_start),
+            ))
+        reminder_ids = self._insert(Reminder, rows, returning=True)
+        self._insert(ReminderDocument, [
+            self._document(user_id, 'invoice', f"Facture {row['name']}", self._random_date(), reminder_id=reminder_id)
+            for reminder_id, row in zip(reminder_ids, rows) if rng.random() < 0.5
+        ])
+
+        self._insert(Transaction, transactions)
+
+
+def synthetic_user_ids():
+    return select(User.id).where(User.email.like(f'%@{SYNTHETIC_EMAIL_DOMAIN}'))
+
+
+def delete_synthetic_data():
+    """Supprime les utilisateurs synthétiques et toutes leurs données ; renvoie le nombre d'utilisateurs supprimés"""
+    user_ids = synthetic_user_ids().scalar_subquery()
+    for table in USER_DATA_TABLES:
+        db.session.execute(delete(table).where(table.c.user_id.in_(user_ids)))
+    deleted = db.session.execute(delete(User.__table__).where(User.__table__.c.id.in_(user_ids))).rowcount
+    db.session.commit()
+    return deleted
+
+
+def next_synthetic_index():
+    """Index du prochain utilisateur synthétique (après ceux déjà présents)"""
+    return db.session.scalar(select(func.count()).select_from(synthetic_user_ids().subquery()))
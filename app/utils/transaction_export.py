@@ -0,0 +1,167 @@
+"""
+Export de l'historique complet des transactions (CSV compressé et Parquet)
+
+Les lignes sont lues par lots depuis un curseur côté serveur et converties au fil
+de l'eau : la mémoire utilisée ne dépend pas de la période exportée.
+"""
+import csv
+import io
+import zlib
+from sqlalchemy import select
+from app import db
+from app.models import Transaction
+from app.utils.excel_stream import ChunkSink
+
+# Types de sources pouvant générer des transactions
+TRANSACTION_SOURCE_TYPES = ('revenue', 'subscription', 'credit', 'installment', 'check', 'card_purchase')
+
+# Colonnes exportées, dans l'ordre du fichier
+TRANSACTION_EXPORT_COLUMNS = (
+    Transaction.id,
+    Transaction.transaction_date,
+    Transaction.transaction_type,
+    Transaction.source_type,
+    Transaction.source_id,
+    Transaction.name,
+    Transaction.description,
+    Transaction.category_name,
+    Transaction.amount,
+    Transaction.currency,
+    Transaction.is_positive,
+    Transaction.status,
+    Transaction.is_pointed,
+    Transaction.notes,
+)
+
+# Nombre de lignes lues à la fois depuis la base
+TRANSACTION_EXPORT_BATCH_SIZE = 1000
+
+# Nombre de lignes par groupe de lignes Parquet (unité de mémoire tampon)
+PARQUET_ROW_GROUP_SIZE = 50000
+
+EXPORT_FORMATS = {
+    'csv': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def transaction_export_rows(user_id, start_date=None, end_date=None, source_types=None):
+    """
+    Parcourt les transactions d'un utilisateur par ordre chronologique
+
+    Args:
+        user_id: ID de l'utilisateur
+        start_date: Première date incluse (facultative)
+        end_date: Dernière date incluse (facultative)
+        source_types: Types de sources à conserver (tous par défaut)
+
+    Returns:
+        Itérateur de lignes (tuples dans l'ordre de TRANSACTION_EXPORT_COLUMNS)
+    """
+    stmt = select(*TRANSACTION_EXPORT_COLUMNS).where(Transaction.user_id == user_id)
+    if start_date:
+        stmt = stmt.where(Transaction.transaction_date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.transaction_date <= end_date)
+    if source_types:
+        stmt = stmt.where(Transaction.source_type.in_(source_types))
+    stmt = stmt.order_by(Transaction.transaction_date, Transaction.id)
+
+    # yield_per active un curseur côté serveur : seules TRANSACTION_EXPORT_BATCH_SIZE lignes sont en mémoire
+    result = db.session.execute(stmt.execution_options(yield_per=TRANSACTION_EXPORT_BATCH_SIZE))
+    for row in result:
+        yield tuple(row)
+
+
+def stream_transactions_csv_gzip(rows):
+    """
+    Convertit les transactions en CSV compressé en gzip à la volée
+
+    Returns:
+        Générateur d'octets du fichier .csv.gz
+    """
+    # wbits=31 : flux au format gzip (en-tête et somme de contrôle inclus)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.key for column in TRANSACTION_EXPORT_COLUMNS])
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % TRANSACTION_EXPORT_BATCH_SIZE == 0:
+            chunk = compressor.compress(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+            if chunk:
+                yield chunk
+
+    yield compressor.compress(buffer.getvalue().encode('utf-8')) + compressor.flush()
+
+
+def stream_transactions_parquet(rows):
+    """
+    Convertit les transactions en fichier Parquet, un groupe de lignes à la fois
+
+    Returns:
+        Générateur d'octets du fichier .parquet
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('transaction_date', pa.date32()),
+        ('transaction_type', pa.string()),
+        ('source_type', pa.string()),
+        ('source_id', pa.int64()),
+        ('name', pa.string()),
+        ('description', pa.string()),
+        ('category_name', pa.string()),
+        ('amount', pa.float64()),
+        ('currency', pa.string()),
+        ('is_positive', pa.bool_()),
+        ('status', pa.string()),
+        ('is_pointed', pa.bool_()),
+        ('notes', pa.string()),
+    ])
+
+    sink = ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+
+    def write_row_group(batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+            schema=schema
+        ))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == PARQUET_ROW_GROUP_SIZE:
+            write_row_group(batch)
+            batch = []
+            yield sink.drain()
+
+    if batch:
+        write_row_group(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def stream_transactions_export(format, user_id, start_date=None, end_date=None, source_types=None):
+    """
+    Exporte l'historique des transactions d'un utilisateur dans le format demandé
+
+    Args:
+        format: 'csv' (CSV compressé en gzip) ou 'parquet'
+
+    Returns:
+        Générateur d'octets du fichier
+    """
+    rows = transaction_export_rows(user_id, start_date, end_date, source_types)
+    if format == 'csv':
+        return stream_transactions_csv_gzip(rows)
+    if format == 'parquet':
+        return stream_transactions_parquet(rows)
+    raise ValueError(f'Format non supporté : {format}')
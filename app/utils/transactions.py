@@ -1,8 +1,10 @@
 """
 Fonctions utilitaires pour la gestion des transactions financières
 """
-from datetime import datetime, timedelta
+from calendar import monthrange
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from sqlalchemy import update
 from app import db
 from app.models import Transaction, Revenue, Subscription, Credit, InstallmentPayment
 
@@ -394,19 +396,124 @@ def cancel_future_transactions(source_id, source_type):
     """
     today = datetime.now().date()
 
-    # Récupérer toutes les transactions futures
-    future_transactions = Transaction.query.filter(
+    db.session.execute(
+        update(Transaction)
+        .where(
+            Transaction.source_id == source_id,
+            Transaction.source_type == source_type,
+            Transaction.transaction_date > today,
+            Transaction.status == 'pending'
+        )
+        .values(status='cancelled')
+        .execution_options(synchronize_session=False)
+    )
+
+    db.session.commit()
+
+
+def month_transactions_criteria(year, month, status='all'):
+    """
+    Critères des transactions affichées dans la balance pour un mois donné
+
+    Args:
+        year: Année
+        month: Mois (1-12)
+        status: Filtre de statut ('all', 'pending', 'completed')
+
+    Returns:
+        Tuple de critères SQLAlchemy (les transactions annulées sont exclues)
+    """
+    first_day = date(year, month, 1)
+    last_day = date(year, month, monthrange(year, month)[1])
+
+    criteria = (
+        Transaction.transaction_date >= first_day,
+        Transaction.transaction_date <= last_day,
+        Transaction.status != 'cancelled'
+    )
+    if status != 'all':
+        criteria += (Transaction.status == status,)
+    return criteria
+
+
+def source_transactions_criteria(source_id, source_type, before=None, after=None):
+    """
+    Critères des transactions d'un objet source, éventuellement bornées par date (bornes incluses)
+
+    Args:
+        source_id: ID de l'objet source
+        source_type: Type de l'objet ('revenue', 'subscription', 'credit', 'installment', ...)
+        before: Date maximale incluse (optionnelle)
+        after: Date minimale incluse (optionnelle)
+    """
+    criteria = (
         Transaction.source_id == source_id,
-        Transaction.source_type == source_type,
-        Transaction.transaction_date > today,
-        Transaction.status == 'pending'
-    ).all()
+        Transaction.source_type == source_type
+    )
+    if before is not None:
+        criteria += (Transaction.transaction_date <= before,)
+    if after is not None:
+        criteria += (Transaction.transaction_date >= after,)
+    return criteria
 
-    # Marquer comme annulées
-    for transaction in future_transactions:
-        transaction.status = 'cancelled'
+
+def _bulk_update_transactions(user_id, criteria, values):
+    """
+    Applique une modification à toutes les transactions d'un utilisateur répondant aux critères,
+    en une seule requête UPDATE ... RETURNING id
+
+    Returns:
+        Liste des IDs des transactions modifiées
+    """
+    transaction_ids = db.session.scalars(
+        update(Transaction)
+        .where(Transaction.user_id == user_id, *criteria)
+        .values(**values)
+        .returning(Transaction.id)
+        .execution_options(synchronize_session=False)
+    ).all()
 
     db.session.commit()
+    return transaction_ids
+
+
+def set_transactions_pointed(user_id, is_pointed, *criteria):
+    """
+    Pointe ou dépointe en une requête les transactions d'un utilisateur
+
+    Seules les transactions dont l'état change sont modifiées et comptées.
+
+    Args:
+        user_id: ID de l'utilisateur propriétaire
+        is_pointed: True pour pointer, False pour dépointer
+        *criteria: Critères SQLAlchemy supplémentaires (ex: month_transactions_criteria)
+
+    Returns:
+        Liste des IDs des transactions modifiées
+    """
+    return _bulk_update_transactions(
+        user_id,
+        criteria + (Transaction.is_pointed != is_pointed,),
+        {'is_pointed': is_pointed}
+    )
+
+
+def cancel_transactions(user_id, *criteria):
+    """
+    Annule en une requête les transactions d'un utilisateur (status = 'cancelled')
+
+    Args:
+        user_id: ID de l'utilisateur propriétaire
+        *criteria: Critères SQLAlchemy supplémentaires (ex: source_transactions_criteria)
+
+    Returns:
+        Liste des IDs des transactions annulées
+    """
+    return _bulk_update_transactions(
+        user_id,
+        criteria + (Transaction.status != 'cancelled',),
+        {'status': 'cancelled'}
+    )
 
 
 def delete_all_transactions(source_id, source_type):
@@ -1,9 +1,14 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 load_dotenv(os.path.join(basedir, '.env'))
 
+# Répertoire partagé des métriques Prometheus (workers Gunicorn et commandes cron),
+# lu par prometheus_client à son premier import
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'budgeefamily-metrics'))
+
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
@@ -11,6 +16,23 @@ class Config:
         'postgresql://localhost/budgeefamily_app'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool de connexions PostgreSQL par processus (voir app/utils/db_pool.py). Avec des
+    # workers gthread, DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW doit couvrir GUNICORN_THREADS.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))
+    # Attente maximale d'une connexion libre (secondes)
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    # Connexions renouvelées après ce délai (secondes, -1 = jamais)
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    # Vérifie chaque connexion avant usage (connexions coupées par le serveur ou un pare-feu)
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ['true', 'on', '1']
+    # Attente d'une connexion journalisée au-delà de ce délai (millisecondes)
+    DB_POOL_SLOW_CHECKOUT_MS = int(os.environ.get('DB_POOL_SLOW_CHECKOUT_MS', 100))
+    # Durée maximale d'une requête SQL (millisecondes, 0 = illimitée)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+    # Connexion via PgBouncer en mode transaction : pas de pool applicatif ni d'état de session
+    DB_PGBOUNCER = os.environ.get('DB_PGBOUNCER', 'false').lower() in ['true', 'on', '1']
+
     # Stripe
     STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY')
     STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY')
@@ -34,6 +56,46 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER', 'noreply@budgeefamily.com')
 
+    # Cache du bytecode des templates d'emails (partagé entre les workers)
+    EMAIL_TEMPLATE_CACHE_DIR = os.environ.get('EMAIL_TEMPLATE_CACHE_DIR')
+
+    # Récapitulatif des notifications par email (0 = envoi immédiat de chaque notification)
+    NOTIFICATION_DIGEST_WINDOW_MINUTES = int(os.environ.get('NOTIFICATION_DIGEST_WINDOW_MINUTES', 0))
+    NOTIFICATION_DIGEST_MAX_AGE_HOURS = int(os.environ.get('NOTIFICATION_DIGEST_MAX_AGE_HOURS', 48))
+
+    # Durée de conservation des notifications archivées avant purge (en jours)
+    NOTIFICATION_RETENTION_DAYS = int(os.environ.get('NOTIFICATION_RETENTION_DAYS', 365))
+
+    # Rapports PDF rendus en arrière-plan et mis en cache sur disque (partagé entre les workers)
+    PDF_REPORT_CACHE_DIR = os.environ.get('PDF_REPORT_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'budgeefamily-reports')
+    PDF_REPORT_WORKERS = int(os.environ.get('PDF_REPORT_WORKERS', 2))
+    # Attente maximale dans la requête avant d'afficher la page de génération en cours
+    PDF_REPORT_INLINE_WAIT_SECONDS = float(os.environ.get('PDF_REPORT_INLINE_WAIT_SECONDS', 2))
+    # Au-delà, un rendu toujours marqué en cours est considéré comme interrompu et relancé
+    PDF_REPORT_JOB_TIMEOUT = int(os.environ.get('PDF_REPORT_JOB_TIMEOUT', 300))
+
+    # Nombre d'agrégats (tableau de bord, répartitions) mémorisés par processus (0 = désactivé)
+    AGGREGATES_CACHE_SIZE = int(os.environ.get('AGGREGATES_CACHE_SIZE', 2048))
+
+    # Taille maximale (octets) des logos gardés en mémoire par processus (0 = désactivé)
+    LOGO_CACHE_MAX_BYTES = int(os.environ.get('LOGO_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+
+    # Détecteur de N+1 : 'off', 'log' ou 'raise' (par défaut 'raise' en test, 'log' en debug, 'off' sinon)
+    NPLUSONE_MODE = os.environ.get('NPLUSONE_MODE')
+    # Chargements paresseux tolérés pour une même relation dans une requête
+    NPLUSONE_MAX_LAZY_LOADS = int(os.environ.get('NPLUSONE_MAX_LAZY_LOADS', 1))
+    # Requêtes SQL journalisées au-delà de cette durée (millisecondes, 0 = désactivé)
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 250))
+    # En-tête Server-Timing (temps SQL, rendu, total) ajouté à chaque réponse ; sinon
+    # seulement en mode debug et pour les administrateurs connectés
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() in ['true', 'on', '1']
+
+    # Jeton du collecteur Prometheus pour /metrics (Authorization: Bearer), en plus des administrateurs connectés
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Limites de débit par adresse IP (désactivées pour les tests de charge, voir docs/TESTS_DE_CHARGE.md)
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() in ['true', 'on', '1']
+
     # Configuration pour les URLs en dehors des requêtes HTTP (pour les emails via cron)
     SERVER_NAME = os.environ.get('SERVER_NAME', 'budgeefamily.com')
     PREFERRED_URL_SCHEME = os.environ.get('PREFERRED_URL_SCHEME', 'https')
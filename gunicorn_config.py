@@ -1,19 +1,32 @@
 # Configuration Gunicorn pour Budgee Family
 
 import multiprocessing
+import os
 
 # Adresse et port
 bind = "127.0.0.1:8000"
 
-# Nombre de workers (2-4 x CPU cores)
-workers = multiprocessing.cpu_count() * 2 + 1
+# Type de worker : "sync" (une requête à la fois par processus) ou "gthread"
+# (GUNICORN_THREADS requêtes par processus). Avec gthread, un appel lent (OCR, envoi
+# SMTP, API Stripe, SFTP) n'immobilise qu'un thread et non un processus entier.
+# Les threads d'un worker partagent ses caches (verrouillés) et ont chacun leur
+# session SQLAlchemy (portée par contexte d'application).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 8)) if worker_class == 'gthread' else 1
 
-# Type de worker
-worker_class = "sync"
+# Nombre de workers (2-4 x CPU cores en sync ; avec gthread, les threads assurent la concurrence)
+default_workers = multiprocessing.cpu_count() * 2 + 1 if worker_class == 'sync' else multiprocessing.cpu_count() + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', default_workers))
 
 # Timeout (5 minutes pour traitement OCR)
 timeout = 300
 
+# Chargement de l'application dans le maître avant le fork des workers : imports,
+# templates et traductions sont partagés en copie sur écriture (voir app/utils/preload.py).
+# Avec le préchargement, `kill -HUP` ne recharge pas le code : redémarrer le service
+# après un déploiement. GUNICORN_PRELOAD=0 rétablit un chargement par worker.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
 # Logs
 accesslog = "/opt/budgeefamily/logs/gunicorn_access.log"
 errorlog = "/opt/budgeefamily/logs/gunicorn_error.log"
@@ -24,3 +37,45 @@ proc_name = "budgeefamily"
 
 # Reload on code changes (désactiver en production)
 reload = False
+
+
+def _log_memory(log, label, pid=None):
+    from app.utils.preload import process_memory
+
+    memory = process_memory(pid)
+    log.info(f"{label} (pid {pid or os.getpid()}) : " + ", ".join(f"{key} {value} Mo" for key, value in memory.items()))
+
+
+def on_starting(server):
+    """Démarrage du maître : oublie les métriques Prometheus des processus terminés"""
+    from app.utils.metrics import clean_multiprocess_dir
+
+    clean_multiprocess_dir()
+
+
+def when_ready(server):
+    """Maître prêt : préchauffe l'application préchargée et gèle le ramasse-miettes avant le fork"""
+    if server.cfg.preload_app:
+        from app.utils.preload import freeze_for_fork
+
+        freeze_for_fork(server.app.wsgi())
+    _log_memory(server.log, "Maître")
+
+
+def post_fork(server, worker):
+    """Nouveau worker : ne pas réutiliser les connexions SQL du maître"""
+    if server.cfg.preload_app:
+        from app.utils.preload import dispose_engines
+
+        dispose_engines(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    _log_memory(worker.log, "Worker prêt")
+
+
+def child_exit(server, worker):
+    """Worker terminé : ses jauges « live » (OCR, rapports PDF en cours) ne comptent plus"""
+    from app.utils.metrics import mark_process_dead
+
+    mark_process_dead(worker.pid)
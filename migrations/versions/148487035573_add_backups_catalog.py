@@ -0,0 +1,42 @@
+"""Add backups table (local catalog of SFTP backups)
+
+Revision ID: 148487035573
+Revises: 420754bbe80c
+Create Date: 2026-10-19 14:21:05.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '148487035573'
+down_revision = '420754bbe80c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('backups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('backup_type', sa.String(length=20), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=True),
+    sa.Column('backup_date', sa.DateTime(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('filename')
+    )
+    with op.batch_alter_table('backups', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_backups_backup_date'), ['backup_date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_backups_backup_type'), ['backup_type'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('backups', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_backups_backup_type'))
+        batch_op.drop_index(batch_op.f('ix_backups_backup_date'))
+
+    op.drop_table('backups')
@@ -0,0 +1,26 @@
+"""Add users.data_version for the aggregates cache
+
+Revision ID: 420754bbe80c
+Revises: ef8db6335def
+Create Date: 2026-10-19 10:02:17.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '420754bbe80c'
+down_revision = 'ef8db6335def'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('data_version')
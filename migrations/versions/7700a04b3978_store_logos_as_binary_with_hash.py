@@ -0,0 +1,82 @@
+"""Store service and category logos as binary with a SHA-256 hash
+
+Revision ID: 7700a04b3978
+Revises: 148487035573
+Create Date: 2026-10-19 15:02:44.719530
+
+"""
+import base64
+import binascii
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7700a04b3978'
+down_revision = '148487035573'
+branch_labels = None
+depends_on = None
+
+TABLES = ('services', 'categories')
+
+
+def upgrade():
+    connection = op.get_bind()
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('logo_bytes', sa.LargeBinary(), nullable=True))
+            batch_op.add_column(sa.Column('logo_hash', sa.String(length=64), nullable=True))
+
+        table = sa.table(
+            table_name,
+            sa.column('id', sa.Integer),
+            sa.column('logo_data', sa.Text),
+            sa.column('logo_bytes', sa.LargeBinary),
+            sa.column('logo_hash', sa.String),
+        )
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.logo_data).where(table.c.logo_data.isnot(None))
+        ).all()
+        for row_id, logo_data in rows:
+            try:
+                logo_bytes = base64.b64decode(logo_data)
+            except (binascii.Error, ValueError):
+                # Logo illisible : il n'était déjà pas affichable
+                continue
+            if logo_bytes:
+                connection.execute(table.update().where(table.c.id == row_id).values(
+                    logo_bytes=logo_bytes,
+                    logo_hash=hashlib.sha256(logo_bytes).hexdigest()
+                ))
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('logo_data')
+            batch_op.alter_column('logo_bytes', new_column_name='logo_data')
+
+
+def downgrade():
+    connection = op.get_bind()
+    for table_name in TABLES:
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('logo_base64', sa.Text(), nullable=True))
+
+        table = sa.table(
+            table_name,
+            sa.column('id', sa.Integer),
+            sa.column('logo_data', sa.LargeBinary),
+            sa.column('logo_base64', sa.Text),
+        )
+        rows = connection.execute(
+            sa.select(table.c.id, table.c.logo_data).where(table.c.logo_data.isnot(None))
+        ).all()
+        for row_id, logo_bytes in rows:
+            connection.execute(table.update().where(table.c.id == row_id).values(
+                logo_base64=base64.b64encode(logo_bytes).decode('utf-8')
+            ))
+
+        with op.batch_alter_table(table_name, schema=None) as batch_op:
+            batch_op.drop_column('logo_data')
+            batch_op.drop_column('logo_hash')
+            batch_op.alter_column('logo_base64', new_column_name='logo_data')
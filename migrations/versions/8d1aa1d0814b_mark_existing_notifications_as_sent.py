@@ -0,0 +1,31 @@
+"""Mark existing notifications as sent (no digest for notifications already emailed)
+
+Revision ID: 8d1aa1d0814b
+Revises: f483a4c96c93
+Create Date: 2026-10-19 18:24:03.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d1aa1d0814b'
+down_revision = 'f483a4c96c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Avant les récapitulatifs, chaque notification était envoyée par email dès sa
+    # création sans que is_sent soit renseigné : sans cette mise à jour, le premier
+    # `flask send-notification-digests` les renverrait toutes dans un récapitulatif
+    op.execute("""
+        UPDATE notifications SET is_sent = true, sent_at = created_at
+        WHERE is_sent = false OR is_sent IS NULL
+    """)
+
+
+def downgrade():
+    # Migration de données : l'état d'envoi d'origine n'est pas conservé
+    pass
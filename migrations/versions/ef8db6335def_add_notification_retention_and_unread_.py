@@ -0,0 +1,63 @@
+"""Add notification archive table, composite index and unread counter
+
+Revision ID: ef8db6335def
+Revises: afe0b4bf5d67
+Create Date: 2026-10-19 09:12:41.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ef8db6335def'
+down_revision = 'afe0b4bf5d67'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('notification_archives',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('title', sa.String(length=200), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('read_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('moved_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('notification_archives', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_notification_archives_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_archived_read_created', ['user_id', 'archived', 'is_read', 'created_at'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unread_notifications_count', sa.Integer(), server_default='0', nullable=False))
+
+    # Initialiser le compteur à partir des notifications existantes
+    op.execute("""
+        UPDATE users SET unread_notifications_count = (
+            SELECT COUNT(*) FROM notifications
+            WHERE notifications.user_id = users.id
+              AND notifications.is_read = false
+              AND notifications.archived = false
+        )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('unread_notifications_count')
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_archived_read_created')
+
+    with op.batch_alter_table('notification_archives', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_archives_user_id'))
+
+    op.drop_table('notification_archives')
@@ -0,0 +1,29 @@
+"""Add catalog_version table (invalidation of the cached global catalog)
+
+Revision ID: f483a4c96c93
+Revises: 7700a04b3978
+Create Date: 2026-10-19 16:02:41.527310
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f483a4c96c93'
+down_revision = '7700a04b3978'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(catalog_version, [{'id': 1, 'version': 1}])
+
+
+def downgrade():
+    op.drop_table('catalog_version')
@@ -1,6 +1,8 @@
 #!/bin/bash
 # Script pour créer une sauvegarde automatique
 # Exécuté automatiquement chaque jour à 3h du matin
+# Incrémentale (documents dédupliqués), complète une fois par semaine
+# Dump parallèle (un processus par cœur) puis restauration de vérification dans une base temporaire
 
 # Définir le répertoire de travail
 cd /opt/budgeefamily
@@ -12,7 +14,7 @@ source .venv/bin/activate
 export FLASK_APP=wsgi.py
 
 # Exécuter la commande Flask
-flask auto-backup
+flask auto-backup --incremental --jobs 0 --verify
 
 # Déconnecter
 deactivate
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark du rendu des emails : simule l'envoi du récapitulatif quotidien
+(notification 'daily_update') à N destinataires, puis celui du récapitulatif
+groupé de plusieurs notifications, sans base de données ni SMTP.
+
+Usage :
+    python scripts/benchmark_email_render.py [--recipients 10000] [--digest-size 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.utils.email import DEFAULT_NOTIFICATION_STYLE, NOTIFICATION_STYLES, render_email
+
+DIGEST_MESSAGE = (
+    "📅 3 abonnement(s) mis à jour\n"
+    "  • Netflix: 1 paiement(s) de 13.49€\n"
+    "  • Spotify: 1 paiement(s) de 10.99€\n"
+    "  • iCloud: 1 paiement(s) de 2.99€\n\n"
+    "💰 1 revenu(s) mis à jour\n"
+    "  • Salaire: 1 versement(s) de 2500.00€\n\n"
+    "⚙️ Traitement automatisé par Budgee Family"
+)
+
+
+def build_recipients(count):
+    """Génère des destinataires fictifs, moitié en français, moitié en anglais"""
+    return [
+        SimpleNamespace(
+            first_name=f'Utilisateur {i}',
+            email=f'user{i}@example.com',
+            language='en' if i % 2 else 'fr',
+        )
+        for i in range(count)
+    ]
+
+
+def build_digest_items(notification, size):
+    """Construit les notifications d'un récapitulatif groupé"""
+    types = ['daily_update', 'subscription_added', 'credit_added', 'revenue_added', 'reminder_appointment_10days']
+    items = []
+    for i in range(size):
+        notification_type = types[i % len(types)]
+        item = SimpleNamespace(
+            type=notification_type,
+            title=notification.title,
+            message=notification.message,
+            created_at=datetime.utcnow(),
+        )
+        items.append((item, NOTIFICATION_STYLES.get(notification_type, DEFAULT_NOTIFICATION_STYLE)))
+    return items
+
+
+def run(label, recipients, render):
+    """Mesure le premier rendu puis le rendu pour tous les destinataires"""
+    start = time.perf_counter()
+    render(recipients[0])
+    first_render = time.perf_counter() - start
+
+    total_bytes = 0
+    start = time.perf_counter()
+    for user in recipients:
+        html_body, text_body = render(user)
+        total_bytes += len(html_body) + len(text_body)
+    elapsed = time.perf_counter() - start
+
+    print(f"=== {label} ===")
+    print(f"Destinataires           : {len(recipients)}")
+    print(f"Premier rendu (compil.) : {first_render * 1000:.2f} ms")
+    print(f"Rendu total             : {elapsed:.2f} s")
+    print(f"Par message             : {elapsed / len(recipients) * 1000:.3f} ms")
+    print(f"Débit                   : {len(recipients) / elapsed:.0f} messages/s")
+    print(f"Volume généré           : {total_bytes / (1024 * 1024):.1f} Mo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipients', type=int, default=10000)
+    parser.add_argument('--digest-size', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    notification = SimpleNamespace(
+        type='daily_update',
+        title='Mise à jour automatique quotidienne',
+        message=DIGEST_MESSAGE,
+    )
+    style = NOTIFICATION_STYLES['daily_update']
+    recipients = build_recipients(args.recipients)
+
+    items = build_digest_items(notification, args.digest_size)
+
+    with app.test_request_context():
+        run("Notification unique", recipients, lambda user: render_email(
+            'notification', user.language, user=user, notification=notification, style=style
+        ))
+        run(f"Récapitulatif de {args.digest_size} notifications", recipients, lambda user: render_email(
+            'digest', user.language, user=user, items=items
+        ))
+
+if __name__ == '__main__':
+    main()
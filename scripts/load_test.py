@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Test de charge HTTP : des sessions connectées (utilisateurs créés par `flask
+seed-synthetic`) rejouent un mélange pondéré de pages, d'API et d'exports. Affiche
+le débit, les latences (p50, p95, max) et le nombre moyen de requêtes SQL (en-tête
+Server-Timing) par endpoint, et les compare à une référence enregistrée.
+
+Le serveur doit être lancé avec RATELIMIT_ENABLED=false (sinon les limites par
+adresse IP rejettent les requêtes en 429) et SERVER_TIMING=true (sinon le nombre de
+requêtes SQL n'est pas renvoyé).
+
+Usage :
+    python scripts/load_test.py --base-url http://127.0.0.1:8000 --host budgeefamily.com --password ... \\
+        [--users 50] [--concurrency 20] [--duration 60] [--baseline loadtest_baseline.json] [--save-baseline]
+
+Code de sortie 1 si une erreur HTTP survient ou si un endpoint régresse de plus de
+--max-regression % (p95 ou débit) par rapport à la référence.
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import requests
+
+# Comptes créés par `flask seed-synthetic` (voir app/utils/synthetic_data.py)
+SYNTHETIC_EMAIL = 'user{index:06d}@synthetic.budgeefamily.test'
+
+# (nom, chemin, poids, réservé aux utilisateurs Premium)
+ENDPOINTS = (
+    ('dashboard', '/dashboard', 10, False),
+    ('balance', '/balance', 6, False),
+    ('api_stats', '/api/stats', 6, False),
+    ('api_subscriptions_distribution', '/api/subscriptions/distribution', 3, False),
+    ('api_credits_distribution', '/api/credits/distribution', 3, False),
+    ('api_revenues_distribution', '/api/revenues/distribution', 3, False),
+    ('api_card_purchases_distribution', '/api/card-purchases/distribution', 3, False),
+    ('export_monthly_evolution', '/exports/dashboard/monthly-evolution/excel', 1, True),
+    ('export_subscriptions', '/exports/subscriptions/excel', 1, True),
+    ('export_transactions', '/exports/transactions/csv', 1, True),
+)
+
+# Export utilisé pour savoir si un compte est Premium (redirection sinon)
+PREMIUM_PROBE = '/exports/subscriptions/excel'
+
+SERVER_TIMING_SQL = re.compile(r'desc="(\d+) SQL"')
+
+
+class Results:
+    """Latences, erreurs et requêtes SQL par endpoint, partagées par les threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.sql_counts = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def record(self, name, latency, status, sql_count):
+        with self._lock:
+            if status == 200:
+                self.latencies[name].append(latency)
+                if sql_count is not None:
+                    self.sql_counts[name].append(sql_count)
+            else:
+                self.errors[name] += 1
+                self.error_samples.setdefault(name, status)
+
+    def summary(self, elapsed):
+        """Statistiques par endpoint : requêtes, erreurs, débit (req/s) et latences (ms)"""
+        stats = {}
+        for name in sorted(set(self.latencies) | set(self.errors)):
+            latencies = sorted(self.latencies[name])
+            sql_counts = self.sql_counts[name]
+            stats[name] = {
+                'requests': len(latencies),
+                'errors': self.errors[name],
+                'rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': round(percentile(latencies, 50) * 1000, 1),
+                'p95_ms': round(percentile(latencies, 95) * 1000, 1),
+                'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+                'sql_avg': round(sum(sql_counts) / len(sql_counts), 1) if sql_counts else None,
+            }
+        return stats
+
+
+def percentile(values, rank):
+    """Percentile au rang le plus proche d'une liste triée (0 si vide)"""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+def open_session(args, index):
+    """Session HTTP connectée pour l'utilisateur synthétique index ; renvoie (session, premium)"""
+    session = requests.Session()
+    if args.host:
+        session.headers['Host'] = args.host
+    email = SYNTHETIC_EMAIL.format(index=index)
+    response = session.post(
+        f'{args.base_url}/auth/login', data={'email': email, 'password': args.password},
+        allow_redirects=False, timeout=args.timeout,
+    )
+    if response.status_code != 302 or '/auth/login' in response.headers.get('Location', ''):
+        raise RuntimeError(f"Connexion impossible pour {email} (HTTP {response.status_code})")
+
+    probe = session.get(f'{args.base_url}{PREMIUM_PROBE}', allow_redirects=False, timeout=args.timeout)
+    return session, probe.status_code == 200
+
+
+def run_user(args, session, premium, results, warmup_end, stop_at, seed):
+    """Boucle d'un utilisateur virtuel jusqu'à la fin du test"""
+    rng = random.Random(seed)
+    endpoints = [endpoint for endpoint in ENDPOINTS if premium or not endpoint[3]]
+    weights = [endpoint[2] for endpoint in endpoints]
+    while time.time() < stop_at:
+        name, path, _, _ = rng.choices(endpoints, weights)[0]
+        start = time.perf_counter()
+        try:
+            response = session.get(f'{args.base_url}{path}', allow_redirects=False, timeout=args.timeout)
+            response.content  # lecture complète (exports en flux)
+            status = response.status_code
+            match = SERVER_TIMING_SQL.search(response.headers.get('Server-Timing', ''))
+            sql_count = int(match.group(1)) if match else None
+        except requests.RequestException as e:
+            status, sql_count = type(e).__name__, None
+        latency = time.perf_counter() - start
+        if time.time() >= warmup_end:
+            results.record(name, latency, status, sql_count)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def compare(stats, baseline, max_regression, min_requests):
+    """
+    Endpoints dont le p95 ou le débit régresse de plus de max_regression % par rapport à la référence
+
+    Les endpoints appelés moins de min_requests fois (exports) ne sont pas comparés :
+    leur p95 et leur débit varient trop d'une exécution à l'autre.
+    """
+    regressions = []
+    for name, reference in baseline.get('endpoints', {}).items():
+        current = stats.get(name)
+        if not current or not current['requests']:
+            regressions.append(f"{name} : aucune requête réussie")
+            continue
+        if current['requests'] < min_requests:
+            continue
+        if reference['p95_ms'] and current['p95_ms'] > reference['p95_ms'] * (1 + max_regression / 100):
+            regressions.append(f"{name} : p95 {current['p95_ms']} ms (référence {reference['p95_ms']} ms)")
+        if reference['rps'] and current['rps'] < reference['rps'] * (1 - max_regression / 100):
+            regressions.append(f"{name} : {current['rps']} req/s (référence {reference['rps']} req/s)")
+    return regressions
+
+
+def print_report(stats, baseline, elapsed):
+    reference = baseline.get('endpoints', {}) if baseline else {}
+    print(f"\n{'endpoint':<34}{'req':>7}{'err':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}{'sql':>6}{'réf. p95':>10}")
+    for name, entry in stats.items():
+        sql = '' if entry['sql_avg'] is None else entry['sql_avg']
+        ref_p95 = reference.get(name, {}).get('p95_ms', '')
+        print(
+            f"{name:<34}{entry['requests']:>7}{entry['errors']:>6}{entry['rps']:>9}"
+            f"{entry['p50_ms']:>9}{entry['p95_ms']:>9}{entry['max_ms']:>9}{sql:>6}{ref_p95:>10}"
+        )
+    total = sum(entry['requests'] for entry in stats.values())
+    errors = sum(entry['errors'] for entry in stats.values())
+    print(f"\nTotal : {total} requêtes réussies, {errors} erreurs, {total / elapsed:.1f} req/s sur {elapsed:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Adresse du serveur testé')
+    parser.add_argument('--host', default=None, help='En-tête Host envoyé (SERVER_NAME de l\'application)')
+    parser.add_argument('--users', type=int, default=50, help='Comptes synthétiques utilisés (user000000, user000001, ...)')
+    parser.add_argument('--first-user', type=int, default=0, help='Index du premier utilisateur synthétique')
+    parser.add_argument('--password', required=True, help='Mot de passe donné à `flask seed-synthetic`')
+    parser.add_argument('--concurrency', type=int, default=20, help='Utilisateurs virtuels simultanés')
+    parser.add_argument('--duration', type=float, default=60, help='Durée mesurée (s)')
+    parser.add_argument('--warmup', type=float, default=5, help='Durée de mise en route non mesurée (s)')
+    parser.add_argument('--think-time', type=float, default=0, help='Pause moyenne entre deux requêtes d\'un utilisateur (s)')
+    parser.add_argument('--timeout', type=float, default=60, help='Délai maximal d\'une requête (s)')
+    parser.add_argument('--seed', type=int, default=0, help='Graine du tirage des endpoints')
+    parser.add_argument('--baseline', default='loadtest_baseline.json', help='Fichier de référence (JSON)')
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer les résultats comme nouvelle référence')
+    parser.add_argument('--max-regression', type=float, default=20, help='Régression tolérée (%%) du p95 et du débit')
+    parser.add_argument('--min-requests', type=int, default=30, help='Requêtes nécessaires pour comparer un endpoint à la référence')
+    args = parser.parse_args()
+    args.base_url = args.base_url.rstrip('/')
+
+    # Une session par utilisateur virtuel (requests.Session n'est pas partagée entre threads),
+    # réparties sur les comptes synthétiques
+    print(f"Connexion de {args.concurrency} sessions ({args.users} utilisateurs synthétiques)...")
+    sessions = []
+    for number in range(args.concurrency):
+        try:
+            sessions.append(open_session(args, args.first_user + number % args.users))
+        except (RuntimeError, requests.RequestException) as e:
+            sys.exit(str(e))
+    premium_count = sum(1 for _, premium in sessions if premium)
+    print(f"  {len(sessions)} sessions ({premium_count} Premium)")
+
+    results = Results()
+    warmup_end = time.time() + args.warmup
+    stop_at = warmup_end + args.duration
+    threads = [
+        threading.Thread(
+            target=run_user, args=(args, session, premium, results, warmup_end, stop_at, args.seed + number), daemon=True,
+        )
+        for number, (session, premium) in enumerate(sessions)
+    ]
+    print(f"{args.concurrency} utilisateurs virtuels pendant {args.warmup:.0f} + {args.duration:.0f} s...")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - warmup_end
+
+    stats = results.summary(elapsed)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_report(stats, baseline, elapsed)
+
+    for name, status in results.error_samples.items():
+        print(f"✗ {name} : {results.errors[name]} erreur(s), par exemple {status}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'settings': {key: getattr(args, key) for key in ('users', 'concurrency', 'duration', 'think_time')},
+                'endpoints': {name: {key: entry[key] for key in ('rps', 'p50_ms', 'p95_ms', 'sql_avg')} for name, entry in stats.items()},
+            }, f, indent=2)
+        print(f"✓ Référence enregistrée dans {args.baseline}")
+    elif baseline:
+        settings = baseline.get('settings', {})
+        if settings.get('concurrency') != args.concurrency or settings.get('think_time') != args.think_time:
+            print(f"⚠ Référence mesurée avec d'autres paramètres : {settings}")
+        regressions = compare(stats, baseline, args.max_regression, args.min_requests)
+        for regression in regressions:
+            print(f"✗ Régression {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"✓ Aucune régression au-delà de {args.max_regression:.0f} % (référence du {baseline.get('created_at')})")
+
+    if results.error_samples:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,21 @@
+#!/bin/bash
+# Script pour envoyer les récapitulatifs de notifications par email
+# Exécuté automatiquement toutes les 15 minutes (NOTIFICATION_DIGEST_WINDOW_MINUTES > 0)
+
+# Définir le répertoire de travail
+cd /opt/budgeefamily
+
+# Activer l'environnement virtuel
+source .venv/bin/activate
+
+# Définir les variables d'environnement Flask
+export FLASK_APP=wsgi.py
+
+# Exécuter la commande Flask
+flask send-notification-digests
+
+# Déconnecter
+deactivate
+
+# Log avec timestamp
+echo "[$(date +'%Y-%m-%d %H:%M:%S')] Envoi des récapitulatifs de notifications effectué" >> /opt/budgeefamily/logs/cron.log
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Mémoire du maître et des workers Gunicorn : RSS, PSS (part proportionnelle des pages
+partagées) et USS (pages propres au processus). Avec preload_app, l'USS d'un worker
+mesure ce que coûte réellement un worker supplémentaire ; le RSS compte aussi les
+pages partagées avec le maître et surestime la mémoire consommée.
+
+Usage :
+    python scripts/worker_memory.py [--master PID]
+"""
+
+import argparse
+import os
+import sys
+
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.preload import process_memory
+
+
+def find_master():
+    """Processus maître Gunicorn de l'application (wsgi:app)"""
+    def is_gunicorn(cmdline):
+        # Exécutable gunicorn, ou python lançant le script gunicorn
+        return any(os.path.basename(part).startswith('gunicorn') for part in cmdline[:2]) and 'wsgi:app' in cmdline
+
+    for process in psutil.process_iter(['pid', 'cmdline']):
+        if is_gunicorn(process.info['cmdline'] or []):
+            parent = process.parent()
+            if parent is None or not is_gunicorn(parent.cmdline()):
+                return process
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--master', type=int, help='PID du maître Gunicorn (recherché par défaut)')
+    args = parser.parse_args()
+
+    master = psutil.Process(args.master) if args.master else find_master()
+    if master is None:
+        sys.exit("Maître Gunicorn introuvable")
+
+    workers = master.children()
+    print(f"{'processus':<16}{'pid':>8}{'rss Mo':>10}{'pss Mo':>10}{'uss Mo':>10}")
+    totals = {'rss': 0, 'pss': 0, 'uss': 0}
+    for label, process in [('maître', master)] + [('worker', worker) for worker in workers]:
+        memory = process_memory(process.pid)
+        for key in totals:
+            totals[key] += memory.get(key, 0)
+        print(f"{label:<16}{process.pid:>8}" + ''.join(f"{memory.get(key, 0):>10.1f}" for key in ('rss', 'pss', 'uss')))
+
+    print(f"{'total':<24}" + ''.join(f"{totals[key]:>10.1f}" for key in ('rss', 'pss', 'uss')))
+    if workers:
+        average_uss = sum(process_memory(worker.pid).get('uss', 0) for worker in workers) / len(workers)
+        print(f"USS moyen par worker : {average_uss:.1f} Mo ({len(workers)} workers)")
+
+
+if __name__ == '__main__':
+    main()